@@ -17,14 +17,28 @@ from flask import Flask, request, Response, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+# 加载环境变量（需在导入配置之前）
+load_dotenv()
+
+from config import get_config
+from models.stream_recording import (
+    StreamRecorder, StreamReplay, ReplayBaichuanClient, AsyncReplayBaichuanClient
+)
 from services.llm_service import BaichuanLLMService
 from services.citation_service import CitationService
 from services.streaming_service import StreamingService
+from services.ask_stream import AskStreamProcessor
+from services.health_monitor import HealthMonitor
+from services.answer_cache import AnswerCache
+from services.follow_up import FollowUpScheduler
+from services.follow_up_cache import FollowUpCache
+from services.pacing import resolve_pacing_mode, create_pacer_from_config, paced, DeadlineReader
+from services.resumable_stream import ResumableStreamStore, run_producer, sse_frames
+from services.request_timing import TimingRecorder
 from utils.text_processor import TextProcessor
 from utils.citation_parser import CitationParser
-
-# 加载环境变量
-load_dotenv()
+from utils.metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from utils.serialization import configure_serializer, configure_timestamps
 
 # 配置日志
 logging.basicConfig(
@@ -33,11 +47,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 服务指标
+HTTP_REQUESTS = REGISTRY.counter(
+    'openevidence_http_requests_total', 'HTTP requests handled by the Flask app', ('method', 'endpoint', 'status')
+)
+ASK_STREAMS_IN_FLIGHT = REGISTRY.gauge(
+    'openevidence_ask_streams_in_flight', 'Open /api/ask response streams', ('server',)
+)
+
 # 创建Flask应用
 app = Flask(__name__)
 
 # 配置CORS - 允许前端访问
-CORS(app, origins=[
+CORS_ORIGINS = [
     'http://localhost:3000',
     'http://127.0.0.1:3000',
     'http://154.93.109.243:3000',
@@ -45,42 +67,182 @@ CORS(app, origins=[
     'http://127.0.0.1:3100',
     'http://154.93.109.243:3100',
     'https://*.skywork.website'
-])
+]
+CORS(app, origins=CORS_ORIGINS)
+
+# 流式响应头（X-Accel-Buffering 关闭 nginx 等反向代理的缓冲）
+STREAMING_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Last-Event-ID',
+    'Access-Control-Expose-Headers': 'X-Session-Id'
+}
 
 # 初始化服务
 try:
-    llm_service = BaichuanLLMService()
+    app_config = get_config()
+    json_serializer = configure_serializer(app_config.JSON_SERIALIZER)
+    configure_timestamps(app_config.SSE_TIMESTAMP_RESOLUTION)
+    logger.info(f"SSE frames serialized with {json_serializer}")
+    if app_config.STREAM_REPLAY_PATH:
+        # 回放录制的上游流，不访问 Baichuan
+        stream_replay = StreamReplay.from_file(
+            app_config.STREAM_REPLAY_PATH, speed=app_config.STREAM_REPLAY_SPEED
+        )
+        llm_service = BaichuanLLMService(
+            client=ReplayBaichuanClient(stream_replay),
+            async_client=AsyncReplayBaichuanClient(stream_replay)
+        )
+    else:
+        stream_recorder = None
+        if app_config.STREAM_RECORD_PATH:
+            stream_recorder = StreamRecorder(
+                app_config.STREAM_RECORD_PATH,
+                sample_rate=app_config.STREAM_RECORD_SAMPLE_RATE,
+                max_records=app_config.STREAM_RECORD_MAX_RECORDS
+            )
+        llm_service = BaichuanLLMService(recorder=stream_recorder)
     citation_service = CitationService()
-    streaming_service = StreamingService()
-    text_processor = TextProcessor()
+    text_processor = TextProcessor(
+        glossary_path=app_config.MEDICAL_GLOSSARY_PATH,
+        matcher_path=app_config.MEDICAL_GLOSSARY_MATCHER_PATH
+    )
+    # 启动时构建（或加载）术语匹配自动机，避免第一个 /api/ask 请求中构建（ASGI 下会阻塞事件循环）
+    text_processor.build_term_matcher()
+    # 用于问答流的结构统计（关闭时为 None）
+    structure_processor = text_processor if app_config.ANSWER_STRUCTURE_ENABLED else None
     citation_parser = CitationParser()
+    if app_config.METRICS_MULTIPROC_DIR:
+        REGISTRY.enable_multiprocess(
+            app_config.METRICS_MULTIPROC_DIR, interval=app_config.METRICS_SNAPSHOT_INTERVAL
+        )
+    streaming_service = StreamingService(
+        word_delay=app_config.STREAMING_WORD_DELAY,
+        segment_delay=app_config.STREAMING_SEGMENT_DELAY,
+        citation_parser=citation_parser,
+        pacing_mode=app_config.STREAMING_PACING_MODE
+    )
+    
+    # 后台探测上游健康状态，健康检查端点直接读取缓存
+    health_monitor = HealthMonitor(
+        probe=lambda: llm_service.probe_upstream(
+            mode=app_config.HEALTH_PROBE_MODE,
+            timeout=app_config.HEALTH_CHECK_TIMEOUT
+        ),
+        interval=app_config.HEALTH_CHECK_INTERVAL,
+        window=app_config.HEALTH_CHECK_WINDOW,
+        stale_after=app_config.HEALTH_CHECK_STALE_AFTER
+    )
+    health_monitor.start()
+    
+    # 后续问题生成（与回答流并行，相同提示词命中缓存）
+    follow_up_cache = FollowUpCache(
+        max_entries=app_config.FOLLOW_UP_CACHE_MAX_ENTRIES,
+        ttl=app_config.FOLLOW_UP_CACHE_TTL,
+        enabled=app_config.FOLLOW_UP_CACHE_ENABLED,
+        persist_path=app_config.FOLLOW_UP_CACHE_PATH,
+        save_interval=app_config.FOLLOW_UP_CACHE_SAVE_INTERVAL
+    )
+    follow_up_scheduler = FollowUpScheduler(
+        llm_service,
+        max_workers=app_config.FOLLOW_UP_MAX_WORKERS,
+        timeout=app_config.FOLLOW_UP_TIMEOUT,
+        speculative=app_config.FOLLOW_UP_SPECULATIVE,
+        cache=follow_up_cache
+    )
+    
+    # 问答请求分阶段计时
+    timing_recorder = TimingRecorder()
+    
+    # 问答缓存（可选近似问题匹配）
+    semantic_index = None
+    if app_config.SEMANTIC_CACHE_ENABLED:
+        from services.semantic_cache import SemanticQuestionIndex
+        semantic_index = SemanticQuestionIndex(
+            capacity=app_config.SEMANTIC_CACHE_CAPACITY,
+            dim=app_config.SEMANTIC_CACHE_DIM,
+            threshold=app_config.SEMANTIC_CACHE_THRESHOLD
+        )
+    
+    answer_cache = AnswerCache(
+        max_entries=app_config.ANSWER_CACHE_MAX_ENTRIES,
+        max_bytes=app_config.ANSWER_CACHE_MAX_BYTES,
+        ttl=app_config.ANSWER_CACHE_TTL,
+        enabled=app_config.ANSWER_CACHE_ENABLED,
+        semantic_index=semantic_index
+    )
+    
+    # 断线续传的事件缓冲
+    ask_streams = ResumableStreamStore(
+        enabled=app_config.SSE_RESUME_ENABLED,
+        max_sessions=app_config.SSE_RESUME_MAX_SESSIONS,
+        max_bytes=app_config.SSE_RESUME_MAX_BYTES,
+        ttl=app_config.SSE_RESUME_TTL,
+        abandon_after=app_config.SSE_RESUME_ABANDON_AFTER,
+        single_flight=app_config.SINGLE_FLIGHT_ENABLED
+    )
     
     logger.info("All services initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize services: {str(e)}")
     raise
 
+@app.after_request
+def count_request(response):
+    """按端点统计请求数（流式响应在开始发送时计数）"""
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    HTTP_REQUESTS.labels(request.method, endpoint, response.status_code).inc()
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 指标（多进程模式下合并所有工作进程）"""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """健康检查端点"""
+    """健康检查端点（读取缓存的上游状态，不调用上游）"""
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'version': '2.0.0',
         'model': 'Baichuan-M2-Plus',
         'services': {
-            'llm': llm_service.is_available(),
+            'llm': health_monitor.is_available(),
             'citation': True,
             'streaming': True
-        }
+        },
+        'upstream': health_monitor.get_status()
     })
 
+@app.route('/health/live', methods=['GET'])
+def liveness_check():
+    """存活检查端点：进程能处理请求即返回 200"""
+    return jsonify({
+        'status': 'alive',
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """就绪检查端点：上游最近一次探测成功才返回 200，否则返回 503"""
+    ready = health_monitor.is_ready()
+    return jsonify({
+        'status': 'ready' if ready else 'not_ready',
+        'timestamp': datetime.now().isoformat(),
+        'upstream': health_monitor.get_status()
+    }), 200 if ready else 503
+
 @app.route('/api/ask', methods=['POST'])
 def ask_question():
     """
     处理医学问题的主要端点
-    支持流式响应和实时引用标记
+    支持流式响应和实时引用标记；带 Last-Event-ID 请求头重连时从事件缓冲续传
     """
+    timer = timing_recorder.start()
     try:
         # 解析请求数据
         data = request.get_json()
@@ -90,132 +252,109 @@ def ask_question():
         question = data['question']
         user_id = data.get('userId', 'anonymous')
         session_id = data.get('sessionId', str(uuid.uuid4()))
+        pacing_mode = resolve_pacing_mode(
+            data.get('pacing'), data.get('responseSpeed'), app_config.STREAMING_PACING_MODE
+        )
+        headers = dict(STREAMING_HEADERS, **{'X-Session-Id': session_id})
+        
+        # 断线重连：从缓冲中续读，不重新调用上游
+        resumed = ask_streams.resume(session_id, question, request.headers.get('Last-Event-ID'))
+        if resumed is not None:
+            stream, last_event_id = resumed
+            return Response(
+                stream.read(last_event_id, session_id), mimetype='text/event-stream', headers=headers
+            )
+        
+        # 相同问题正在生成时共用同一条上游流，从第一个事件开始追读
+        cache_context = answer_cache.build_context(
+            llm_service.system_prompt, llm_service.get_model_params()
+        )
+        cache_key = answer_cache.build_key(question, cache_context)
+        flight_key = f"{cache_key}:{pacing_mode}"
+        shared = ask_streams.join(flight_key, session_id, question)
+        if shared is not None:
+            return Response(shared.read(0, session_id), mimetype='text/event-stream', headers=headers)
+        
+        timer.request_id = session_id
+        timer.tag(server='flask', pacing=pacing_mode, cached=False, status='incomplete')
         
         logger.info(f"Processing question: {question[:100]}... (User: {user_id})")
         
-        # 生成流式响应
-        def generate_streaming_response():
+        # 生成事件序列
+        def generate_events():
+            stream = None
+            follow_up = follow_up_scheduler.track(question)
+            ASK_STREAMS_IN_FLIGHT.labels('flask').inc()
             try:
-                # 1. 调用 Baichuan M2 Plus 模型获取流式响应
-                logger.info("question")
-                stream = llm_service.ask_question_stream(question)
-                logger.info("here")
-                # 2. 处理流式数据
-                current_content = ""
-                references = []
-                thinking_complete = False
+                processor = AskStreamProcessor(citation_parser, session_id, timer, structure_processor)
+                pacer = create_pacer_from_config(pacing_mode, app_config)
                 
+                # 0. 相同或近似问题直接全速回放缓存的事件序列
+                cached_events = answer_cache.get(cache_key, question, cache_context)
+                if cached_events is not None:
+                    logger.info("Serving answer from cache")
+                    timer.tag(cached=True)
+                    yield from processor.replay(cached_events)
+                    timer.tag(status='completed')
+                    return
+                
+                # 1. 调用 Baichuan M2 Plus 模型获取流式响应（收到响应头时记录 upstream_connect）
+                stream = DeadlineReader(llm_service.ask_question_stream(
+                    question, on_connect=lambda: timer.mark('upstream_connect')
+                ), pacer)
+                
+                # 2. 处理流式数据（按节奏模式发送）
                 for chunk in stream:
-                    try:
-                        # 检查是否是思考阶段
-                        if hasattr(chunk.choices[0], 'thinking') and chunk.choices[0].thinking:
-                            thinking_status = chunk.choices[0].thinking.get('status')
-                            if thinking_status == 'completed':
-                                thinking_complete = True
-                                # 发送思考完成信号
-                                thinking_data = {
-                                    'type': 'thinking_complete',
-                                    'isComplete': False,
-                                    'timestamp': datetime.now().isoformat()
-                                }
-                                yield f"data: {json.dumps(thinking_data)}\n\n"
-                            continue
-                        
-                        # 检查是否有引用信息
-                        if hasattr(chunk.choices[0], 'grounding') and chunk.choices[0].grounding:
-                            grounding = chunk.choices[0].grounding
-                            if 'evidence' in grounding:
-                                # 解析引用信息
-                                references = citation_parser.parse_baichuan_references(
-                                    grounding['evidence']
-                                )
-                                
-                                # 发送引用信息
-                                references_data = {
-                                    'type': 'references_loaded',
-                                    'references': references,
-                                    'isComplete': False,
-                                    'timestamp': datetime.now().isoformat()
-                                }
-                                yield f"data: {json.dumps(references_data)}\n\n"
-                                continue
-                        
-                        # 处理文本内容
-                        delta = chunk.choices[0].delta
-                        if delta and delta.content:
-                            content = delta.content
-                            current_content += content
-                            
-                            # 检测引用标记并处理
-                            processed_content, citations = citation_parser.extract_citations_from_text(
-                                content, references
-                            )
-                            
-                            if citations:
-                                # 发送带引用的内容
-                                content_data = {
-                                    'content': processed_content,
-                                    'citations': citations,
-                                    'isComplete': False,
-                                    'timestamp': datetime.now().isoformat()
-                                }
-                            else:
-                                # 发送普通内容
-                                content_data = {
-                                    'content': content,
-                                    'isComplete': False,
-                                    'timestamp': datetime.now().isoformat()
-                                }
-                            #loger.info(content_data)
-                            
-                            yield f"data: {json.dumps(content_data)}\n\n"
-                            
-                            # 添加流式延迟
-                            time.sleep(0.05)
-                        
-                        # 检查是否完成
-                        if chunk.choices[0].finish_reason == 'stop':
-                            # 生成后续问题
-                            follow_up_questions = llm_service.generate_follow_up_questions(
-                                question, current_content
-                            )
-                            
-                            # 发送完成信号
-                            completion_data = {
-                                'isComplete': True,
-                                'references': references,
-                                'followUpQuestions': follow_up_questions,
-                                'sessionId': session_id,
-                                'timestamp': datetime.now().isoformat()
-                            }
-                            yield f"data: {json.dumps(completion_data)}\n\n"
-                            break
-                            
-                    except Exception as chunk_error:
-                        logger.error(f"Error processing chunk: {str(chunk_error)}")
+                    # 上游停顿时发送已到时间预算的暂存内容
+                    if chunk is None:
+                        yield from pacer.flush_due()
                         continue
+                    yield from paced(pacer, processor.process_chunk(chunk))
+                    
+                    # 回答达到提示词所需长度后提前生成后续问题（使用连接池中的另一个连接）
+                    follow_up.maybe_start(processor.current_content)
+                    
+                    # 检查是否完成
+                    if processor.finished:
+                        break
+                
+                # 发送合并中的剩余内容
+                yield from pacer.flush()
+                
+                # 释放上游流连接
+                stream.close()
+                
+                if processor.finished:
+                    # 发送完成信号（不等待后续问题），后续问题就绪后单独发送
+                    yield from processor.finish(follow_up)
+                    
+                    # 缓存完整的事件序列（后续问题为默认问题时不缓存，避免回放给之后的提问）
+                    if not follow_up.used_defaults:
+                        answer_cache.put(cache_key, processor.events, question, cache_context)
                 
             except Exception as e:
                 logger.error(f"Error in streaming response: {str(e)}")
-                error_data = {
-                    'error': f'Streaming error: {str(e)}',
-                    'isComplete': True,
-                    'timestamp': datetime.now().isoformat()
-                }
-                yield f"data: {json.dumps(error_data)}\n\n"
+                timer.tag(status='error')
+                yield AskStreamProcessor.build_error(e)
+            finally:
+                # 提前结束（完成或客户端断开）时及时释放上游连接
+                if stream is not None:
+                    stream.close()
+                follow_up.cancel()
+                ASK_STREAMS_IN_FLIGHT.labels('flask').dec()
+                
+                # 记录最后一个事件生成完成的时刻并输出计时日志（启用续传时即写入缓冲的时刻）
+                timer.mark('last_byte')
+                timing_recorder.record(timer)
         
         # 返回Server-Sent Events响应
-        return Response(
-            generate_streaming_response(),
-            mimetype='text/plain',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type'
-            }
-        )
+        if not ask_streams.enabled:
+            return Response(sse_frames(generate_events()), mimetype='text/event-stream', headers=headers)
+        
+        # 生成与连接解耦：后台线程写入缓冲，响应只读取缓冲
+        stream = ask_streams.create(session_id, question, flight_key)
+        run_producer(stream, generate_events())
+        return Response(stream.read(0, session_id), mimetype='text/event-stream', headers=headers)
         
     except Exception as e:
         logger.error(f"Error processing question: {str(e)}")
@@ -287,17 +426,42 @@ def user_preferences():
 def model_status():
     """获取模型状态"""
     try:
+        upstream_status = health_monitor.get_status()
         status = {
             'model_name': 'Baichuan-M2-Plus',
-            'available': llm_service.is_available(),
+            'available': upstream_status['available'],
             'api_base': llm_service.get_api_base(),
-            'last_check': datetime.now().isoformat()
+            'connection_pool': llm_service.get_pool_stats(),
+            'health': upstream_status,
+            'last_check': upstream_status['last_check']
         }
         return jsonify(status)
     except Exception as e:
         logger.error(f"Error getting model status: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """获取缓存命中统计"""
+    try:
+        return jsonify({
+            'answer_cache': answer_cache.get_stats(),
+            'follow_up_cache': follow_up_cache.get_stats(),
+            'resumable_streams': ask_streams.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error getting cache stats: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/timing/stats', methods=['GET'])
+def timing_stats():
+    """获取问答请求分阶段耗时分布"""
+    try:
+        return jsonify(timing_recorder.get_stats())
+    except Exception as e:
+        logger.error(f"Error getting timing stats: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -313,7 +477,12 @@ if __name__ == '__main__':
     logger.info("  GET  /api/references/<id> - Get reference details")
     logger.info("  GET  /api/search/history - Get search history")
     logger.info("  GET  /api/model/status - Get model status")
+    logger.info("  GET  /api/cache/stats - Get cache statistics")
+    logger.info("  GET  /api/timing/stats - Get per-stage request timings")
+    logger.info("  GET  /metrics - Prometheus metrics")
     logger.info("  GET  /health - Health check")
+    logger.info("  GET  /health/live - Liveness probe")
+    logger.info("  GET  /health/ready - Readiness probe")
     
     # 获取配置
     host = os.getenv('HOST', '0.0.0.0')
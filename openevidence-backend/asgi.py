@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+OpenEvidence Backend ASGI 入口 - 异步流式问答
+/api/ask 运行在 asyncio 事件循环上，等待上游的流不再占用工作线程；
+其余端点仍由 Flask 应用提供（通过 WSGI 适配器挂载）
+
+启动方式:
+    uvicorn asgi:app --host 0.0.0.0 --port 8001
+"""
+
+import re
+import asyncio
+import logging
+import uuid
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from app import (
+    app as flask_app, app_config, llm_service, citation_parser, answer_cache,
+    follow_up_scheduler, timing_recorder, ask_streams, structure_processor, ASK_STREAMS_IN_FLIGHT,
+    CORS_ORIGINS, STREAMING_HEADERS
+)
+from services.ask_stream import AskStreamProcessor
+from services.pacing import resolve_pacing_mode, create_pacer_from_config
+from services.request_timing import RequestTimer
+from services.resumable_stream import run_producer_async, sse_frames_async
+
+logger = logging.getLogger(__name__)
+
+async def generate_events(question: str, session_id: str, pacing_mode: str, timer: RequestTimer,
+                          cache_key: str, cache_context: str):
+    """
+    异步生成事件序列（事件与 Flask 版本一致）
+    
+    Args:
+        question: 用户问题
+        session_id: 会话ID
+        pacing_mode: 节奏模式
+        timer: 请求计时器
+        cache_key: 问答缓存键
+        cache_context: 问答缓存上下文
+        
+    Yields:
+        Dict: 事件数据
+    """
+    processor = AskStreamProcessor(citation_parser, session_id, timer, structure_processor)
+    pacer = create_pacer_from_config(pacing_mode, app_config)
+    # 与 Flask 版本一致：缓存回放也计入进行中的流
+    in_flight = ASK_STREAMS_IN_FLIGHT.labels('asgi')
+    in_flight.inc()
+    stream = None
+    next_chunk = None
+    follow_up = None
+    try:
+        # 相同或近似问题直接全速回放缓存的事件序列
+        cached_events = answer_cache.get(cache_key, question, cache_context)
+        if cached_events is not None:
+            logger.info("Serving answer from cache")
+            timer.tag(cached=True)
+            for event in processor.replay(cached_events):
+                yield event
+            timer.tag(status='completed')
+            return
+        
+        stream = llm_service.ask_question_stream_async(
+            question, on_connect=lambda: timer.mark('upstream_connect')
+        )
+        follow_up = follow_up_scheduler.track(question)
+        while True:
+            # 等待下一个上游块；有暂存的内容时最多等到其时间预算用完，超时先发送暂存的内容
+            if next_chunk is None:
+                next_chunk = asyncio.ensure_future(stream.__anext__())
+            remaining = pacer.remaining()
+            if remaining is not None:
+                done, _ = await asyncio.wait((next_chunk,), timeout=remaining)
+                if not done:
+                    for event in pacer.flush_due():
+                        yield event
+                    continue
+            try:
+                chunk = await next_chunk
+            except StopAsyncIteration:
+                break
+            finally:
+                next_chunk = None
+            
+            for event in processor.process_chunk(chunk):
+                for paced_event in pacer.push(event):
+                    yield paced_event
+                    
+                    # 按节奏模式延迟（不阻塞事件循环）
+                    delay = pacer.delay_after(paced_event)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+            
+            # 回答达到提示词所需长度后提前生成后续问题
+            follow_up.maybe_start_async(processor.current_content)
+            
+            # 检查是否完成
+            if processor.finished:
+                break
+        
+        # 发送合并中的剩余内容
+        for event in pacer.flush():
+            yield event
+        
+        # 释放上游流连接
+        await stream.aclose()
+        
+        if processor.finished:
+            # 发送完成信号（不等待后续问题），后续问题就绪后单独发送
+            async for event in processor.finish_async(follow_up):
+                yield event
+            
+            # 缓存完整的事件序列（后续问题为默认问题时不缓存，避免回放给之后的提问）
+            if not follow_up.used_defaults:
+                answer_cache.put(cache_key, processor.events, question, cache_context)
+                
+    except Exception as e:
+        logger.error(f"Error in async streaming response: {str(e)}")
+        timer.tag(status='error')
+        yield AskStreamProcessor.build_error(e)
+    finally:
+        # 提前结束（完成或客户端断开）时及时释放上游连接
+        if next_chunk is not None:
+            next_chunk.cancel()
+            await asyncio.wait((next_chunk,))
+            if not next_chunk.cancelled():
+                next_chunk.exception()
+        if stream is not None:
+            await stream.aclose()
+        if follow_up is not None:
+            follow_up.cancel()
+        in_flight.dec()
+        
+        # 记录最后一个事件生成完成的时刻并输出计时日志（启用续传时即写入缓冲的时刻）
+        timer.mark('last_byte')
+        timing_recorder.record(timer)
+
+async def ask_question(request: Request):
+    """
+    处理医学问题的主要端点（异步版本）
+    支持流式响应和实时引用标记；带 Last-Event-ID 请求头重连时从事件缓冲续传
+    """
+    timer = timing_recorder.start()
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        
+        if not data or 'question' not in data:
+            return JSONResponse({'error': 'Question is required'}, status_code=400)
+        
+        question = data['question']
+        user_id = data.get('userId', 'anonymous')
+        session_id = data.get('sessionId', str(uuid.uuid4()))
+        pacing_mode = resolve_pacing_mode(
+            data.get('pacing'), data.get('responseSpeed'), app_config.STREAMING_PACING_MODE
+        )
+        headers = dict(STREAMING_HEADERS, **{'X-Session-Id': session_id})
+        
+        # 断线重连：从缓冲中续读，不重新调用上游
+        resumed = ask_streams.resume(session_id, question, request.headers.get('Last-Event-ID'))
+        if resumed is not None:
+            stream, last_event_id = resumed
+            return StreamingResponse(
+                stream.read_async(last_event_id, session_id), media_type='text/event-stream', headers=headers
+            )
+        
+        # 相同问题正在生成时共用同一条上游流，从第一个事件开始追读
+        cache_context = answer_cache.build_context(
+            llm_service.system_prompt, llm_service.get_model_params()
+        )
+        cache_key = answer_cache.build_key(question, cache_context)
+        flight_key = f"{cache_key}:{pacing_mode}"
+        shared = ask_streams.join(flight_key, session_id, question)
+        if shared is not None:
+            return StreamingResponse(
+                shared.read_async(0, session_id), media_type='text/event-stream', headers=headers
+            )
+        
+        timer.request_id = session_id
+        timer.tag(server='asgi', pacing=pacing_mode, cached=False, status='incomplete')
+        
+        logger.info(f"Processing question (async): {question[:100]}... (User: {user_id})")
+        
+        events = generate_events(question, session_id, pacing_mode, timer, cache_key, cache_context)
+        if not ask_streams.enabled:
+            return StreamingResponse(sse_frames_async(events), media_type='text/event-stream', headers=headers)
+        
+        # 生成与连接解耦：事件循环任务写入缓冲，响应只读取缓冲
+        stream = ask_streams.create(session_id, question, flight_key)
+        run_producer_async(stream, events)
+        return StreamingResponse(
+            stream.read_async(0, session_id), media_type='text/event-stream', headers=headers
+        )
+        
+    except Exception as e:
+        logger.error(f"Error processing question: {str(e)}")
+        return JSONResponse({'error': f'Internal server error: {str(e)}'}, status_code=500)
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    """应用生命周期：关闭时释放异步连接池"""
+    yield
+    await llm_service.aclose()
+
+def _cors_middleware() -> Middleware:
+    """根据 Flask 的 CORS 来源配置构建 CORS 中间件（通配符来源转为正则）"""
+    exact_origins = [origin for origin in CORS_ORIGINS if '*' not in origin]
+    wildcard_origins = [
+        re.escape(origin).replace(r'\*', r'[^/]+')
+        for origin in CORS_ORIGINS if '*' in origin
+    ]
+    
+    return Middleware(
+        CORSMiddleware,
+        allow_origins=exact_origins,
+        allow_origin_regex='|'.join(wildcard_origins) or None,
+        allow_methods=['GET', 'POST', 'OPTIONS'],
+        allow_headers=['Content-Type', 'Last-Event-ID'],
+        expose_headers=['X-Session-Id']
+    )
+
+app = Starlette(
+    routes=[
+        Route('/api/ask', ask_question, methods=['POST']),
+        # 其余端点交给 Flask 应用处理
+        Mount('/', app=WSGIMiddleware(flask_app))
+    ],
+    middleware=[_cors_middleware()],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import os
+    import uvicorn
+    
+    logger.info("Starting OpenEvidence Backend API (ASGI mode) with Baichuan M2 Plus...")
+    
+    uvicorn.run(
+        app,
+        host=os.getenv('HOST', '0.0.0.0'),
+        port=int(os.getenv('PORT', 8001))
+    )
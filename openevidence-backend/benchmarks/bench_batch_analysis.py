@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+批量文本分析基准 - 吞吐量随工作进程数的变化
+
+生成模拟回答（含 ^[n]^ 引用标记）写成 JSONL，分别用 1 个（当前进程直接处理）到 CPU 核数个工作进程
+运行 services.batch_analysis.analyze_jsonl，测量每秒处理的记录数和相对单进程的加速比，并检查输出一致。
+
+用法:
+    python benchmarks/bench_batch_analysis.py --records 5000 --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_baichuan_server import build_answer
+from services.batch_analysis import DEFAULT_CHUNK_SIZE, analyze_jsonl
+
+def build_lines(records: int, answer_chars: int, seed: int) -> List[str]:
+    """模拟的存档回答（每行一个 JSON 对象）"""
+    rng = random.Random(seed)
+    return [
+        json.dumps({'id': index, 'content': build_answer(answer_chars, 12, 0.3, rng)}, ensure_ascii=False)
+        for index in range(records)
+    ]
+
+def default_workers() -> List[int]:
+    """1、2、4 … 直到 CPU 核数"""
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 < cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch text analysis: throughput vs worker processes')
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--answer-chars', type=int, default=1500)
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers())
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write JSON result to this file')
+    args = parser.parse_args()
+    
+    lines = build_lines(args.records, args.answer_chars, args.seed)
+    results: Dict[str, Any] = {'records': len(lines), 'cpus': os.cpu_count(), 'runs': []}
+    baseline = None
+    
+    for workers in args.workers:
+        start = time.perf_counter()
+        output = list(analyze_jsonl(lines, workers=workers, chunk_size=args.chunk_size))
+        elapsed = time.perf_counter() - start
+        
+        if baseline is None:
+            baseline = (output, elapsed)
+        assert output == baseline[0]
+        results['runs'].append({
+            'workers': workers,
+            'seconds': round(elapsed, 3),
+            'records_per_second': round(len(lines) / elapsed, 1),
+            'speedup': round(baseline[1] / elapsed, 2)
+        })
+    
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
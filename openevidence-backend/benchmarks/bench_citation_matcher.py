@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+引用标记匹配吞吐基准 - 长回答上的整段扫描
+
+对比原来的三个正则分别 finditer（未预编译、存在重复计数）
+与单一预编译正则 CITATION_PATTERN 的一次扫描。
+
+用法:
+    python benchmarks/bench_citation_matcher.py --sizes 2000,20000,200000
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from typing import Dict, List, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.citation_parser import CitationParser, iter_citation_spans
+
+# 原实现的三个模式
+LEGACY_PATTERNS = [
+    r'\^?\[(\d+(?:,\s*\d+)*)\]\^?',
+    r'\^(\d+)\^',
+    r'\[(\d+)\]',
+]
+
+SENTENCES = [
+    '种植牙术后是否常规使用抗生素目前仍有争议',
+    '多项随机对照试验显示术前单次给药可降低早期失败率',
+    'A 2023 systematic review found no significant difference in implant survival',
+    '应结合手术范围和患者全身情况综合判断',
+]
+MARKERS = ['^[{0}]^', '[{0}]', '^[{0},{1}]^', '^{0}^']
+
+def build_answer(size: int, seed: int = 42) -> str:
+    """生成指定长度、约每句一个引用标记的回答"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        marker = rng.choice(MARKERS).format(rng.randint(1, 20), rng.randint(1, 20))
+        parts.append(rng.choice(SENTENCES) + marker + '。')
+        length += len(parts[-1])
+    return ''.join(parts)[:size]
+
+def legacy_spans(text: str) -> List[tuple]:
+    """原实现：三个模式分别扫描并解析引用编号"""
+    spans = []
+    for pattern in LEGACY_PATTERNS:
+        for match in re.finditer(pattern, text):
+            citation_nums = [int(num.strip()) for num in match.group(1).split(',')]
+            spans.append((match.start(), match.end(), citation_nums))
+    spans.sort(key=lambda span: span[0])
+    return spans
+
+def single_pass_spans(text: str) -> List[tuple]:
+    """单一预编译正则一次扫描"""
+    return list(iter_citation_spans(text))
+
+def throughput(func, text: str, repeat: int) -> float:
+    """返回吞吐（MB/s，按 UTF-8 字节计）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return round(len(text.encode('utf-8')) / best / 1e6, 2)
+
+def bench_size(parser: CitationParser, size: int, repeat: int) -> Dict[str, Any]:
+    """测量一种回答长度下的吞吐"""
+    text = build_answer(size)
+    references = [{'id': i} for i in range(1, 21)]
+    
+    return {
+        'chars': len(text),
+        'legacy_spans': len(legacy_spans(text)),
+        'single_pass_spans': len(single_pass_spans(text)),
+        'legacy_scan_mb_s': throughput(legacy_spans, text, repeat),
+        'single_pass_scan_mb_s': throughput(single_pass_spans, text, repeat),
+        'extract_mb_s': throughput(lambda t: parser.extract_citations_from_text(t, references), text, repeat),
+        'segment_mb_s': throughput(lambda t: parser.segment_text_with_citations(t, references), text, repeat)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Citation matcher throughput benchmark')
+    parser.add_argument('--sizes', default='2000,20000,200000', help='comma separated answer lengths')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write JSON result to this file')
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    citation_parser = CitationParser()
+    
+    results = [bench_size(citation_parser, int(size), args.repeat) for size in args.sizes.split(',')]
+    
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+流式引用解析基准 - 每个 token 的解析开销
+
+对比两种方式处理同一段按 token 切分的回答：
+  - per_chunk: 每个增量块单独调用 CitationParser.extract_citations_from_text（跨块标记会漏检）
+  - tokenizer: StreamingCitationTokenizer 增量分词
+
+用法:
+    python benchmarks/bench_citation_tokenizer.py --tokens 20000
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.citation_parser import CitationParser
+from utils.citation_tokenizer import StreamingCitationTokenizer, join_tokens
+
+SENTENCES = [
+    '种植牙术后是否常规使用抗生素目前仍有争议',
+    '多项随机对照试验显示术前单次给药可降低早期失败率',
+    '对于健康患者不推荐术后长期预防性用药',
+    '应结合手术范围和患者全身情况综合判断',
+]
+
+def build_chunks(tokens: int, references: int, seed: int = 42) -> List[str]:
+    """生成按 1-4 个字符切分的回答文本，约每句一个引用标记"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < tokens * 4:
+        parts.append(rng.choice(SENTENCES) + f'^[{rng.randint(1, references)}]^。')
+        length += len(parts[-1])
+    text = ''.join(parts)
+    
+    chunks = []
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 4)
+        chunks.append(text[pos:pos + size])
+        pos += size
+    return chunks[:tokens]
+
+def bench_per_chunk(chunks: List[str], references: List[Dict]) -> Dict[str, Any]:
+    """每个块独立解析（原实现）"""
+    parser = CitationParser()
+    found = 0
+    start = time.perf_counter()
+    for chunk in chunks:
+        _, citations = parser.extract_citations_from_text(chunk, references)
+        found += len(citations)
+    elapsed = time.perf_counter() - start
+    return {'ns_per_token': round(elapsed / len(chunks) * 1e9, 1), 'citations': found}
+
+def bench_tokenizer(chunks: List[str], references: List[Dict]) -> Dict[str, Any]:
+    """流式分词器"""
+    parser = CitationParser()
+    tokenizer = StreamingCitationTokenizer()
+    found = 0
+    start = time.perf_counter()
+    for chunk in chunks:
+        _, citations = join_tokens(tokenizer.feed(chunk))
+        found += len(parser.validate_citations(citations, references))
+    _, citations = join_tokens(tokenizer.flush())
+    found += len(parser.validate_citations(citations, references))
+    elapsed = time.perf_counter() - start
+    return {'ns_per_token': round(elapsed / len(chunks) * 1e9, 1), 'citations': found}
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming citation parsing per-token benchmark')
+    parser.add_argument('--tokens', type=int, default=20000)
+    parser.add_argument('--references', type=int, default=10)
+    parser.add_argument('--output', help='write JSON result to this file')
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    
+    chunks = build_chunks(args.tokens, args.references)
+    references = [{'id': i} for i in range(1, args.references + 1)]
+    expected = sum(1 for token in StreamingCitationTokenizer().feed(''.join(chunks)) if token['type'] == 'citation')
+    
+    result = {
+        'tokens': len(chunks),
+        'markers_in_text': expected,
+        'per_chunk': bench_per_chunk(chunks, references),
+        'tokenizer': bench_tokenizer(chunks, references)
+    }
+    
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+后续问题生成尾延迟基准 - 回答结束后再生成 vs 与回答流并行生成
+
+按固定间隔回放一段回答流（AskStreamProcessor 处理），后续问题生成用固定耗时的
+模拟 LLM 服务代替上游；测量从 finish_reason == 'stop' 到拿到后续问题的等待时间
+（即完成事件比最后一个内容事件晚到达的时间）。
+
+用法:
+    python benchmarks/bench_follow_up.py --chunks 200 --chunk-interval 0.01 --follow-up-latency 0.8
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ask_stream import AskStreamProcessor
+from services.follow_up import FollowUpScheduler
+from utils.citation_parser import CitationParser
+from benchmarks.bench_streaming_service import record_stream
+
+class SimulatedLLMService:
+    """固定耗时的后续问题生成（模拟非流式上游请求）"""
+    
+    def __init__(self, latency: float):
+        self.latency = latency
+    
+    def generate_follow_up_questions(self, original_question: str, answer_content: str) -> List[str]:
+        time.sleep(self.latency)
+        return ['问题一？', '问题二？', '问题三？']
+    
+    def get_default_follow_up_questions(self) -> List[str]:
+        return ['默认问题一？', '默认问题二？', '默认问题三？']
+
+def run_once(scheduler: FollowUpScheduler, parser: CitationParser, stream: List[Any],
+             chunk_interval: float) -> Dict[str, Any]:
+    """回放一次回答流，返回 stop 之后的等待时间（毫秒）"""
+    processor = AskStreamProcessor(parser, 'bench')
+    follow_up = scheduler.track('种植牙术后需要抗生素吗')
+    
+    for chunk in stream:
+        time.sleep(chunk_interval)
+        processor.process_chunk(chunk)
+        follow_up.maybe_start(processor.current_content)
+        if processor.finished:
+            break
+    
+    stop = time.perf_counter()
+    questions = follow_up.result(processor.current_content)
+    return {
+        'tail_ms': (time.perf_counter() - stop) * 1000,
+        'fallback': questions == scheduler.llm_service.get_default_follow_up_questions()
+    }
+
+def bench(speculative: bool, args, stream: List[Any], timeout: float) -> Dict[str, Any]:
+    """多次回放，统计尾延迟"""
+    scheduler = FollowUpScheduler(
+        SimulatedLLMService(args.follow_up_latency), timeout=timeout, speculative=speculative
+    )
+    parser = CitationParser()
+    runs = [run_once(scheduler, parser, stream, args.chunk_interval) for _ in range(args.repeat)]
+    scheduler.shutdown()
+    
+    tails = [run['tail_ms'] for run in runs]
+    return {
+        'tail_ms_p50': round(statistics.median(tails), 1),
+        'tail_ms_max': round(max(tails), 1),
+        'fallbacks': sum(run['fallback'] for run in runs)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Follow-up generation tail latency benchmark')
+    parser.add_argument('--chunks', type=int, default=200)
+    parser.add_argument('--chunk-interval', type=float, default=0.01, help='seconds between upstream chunks')
+    parser.add_argument('--follow-up-latency', type=float, default=0.8, help='simulated follow-up call seconds')
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write JSON result to this file')
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    stream = record_stream(args.chunks)
+    
+    result = {
+        'chunks': len(stream),
+        'stream_seconds': round(len(stream) * args.chunk_interval, 2),
+        'follow_up_latency_ms': args.follow_up_latency * 1000,
+        'sequential': bench(False, args, stream, args.timeout),
+        'speculative': bench(True, args, stream, args.timeout),
+        # 上游超时：回答结束后最多等待 timeout，然后使用默认问题
+        'timeout_fallback': bench(False, args, stream, args.follow_up_latency / 4)
+    }
+    
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
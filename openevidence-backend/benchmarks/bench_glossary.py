@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+术语词典加载基准 - JSON 读入 dict vs 内存映射的字符串表
+
+生成 50k 条中英文术语，分别写成 JSON（原实现：整个词典读入 Dict[str, List[str]]）和 utils.glossary 格式，
+每种方式在独立的子进程中测量：加载耗时、加载后常驻内存（RSS）增量、随机查询耗时，
+以及连同术语匹配自动机一起启动（dict 每次构建，词典文件配合自动机缓存文件直接加载）的耗时和内存。
+
+用法:
+    python benchmarks/bench_glossary.py --terms 50000 --lookups 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_term_matcher import ENGLISH_ROOTS, build_terms
+
+MODES = ['dict', 'glossary', 'dict+matcher', 'glossary+matcher_cache']
+
+def build_entries(count: int, seed: int) -> Dict[str, List[str]]:
+    """合成术语及 1–3 个（去重的）英文译名"""
+    rng = random.Random(seed)
+    return {
+        term: list(dict.fromkeys(' '.join(rng.choice(ENGLISH_ROOTS) for _ in range(rng.randint(1, 3)))
+                                 for _ in range(rng.randint(1, 3))))
+        for term in build_terms(count, rng)
+    }
+
+def rss_kb() -> int:
+    """当前常驻内存（KB）"""
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+def run_child(mode: str, directory: str, lookups: int, seed: int) -> Dict[str, Any]:
+    """在当前（新启动的）进程中加载词典并测量"""
+    from utils.glossary import Glossary
+    from utils.term_matcher import TermMatcher
+    
+    with open(os.path.join(directory, 'keys.json'), 'r', encoding='utf-8') as f:
+        keys = json.load(f)
+    rng = random.Random(seed)
+    queries = [rng.choice(keys) if rng.random() < 0.8 else rng.choice(keys) + '缺' for _ in range(lookups)]
+    
+    baseline = rss_kb()
+    start = time.perf_counter()
+    if mode.startswith('dict'):
+        with open(os.path.join(directory, 'terms.json'), 'r', encoding='utf-8') as f:
+            terms = json.load(f)
+    else:
+        terms = Glossary(os.path.join(directory, 'terms.oeg'))
+    # 保留自动机的引用，计入常驻内存
+    matcher = None
+    if mode == 'dict+matcher':
+        matcher = TermMatcher(terms)
+    elif mode == 'glossary+matcher_cache':
+        matcher = TermMatcher.load(os.path.join(directory, 'terms.acm'))
+    load_ms = (time.perf_counter() - start) * 1000
+    
+    start = time.perf_counter()
+    found = sum(1 for query in queries if terms.get(query) is not None)
+    lookup_us = (time.perf_counter() - start) / lookups * 1e6
+    
+    return {
+        'load_ms': round(load_ms, 3),
+        'rss_delta_kb': rss_kb() - baseline,
+        'lookup_us': round(lookup_us, 3),
+        'found': found,
+        'matcher_states': matcher.state_count if matcher else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Glossary loading: JSON dict vs memory-mapped string table')
+    parser.add_argument('--terms', type=int, default=50000)
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write JSON result to this file')
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        print(json.dumps(run_child(args.child, args.data_dir, args.lookups, args.seed)))
+        return
+    
+    from utils.glossary import Glossary, write_glossary
+    from utils.term_matcher import TermMatcher
+    
+    entries = build_entries(args.terms, args.seed)
+    results: Dict[str, Any] = {'terms': len(entries)}
+    
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, 'terms.json')
+        glossary_path = os.path.join(directory, 'terms.oeg')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        with open(os.path.join(directory, 'keys.json'), 'w', encoding='utf-8') as f:
+            json.dump(list(entries), f, ensure_ascii=False)
+        
+        start = time.perf_counter()
+        write_glossary(entries.items(), glossary_path)
+        results['glossary_build_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        TermMatcher(Glossary(glossary_path)).save(os.path.join(directory, 'terms.acm'))
+        assert dict(Glossary(glossary_path)) == entries
+        
+        results['json_bytes'] = os.path.getsize(json_path)
+        results['glossary_bytes'] = os.path.getsize(glossary_path)
+        results['matcher_cache_bytes'] = os.path.getsize(os.path.join(directory, 'terms.acm'))
+        
+        for mode in MODES:
+            command = [sys.executable, os.path.abspath(__file__), '--child', mode, '--data-dir', directory,
+                       '--lookups', str(args.lookups), '--seed', str(args.seed)]
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            results[mode] = json.loads(output)
+    
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+引用编号验证基准 - 线性扫描 vs 引用编号索引
+
+模拟一次回答的所有数据块：每个数据块验证若干引用编号，
+引用列表规模覆盖 20-200（MAX_REFERENCES_PER_RESPONSE）。
+
+用法:
+    python benchmarks/bench_reference_index.py --chunks 2000
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.citation_parser import CitationParser
+
+def linear_validate(citations: List[int], references: List[Dict]) -> List[int]:
+    """原实现：每个引用编号线性扫描引用列表"""
+    valid_citations = []
+    for cite_num in sorted(list(set(citations))):
+        if any(ref['id'] == cite_num for ref in references):
+            valid_citations.append(cite_num)
+    return valid_citations
+
+def build_workload(reference_count: int, chunks: int, seed: int = 42) -> List[List[int]]:
+    """每个数据块 1-3 个引用编号，约 10% 为无效编号"""
+    rng = random.Random(seed)
+    return [
+        [rng.randint(1, int(reference_count * 1.1)) for _ in range(rng.randint(1, 3))]
+        for _ in range(chunks)
+    ]
+
+def bench_size(parser: CitationParser, reference_count: int, chunks: int, repeat: int) -> Dict[str, Any]:
+    """测量一种引用列表规模下每个数据块的验证耗时（纳秒）"""
+    references = [{'id': i, 'title': f'Reference {i}'} for i in range(1, reference_count + 1)]
+    workload = build_workload(reference_count, chunks)
+    
+    def run(validate) -> float:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for citations in workload:
+                validate(citations)
+            best = min(best, time.perf_counter() - start)
+        return round(best / len(workload) * 1e9, 1)
+    
+    # 每个请求在 references_loaded 时构建一次索引
+    reference_index = parser.build_reference_index(references)
+    for citations in workload:
+        assert linear_validate(citations, references) == parser.validate_citations(
+            citations, references, reference_index
+        )
+    
+    linear = run(lambda citations: linear_validate(citations, references))
+    indexed = run(lambda citations: parser.validate_citations(citations, references, reference_index))
+    
+    return {
+        'references': reference_count,
+        'linear_ns_per_chunk': linear,
+        'indexed_ns_per_chunk': indexed,
+        'speedup': round(linear / indexed, 1) if indexed else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Citation validation microbenchmark')
+    parser.add_argument('--sizes', default='20,50,100,200', help='comma separated reference counts')
+    parser.add_argument('--chunks', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write JSON result to this file')
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    citation_parser = CitationParser()
+    
+    results = [
+        bench_size(citation_parser, int(size), args.chunks, args.repeat)
+        for size in args.sizes.split(',')
+    ]
+    
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
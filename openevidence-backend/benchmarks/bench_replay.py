@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+录制流回放基准 - 在真实上游流量形态上测量本服务每个数据块的开销
+
+读取 STREAM_RECORD_PATH 录制的上游流，不经过网络、不等待录制时间，分别测量：
+响应块反序列化（model_validate）、/api/ask 事件处理（AskStreamProcessor）、
+SSE 帧序列化（format_sse）以及 StreamingService 的处理耗时。
+
+用法:
+    STREAM_RECORD_PATH=recordings/ask.jsonl python app.py    # 录制
+    python benchmarks/bench_replay.py recordings/ask.jsonl --repeat 5
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai.types.chat import ChatCompletionChunk
+
+from models.stream_recording import load_recordings
+from services.ask_stream import AskStreamProcessor
+from services.streaming_service import StreamingService
+from utils.citation_parser import CitationParser
+
+def best_of(repeat: int, func: Callable[[], Any]) -> float:
+    """多次运行取最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def materialize(records: List[Dict[str, Any]]) -> List[List[Any]]:
+    """把录制的响应块还原为客户端得到的对象"""
+    return [
+        [ChatCompletionChunk.model_validate({**(record.get('envelope') or {}), **data})
+         for _, data in record['chunks']]
+        for record in records
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-chunk overhead on recorded upstream streams')
+    parser.add_argument('recording', help='JSONL file written with STREAM_RECORD_PATH')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write JSON result to this file')
+    args = parser.parse_args()
+    
+    # 与服务运行时一致：INFO 级日志（输出到内存，避免终端 IO 干扰）
+    logging.basicConfig(level=logging.INFO, stream=io.StringIO())
+    
+    records = [r for r in load_recordings(args.recording) if r['kind'] == 'stream']
+    if not records:
+        print(f"No recorded streams in {args.recording}")
+        return 1
+    
+    streams = materialize(records)
+    chunks = sum(len(stream) for stream in streams)
+    citation_parser = CitationParser()
+    processors: List[AskStreamProcessor] = []
+    
+    def process_all() -> None:
+        processors.clear()
+        for stream in streams:
+            processor = AskStreamProcessor(citation_parser, 'bench')
+            for chunk in stream:
+                processor.process_chunk(chunk)
+                if processor.finished:
+                    break
+            processors.append(processor)
+    
+    def serialize_all() -> None:
+        for processor in processors:
+            for event in processor.events:
+                AskStreamProcessor.format_sse(event)
+    
+    streaming_service = StreamingService(word_delay=0, citation_parser=citation_parser)
+    
+    def streaming_service_all() -> None:
+        for stream in streams:
+            for _ in streaming_service.process_baichuan_stream(iter(stream), 'bench'):
+                pass
+    
+    validate = best_of(args.repeat, lambda: materialize(records))
+    process = best_of(args.repeat, process_all)
+    events = sum(len(processor.events) for processor in processors)
+    serialize = best_of(args.repeat, serialize_all)
+    streaming = best_of(args.repeat, streaming_service_all)
+    
+    result = {
+        'streams': len(streams),
+        'chunks': chunks,
+        'events': events,
+        'recorded_bytes': os.path.getsize(args.recording),
+        'validate_us_per_chunk': round(validate / chunks * 1e6, 2),
+        'ask_process_us_per_chunk': round(process / chunks * 1e6, 2),
+        'sse_serialize_us_per_event': round(serialize / events * 1e6, 2) if events else None,
+        'streaming_service_us_per_chunk': round(streaming / chunks * 1e6, 2)
+    }
+    
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+近似问题缓存基准 - 测量大规模索引下的查找延迟和内存占用
+
+生成合成医学问题填充 SemanticQuestionIndex，分别测量
+改写问题（应命中）和新问题（应未命中）的查找延迟。
+
+用法:
+    python benchmarks/bench_semantic_cache.py --entries 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.semantic_cache import SemanticQuestionIndex
+
+SUBJECTS = ['高血压', '糖尿病', '冠心病', '哮喘', '慢性肾病', '甲亢', '痛风', '骨质疏松',
+            '抑郁症', '偏头痛', '类风湿关节炎', '慢阻肺', '房颤', '乙肝', '贫血', '失眠']
+DRUGS = ['阿司匹林', '二甲双胍', '阿托伐他汀', '氨氯地平', '布洛芬', '对乙酰氨基酚', '奥美拉唑',
+         '左甲状腺素', '华法林', '氯吡格雷', '阿莫西林', '头孢克肟', '泼尼松', '胰岛素']
+TEMPLATES = [
+    '{subject}患者{age}岁，请问是否可以服用{drug}？',
+    '{age}岁{subject}患者服用{drug}有哪些副作用？',
+    '{subject}合并{other}，{drug}的推荐剂量是多少？',
+    '{subject}患者长期使用{drug}需要监测哪些指标？',
+    '{age}岁{subject}患者使用{drug}期间能否饮酒？',
+]
+# 改写：同义替换 + 语气词，数字保持不变
+PARAPHRASES = [('请问', ''), ('是否可以', '可以'), ('服用', '吃'), ('？', '吗？')]
+
+def build_questions(count: int, seed: int = 42) -> List[str]:
+    """生成不重复的合成问题"""
+    rng = random.Random(seed)
+    questions = set()
+    while len(questions) < count:
+        template = rng.choice(TEMPLATES)
+        questions.add(template.format(
+            subject=rng.choice(SUBJECTS),
+            other=rng.choice(SUBJECTS),
+            drug=rng.choice(DRUGS),
+            age=rng.randint(1, 99)
+        ) + f'（病例{rng.randint(1, 10 ** 6)}）')
+    return list(questions)
+
+def paraphrase(question: str) -> str:
+    """对问题做简单改写"""
+    for source, target in PARAPHRASES:
+        question = question.replace(source, target)
+    return question
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算百分位数"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def measure_lookups(index: SemanticQuestionIndex, questions: List[str]) -> Dict[str, Any]:
+    """测量一组查找的延迟（毫秒）和命中数"""
+    latencies = []
+    hits = 0
+    for question in questions:
+        start = time.perf_counter()
+        match = index.lookup(question)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if match is not None:
+            hits += 1
+    return {
+        'lookups': len(questions),
+        'hits': hits,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Semantic question cache lookup benchmark')
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=500)
+    parser.add_argument('--dim', type=int, default=512)
+    parser.add_argument('--threshold', type=float, default=0.92)
+    parser.add_argument('--output', help='write JSON result to this file')
+    args = parser.parse_args()
+    
+    questions = build_questions(args.entries + args.lookups)
+    cached, unseen = questions[:args.entries], questions[args.entries:]
+    
+    index = SemanticQuestionIndex(capacity=args.entries, dim=args.dim, threshold=args.threshold)
+    
+    start = time.perf_counter()
+    for i, question in enumerate(cached):
+        index.add(question, f'key-{i}')
+    build_seconds = time.perf_counter() - start
+    
+    rng = random.Random(7)
+    result = {
+        'entries': len(index),
+        'dim': args.dim,
+        'threshold': args.threshold,
+        'build_seconds': round(build_seconds, 2),
+        'index_bytes': index.get_stats()['memory_bytes'],
+        'paraphrased': measure_lookups(index, [paraphrase(q) for q in rng.sample(cached, args.lookups)]),
+        'unseen': measure_lookups(index, unseen)
+    }
+    
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
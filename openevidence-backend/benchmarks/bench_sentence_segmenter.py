@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+句子切分基准 - 逐字符拼接 vs 下标扫描
+
+生成 10k–100k 字符的中英文混合医学回答（含缩写、小数、引用标记），测量：
+原实现（逐字符 += 并在每个标点处 strip + 缩写循环）、SentenceSegmenter.split，
+以及按增量文本块喂入 StreamingSentenceSegmenter 的耗时。
+
+用法:
+    python benchmarks/bench_sentence_segmenter.py --sizes 10000 30000 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sentence_segmenter import SentenceSegmenter, StreamingSentenceSegmenter
+
+SENTENCES = [
+    '对于系统性健康的患者，术后常规使用抗生素的获益有限^[1]^。',
+    '一项纳入 2,000 名患者的随机对照试验显示，术前单次给予 2.0 g 阿莫西林可将失败率降低 1.5%^[2,3]^。',
+    'Dr. Smith et al. reported similar findings, e.g. lower early failure rates vs. placebo.',
+    '高风险患者（如糖尿病、免疫抑制等）需个体化评估！',
+    '是否需要延长疗程？',
+    'The guideline recommends prophylaxis only in selected cases, i.e. when risk factors are present.',
+    '需要注意的是，抗生素耐药风险 etc. 也应纳入考虑。',
+]
+
+class LegacySegmenter:
+    """原实现：逐字符拼接，每个标点处检查是否为句末"""
+    
+    def __init__(self):
+        self.sentence_delimiters = ['。', '！', '？', '.', '!', '?']
+    
+    def segment_by_sentences(self, text: str) -> List[str]:
+        sentences = []
+        current_sentence = ""
+        for char in text:
+            current_sentence += char
+            if char in self.sentence_delimiters:
+                if self._is_sentence_end(current_sentence):
+                    sentences.append(current_sentence.strip())
+                    current_sentence = ""
+        if current_sentence.strip():
+            sentences.append(current_sentence.strip())
+        return [s for s in sentences if s]
+    
+    def _is_sentence_end(self, sentence: str) -> bool:
+        sentence = sentence.strip()
+        if len(sentence) < 3:
+            return False
+        if not sentence[-1] in self.sentence_delimiters:
+            return False
+        for abbr in ['Dr.', 'Prof.', 'etc.', 'vs.', 'e.g.', 'i.e.']:
+            if sentence.endswith(abbr):
+                return False
+        return True
+
+def build_text(size: int, seed: int) -> str:
+    """拼接随机句子直到达到指定长度（段落间插入空行）"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        sentence = rng.choice(SENTENCES)
+        if rng.random() < 0.1:
+            sentence += '\n\n'
+        parts.append(sentence)
+        length += len(sentence)
+    return ''.join(parts)[:size]
+
+def best_ms(func: Callable[[], Any], repeat: int) -> float:
+    """多次运行取最短耗时（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3)
+
+def stream_split(text: str, delta_chars: int) -> List[str]:
+    """按 delta_chars 个字符一块喂入流式切分器"""
+    segmenter = StreamingSentenceSegmenter()
+    sentences = []
+    for offset in range(0, len(text), delta_chars):
+        sentences.extend(segmenter.feed(text[offset:offset + delta_chars]))
+    sentences.extend(segmenter.flush())
+    return sentences
+
+def main():
+    parser = argparse.ArgumentParser(description='Sentence segmentation: per-char concatenation vs index scan')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 30000, 100000])
+    parser.add_argument('--delta-chars', type=int, default=4, help='chunk size for the streaming segmenter')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write JSON result to this file')
+    args = parser.parse_args()
+    
+    legacy = LegacySegmenter()
+    segmenter = SentenceSegmenter()
+    results: List[Dict[str, Any]] = []
+    
+    for size in args.sizes:
+        text = build_text(size, args.seed)
+        sentences = segmenter.split(text)
+        assert stream_split(text, args.delta_chars) == sentences
+        
+        legacy_ms = best_ms(lambda: legacy.segment_by_sentences(text), args.repeat)
+        split_ms = best_ms(lambda: segmenter.split(text), args.repeat)
+        results.append({
+            'chars': len(text),
+            'sentences': len(sentences),
+            'legacy_sentences': len(legacy.segment_by_sentences(text)),
+            'legacy_ms': legacy_ms,
+            'split_ms': split_ms,
+            'streaming_ms': best_ms(lambda: stream_split(text, args.delta_chars), args.repeat),
+            'speedup': round(legacy_ms / split_ms, 1) if split_ms else None
+        })
+    
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+SSE 帧序列化基准 - 每帧字节数和 CPU 耗时
+
+用模拟上游的引用和回答构造一次问答的事件序列（引用加载、内容块、完成事件），
+对比原实现（json.dumps 默认 ensure_ascii=True + 每个事件 datetime.now().isoformat()）
+与 utils.serialization 的各序列化器（UTF-8 字节 + 缓存的时间戳）。
+
+用法:
+    python benchmarks/bench_sse_serialization.py --answer-chars 1500 --references 12
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_baichuan_server import build_answer, build_evidence, split_tokens
+from services.ask_stream import event_name
+from utils import serialization
+from utils.citation_parser import CitationParser
+
+def build_events(answer_chars: int, references: int, seed: int) -> List[Dict[str, Any]]:
+    """一次问答的事件序列（不含时间戳，序列化时添加）"""
+    rng = random.Random(seed)
+    parsed = CitationParser().parse_baichuan_references(build_evidence(references, 300, rng))
+    answer = build_answer(answer_chars, references, 0.3, rng)
+    
+    events: List[Dict[str, Any]] = [{'type': 'thinking_complete', 'isComplete': False}]
+    events.append({'type': 'references_loaded', 'references': parsed, 'isComplete': False})
+    for token in split_tokens(answer, 4):
+        events.append({'content': token, 'citations': [], 'isComplete': False})
+    follow_ups = ['相关的最新研究进展如何？', '对于不同患者群体有什么特殊考虑？', '还有哪些需要了解的相关信息？']
+    events.append({'type': 'follow_up_ready', 'followUpQuestions': follow_ups, 'isComplete': False})
+    events.append({
+        'isComplete': True,
+        'references': parsed,
+        'followUpQuestions': follow_ups,
+        'sessionId': 'bench-session'
+    })
+    return events
+
+def legacy_frames(events: List[Dict[str, Any]]) -> List[bytes]:
+    """原实现：每个事件新建时间戳，json.dumps 转义中文，WSGI 层再编码为字节"""
+    return [
+        f"data: {json.dumps(dict(event, timestamp=datetime.now().isoformat()))}\n\n".encode('utf-8')
+        for event in events
+    ]
+
+def current_frames(events: List[Dict[str, Any]]) -> List[bytes]:
+    """当前实现：缓存的时间戳，序列化器直接输出 UTF-8 字节，带 id: / event: 字段"""
+    dumps = serialization.dumps
+    timestamp = serialization.timestamp
+    return [
+        f"id: {event_id}\nevent: {event_name(event)}\ndata: ".encode('utf-8')
+        + dumps(dict(event, timestamp=timestamp())) + b"\n\n"
+        for event_id, event in enumerate(events, 1)
+    ]
+
+def best_per_frame_us(func: Callable[[], List[bytes]], frames: int, repeat: int) -> float:
+    """多次运行取最短耗时，换算为每帧微秒"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return round(best / frames * 1e6, 3)
+
+def per_call_ns(func: Callable[[], Any], calls: int) -> float:
+    """单次调用的平均耗时（纳秒）"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return round((time.perf_counter() - start) / calls * 1e9, 1)
+
+def summarize(frames: List[bytes], events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """总字节数、JSON 部分字节数及内容帧 / 引用帧的平均字节数"""
+    content = [len(frame) for frame, event in zip(frames, events) if 'content' in event]
+    references = [len(frame) for frame, event in zip(frames, events) if event.get('type') == 'references_loaded']
+    return {
+        'total_bytes': sum(len(frame) for frame in frames),
+        'json_bytes': sum(len(frame) - frame.index(b'data: ') - 8 for frame in frames),
+        'content_frame_bytes': round(sum(content) / len(content), 1) if content else None,
+        'references_frame_bytes': references[0] if references else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='SSE frame serialization: bytes on wire and CPU per frame')
+    parser.add_argument('--answer-chars', type=int, default=1500)
+    parser.add_argument('--references', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write JSON result to this file')
+    args = parser.parse_args()
+    
+    events = build_events(args.answer_chars, args.references, args.seed)
+    frames = len(events)
+    
+    results: Dict[str, Any] = {
+        'events': frames,
+        'legacy': dict(
+            summarize(legacy_frames(events), events),
+            us_per_frame=best_per_frame_us(lambda: legacy_frames(events), frames, args.repeat)
+        )
+    }
+    for name in sorted(serialization.SERIALIZERS):
+        serialization.configure_serializer(name)
+        results[name] = dict(
+            summarize(current_frames(events), events),
+            us_per_frame=best_per_frame_us(lambda: current_frames(events), frames, args.repeat)
+        )
+    serialization.configure_serializer('auto')
+    
+    # 时间戳本身的开销
+    results['timestamp_ns'] = {
+        'datetime_now_isoformat': per_call_ns(lambda: datetime.now().isoformat(), 200000),
+        'coarse_timestamp': per_call_ns(serialization.timestamp, 200000)
+    }
+    
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
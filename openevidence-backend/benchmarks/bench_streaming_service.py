@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+StreamingService 每块开销基准 - 共享解析器 vs 每块新建解析器
+
+回放一段录制的 Baichuan 流（思考、引用、内容块、结束），词间延迟设为 0，
+测量 process_baichuan_stream 处理每个数据块的平均开销。
+"before" 模拟原实现：每个内容块都新建 CitationParser（含 INFO 日志）。
+
+用法:
+    python benchmarks/bench_streaming_service.py --chunks 2000
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.streaming_service import StreamingService
+from utils.citation_parser import CitationParser
+
+CONTENT_PARTS = ['术后一般不需要', '常规使用抗生素^[1]^。', '但高风险患者', '^[1,2]^需评估。']
+EVIDENCE = [
+    {'ref_num': 1, 'title': 'A', 'url': 'https://pubmed.ncbi.nlm.nih.gov/1/', 'publication_info': 'Lancet. 2023 Jan 5'},
+    {'ref_num': 2, 'title': 'B', 'url': '', 'publication_info': 'BMJ 2021'}
+]
+
+class LegacyStreamingService(StreamingService):
+    """原实现：每个内容块新建解析器"""
+    
+    def _process_content_with_citations(self, content, references, reference_index=None):
+        parser = CitationParser()
+        return parser.extract_citations_from_text(content, references, reference_index)
+
+def _chunk(delta: str = None, finish_reason: str = None, **extra) -> Any:
+    """构造与 OpenAI 流式响应块结构一致的对象"""
+    choice = SimpleNamespace(
+        delta=SimpleNamespace(content=delta),
+        finish_reason=finish_reason,
+        thinking=extra.get('thinking'),
+        grounding=extra.get('grounding')
+    )
+    return SimpleNamespace(choices=[choice])
+
+def record_stream(chunks: int) -> List[Any]:
+    """录制的流：思考完成 -> 引用 -> 内容块 -> 结束"""
+    stream = [
+        _chunk(thinking={'status': 'completed'}),
+        _chunk(grounding={'evidence': EVIDENCE})
+    ]
+    stream.extend(_chunk(delta=CONTENT_PARTS[i % len(CONTENT_PARTS)]) for i in range(chunks))
+    stream.append(_chunk(finish_reason='stop'))
+    return stream
+
+def bench(service: StreamingService, stream: List[Any], repeat: int) -> Dict[str, Any]:
+    """返回每个数据块的平均处理耗时（微秒）"""
+    best = float('inf')
+    frames = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = sum(1 for _ in service.process_baichuan_stream(iter(stream), '种植牙术后需要抗生素吗'))
+        best = min(best, time.perf_counter() - start)
+    return {'us_per_chunk': round(best / len(stream) * 1e6, 2), 'frames': frames}
+
+def main():
+    parser = argparse.ArgumentParser(description='StreamingService per-chunk overhead benchmark')
+    parser.add_argument('--chunks', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write JSON result to this file')
+    args = parser.parse_args()
+    
+    # 与服务运行时一致：INFO 级日志（输出到内存，避免终端 IO 干扰）
+    logging.basicConfig(level=logging.INFO, stream=io.StringIO())
+    
+    stream = record_stream(args.chunks)
+    before = bench(LegacyStreamingService(word_delay=0), stream, args.repeat)
+    after = bench(StreamingService(word_delay=0, citation_parser=CitationParser()), stream, args.repeat)
+    
+    result = {
+        'chunks': len(stream),
+        'before': before,
+        'after': after,
+        'speedup': round(before['us_per_chunk'] / after['us_per_chunk'], 2)
+    }
+    
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+文本结构分析基准 - 结束时整段分析 vs 随内容增量统计
+
+用模拟上游的回答（含 ^[n]^ 引用标记，按固定字符数切分为内容块），测量：
+结束时对完整回答调用 TextProcessor.analyze_text_structure 的耗时（原做法，阻塞完成事件），
+StreamingTextAnalyzer 每个内容块的增量开销，以及结束时 finalize 的耗时。
+
+用法:
+    python benchmarks/bench_text_structure.py --sizes 1500 10000 50000
+    python benchmarks/bench_text_structure.py --glossary data/medical_terms.oeg
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_baichuan_server import build_answer, split_tokens
+from utils.text_processor import TextProcessor
+
+def best_us(func, repeat: int) -> float:
+    """多次运行取最短耗时（微秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1e6, 3)
+
+def stream_once(processor: TextProcessor, deltas: List[str]) -> Dict[str, float]:
+    """逐块喂入分析器，分别计时增量部分和 finalize"""
+    analyzer = processor.create_stream_analyzer()
+    start = time.perf_counter()
+    for delta in deltas:
+        analyzer.feed(delta)
+    feed_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    analyzer.finalize()
+    return {'feed': feed_seconds, 'finalize': time.perf_counter() - start}
+
+def main():
+    parser = argparse.ArgumentParser(description='Text structure analysis: post-hoc pass vs incremental analyzer')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1500, 10000, 50000], help='answer lengths in chars')
+    parser.add_argument('--chars-per-token', type=int, default=2)
+    parser.add_argument('--glossary', default='', help='glossary file (utils.glossary format)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write JSON result to this file')
+    args = parser.parse_args()
+    
+    processor = TextProcessor(glossary_path=args.glossary)
+    rng = random.Random(args.seed)
+    results: List[Dict[str, Any]] = []
+    
+    for size in args.sizes:
+        answer = build_answer(size, 12, 0.3, rng)
+        deltas = split_tokens(answer, args.chars_per_token)
+        
+        analyzer = processor.create_stream_analyzer()
+        for delta in deltas:
+            analyzer.feed(delta)
+        assert analyzer.finalize()['statistics'] == processor.analyze_text_structure(answer)['statistics']
+        
+        runs = [stream_once(processor, deltas) for _ in range(args.repeat)]
+        feed_seconds = min(run['feed'] for run in runs)
+        results.append({
+            'chars': len(answer),
+            'deltas': len(deltas),
+            'post_hoc_us': best_us(lambda: processor.analyze_text_structure(answer), args.repeat),
+            'finalize_us': round(min(run['finalize'] for run in runs) * 1e6, 3),
+            'feed_total_us': round(feed_seconds * 1e6, 3),
+            'feed_per_delta_us': round(feed_seconds / len(deltas) * 1e6, 3)
+        })
+    
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+/api/ask 流式吞吐基准 - N 个并发 SSE 客户端持续压测
+
+每个客户端循环发起 /api/ask 流式请求（闭环：上一个流结束后立即发起下一个），
+统计首帧和首个内容事件耗时（TTFT）的 p50/p95/p99、内容事件间隔、每秒完成的流数，
+并采样被测服务进程（含子进程）的 CPU 和 RSS。结果写入 JSON，可与上一版本的结果对比。
+
+可以自动启动本地模拟上游（benchmarks/mock_baichuan_server.py）和被测服务，
+也可以压测已在运行的服务（通过 --server-pid 指定采样的进程）。
+--spawn / --url 可以重复给出、--clients 可以给出多个并发级别，用于对比 Flask（线程）
+与 ASGI（事件循环）两种服务模式的并发流容量：按目标依次启动（共用一个模拟上游），
+每个目标依次压测各并发级别，并逐行输出对比。
+默认每个请求的问题带不同的后缀（包含目标、并发级别和本次运行的时间），重复运行也不会命中问答缓存，
+也不会被合并为一次上游生成（single-flight）；--same-question 时所有请求使用同一个问题。
+CPU/RSS 采样需要安装 psutil，未安装时结果中对应字段为 null。
+自动启动的进程输出写入临时目录下的 load_benchmark_*.log。
+
+用法:
+    python benchmarks/load_benchmark.py --spawn asgi --mock --clients 100 --duration 30 \\
+        --output results/asgi.json
+    python benchmarks/load_benchmark.py --url http://127.0.0.1:8001 --server-pid 1234 \\
+        --clients 50 --requests 500 --baseline results/asgi.json --max-regression 0.1
+    python benchmarks/load_benchmark.py --spawn flask --spawn asgi --mock --clients 50,200,1000 \\
+        --duration 30 --output results/flask-vs-asgi.json
+    python benchmarks/load_benchmark.py --url flask=http://127.0.0.1:8001 --url asgi=http://127.0.0.1:8002 \\
+        --clients 50,200
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_QUESTION = "25岁健康女性种植牙，刚做完植入种植体，请问手术后是否需要服用抗生素？"
+
+# 对比基线时检查的指标：(路径, 越大越好)
+TRACKED_METRICS = [
+    ('ttft_ms.p50', False),
+    ('ttft_ms.p95', False),
+    ('ttft_ms.p99', False),
+    ('inter_chunk_ms.p95', False),
+    ('inter_chunk_ms.p99', False),
+    ('streams_per_second', True),
+    ('server.cpu_percent_mean', False),
+    ('server.rss_mb_max', False)
+]
+
+async def run_stream(client: httpx.AsyncClient, base_url: str, question: str, index: int) -> Dict[str, Any]:
+    """
+    发起单个流式请求并读取到完成事件
+    
+    Args:
+        client: HTTP 客户端
+        base_url: 被测服务地址
+        question: 问题
+        index: 请求序号
+        
+    Returns:
+        Dict: 首帧、首个内容事件、内容事件间隔和总耗时（秒）
+    """
+    payload = {
+        'question': question,
+        'userId': 'load_benchmark',
+        'sessionId': f'load_benchmark_{index}_{int(time.time())}'
+    }
+    start = time.perf_counter()
+    first_frame = None
+    first_content = None
+    last_content = None
+    gaps = []
+    content_frames = 0
+    
+    try:
+        async with client.stream('POST', f'{base_url}/api/ask', json=payload) as response:
+            if response.status_code != 200:
+                return {'ok': False, 'error': f'HTTP {response.status_code}'}
+            
+            async for line in response.aiter_lines():
+                if not line.startswith('data: '):
+                    continue
+                now = time.perf_counter()
+                if first_frame is None:
+                    first_frame = now - start
+                
+                data = json.loads(line[6:])
+                if data.get('error'):
+                    return {'ok': False, 'error': 'stream error'}
+                if data.get('content'):
+                    content_frames += 1
+                    if first_content is None:
+                        first_content = now - start
+                    else:
+                        gaps.append(now - last_content)
+                    last_content = now
+                if data.get('isComplete'):
+                    return {
+                        'ok': True,
+                        'error': None,
+                        'first_frame': first_frame,
+                        'first_content': first_content,
+                        'gaps': gaps,
+                        'content_frames': content_frames,
+                        'duration': time.perf_counter() - start
+                    }
+                    
+    except Exception as e:
+        return {'ok': False, 'error': type(e).__name__}
+    
+    return {'ok': False, 'error': 'incomplete'}
+
+class ResourceSampler:
+    """按固定间隔采样进程（含子进程）的 CPU 和 RSS"""
+    
+    def __init__(self, pids: List[int], interval: float = 0.5):
+        """
+        初始化
+        
+        Args:
+            pids: 被测进程 PID
+            interval: 采样间隔（秒）
+        """
+        self.pids = pids
+        self.interval = interval
+        self.cpu_samples: List[float] = []
+        self.rss_samples: List[float] = []
+        self._cpu_times: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    def _processes(self) -> List[Any]:
+        """存活的被测进程及其子进程"""
+        processes = []
+        for pid in self.pids:
+            try:
+                process = psutil.Process(pid)
+                processes.append(process)
+                processes.extend(process.children(recursive=True))
+            except psutil.Error:
+                continue
+        return processes
+    
+    def _sample(self, elapsed: float) -> None:
+        """记录一次采样（CPU 为距上次采样的占用百分比，多核可超过 100）"""
+        cpu_seconds = 0.0
+        rss = 0
+        for process in self._processes():
+            try:
+                times = process.cpu_times()
+                total = times.user + times.system
+                rss += process.memory_info().rss
+            except psutil.Error:
+                continue
+            cpu_seconds += total - self._cpu_times.get(process.pid, total)
+            self._cpu_times[process.pid] = total
+        
+        if elapsed > 0:
+            self.cpu_samples.append(cpu_seconds / elapsed * 100)
+        self.rss_samples.append(rss / (1024 * 1024))
+    
+    async def _run(self) -> None:
+        """采样循环"""
+        last = time.perf_counter()
+        self._sample(0.0)
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._sample(now - last)
+            last = now
+    
+    def start(self) -> None:
+        """开始采样（未安装 psutil 或没有被测进程时不采样）"""
+        if psutil is not None and self.pids:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self) -> None:
+        """停止采样"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        采样汇总
+        
+        Returns:
+            Dict: CPU 平均/最大占用（%）和 RSS 起始/最大/结束（MB），没有采样时为 null
+        """
+        return {
+            'cpu_percent_mean': round(statistics.mean(self.cpu_samples), 1) if self.cpu_samples else None,
+            'cpu_percent_max': round(max(self.cpu_samples), 1) if self.cpu_samples else None,
+            'rss_mb_start': round(self.rss_samples[0], 1) if self.rss_samples else None,
+            'rss_mb_max': round(max(self.rss_samples), 1) if self.rss_samples else None,
+            'rss_mb_end': round(self.rss_samples[-1], 1) if self.rss_samples else None,
+            'samples': len(self.rss_samples)
+        }
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def distribution(values: List[float]) -> Dict[str, Optional[float]]:
+    """秒 -> 毫秒分布（平均值和 p50/p95/p99）"""
+    if not values:
+        return {'mean': None, 'p50': None, 'p95': None, 'p99': None}
+    return {
+        'mean': round(statistics.mean(values) * 1000, 2),
+        'p50': round(percentile(values, 50) * 1000, 2),
+        'p95': round(percentile(values, 95) * 1000, 2),
+        'p99': round(percentile(values, 99) * 1000, 2)
+    }
+
+async def run_load(args: argparse.Namespace, name: str, base_url: str, pids: List[int],
+                   clients: int) -> Dict[str, Any]:
+    """
+    预热后以 clients 个并发客户端压测，直到达到请求数或持续时间
+    
+    Args:
+        args: 命令行参数
+        name: 目标名称
+        base_url: 被测服务地址
+        pids: 采样 CPU/RSS 的进程
+        clients: 并发客户端数
+        
+    Returns:
+        Dict: 汇总结果
+    """
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    counter = itertools.count()
+    # 默认每个请求使用不同的问题（重复运行也不同），避免命中问答缓存或合并到同一次上游生成
+    run_tag = f"{name}-c{clients}-{int(time.time())}"
+    
+    def next_question() -> Tuple[int, str]:
+        index = next(counter)
+        question = args.question if args.same_question else f"{args.question}（{run_tag}-{index}）"
+        return index, question
+    
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        if args.warmup:
+            warmup = [next_question() for _ in range(args.warmup)]
+            await asyncio.gather(*[run_stream(client, base_url, q, i) for i, q in warmup])
+        
+        results: List[Dict[str, Any]] = []
+        issued = 0
+        sampler = ResourceSampler(pids, args.sample_interval)
+        start = time.perf_counter()
+        deadline = start + args.duration if args.duration else None
+        
+        async def worker() -> None:
+            nonlocal issued
+            while True:
+                if args.requests and issued >= args.requests:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                issued += 1
+                index, question = next_question()
+                results.append(await run_stream(client, base_url, question, index))
+        
+        sampler.start()
+        await asyncio.gather(*[worker() for _ in range(clients)])
+        wall = time.perf_counter() - start
+        await sampler.stop()
+    
+    ok = [r for r in results if r['ok']]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if not r['ok']:
+            errors[r['error']] = errors.get(r['error'], 0) + 1
+    
+    return {
+        'clients': clients,
+        'requests': len(results),
+        'completed': len(ok),
+        'failed': len(results) - len(ok),
+        'errors': errors,
+        'wall_seconds': round(wall, 3),
+        'streams_per_second': round(len(ok) / wall, 2) if wall > 0 else 0.0,
+        'ttfb_ms': distribution([r['first_frame'] for r in ok if r['first_frame'] is not None]),
+        'ttft_ms': distribution([r['first_content'] for r in ok if r['first_content'] is not None]),
+        'inter_chunk_ms': distribution([gap for r in ok for gap in r['gaps']]),
+        'duration_ms': distribution([r['duration'] for r in ok]),
+        'content_frames_mean': round(statistics.mean(r['content_frames'] for r in ok), 1) if ok else None,
+        'server': sampler.summary()
+    }
+
+def free_port() -> int:
+    """获取一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    """等待子进程的服务可以访问"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited with code {process.returncode} before {url} was ready")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+def spawn(command: List[str], env: Dict[str, str], ready_url: str, log_name: str) -> subprocess.Popen:
+    """启动子进程并等待就绪（输出写入临时目录下的日志文件）"""
+    with open(os.path.join(tempfile.gettempdir(), log_name), 'w', encoding='utf-8') as log:
+        process = subprocess.Popen(command, cwd=BACKEND_DIR, env={**os.environ, **env},
+                                   stdout=log, stderr=subprocess.STDOUT)
+    wait_ready(ready_url, process)
+    return process
+
+def stop(process: subprocess.Popen) -> None:
+    """结束子进程"""
+    process.terminate()
+    process.wait(timeout=10)
+
+def parse_targets(urls: List[str], spawns: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """
+    解析压测目标
+    
+    Args:
+        urls: 已在运行的服务地址（可带 name= 前缀）
+        spawns: 自动启动的服务模式（flask / asgi）
+        
+    Returns:
+        List: (名称, 地址)，自动启动的服务地址为 None
+    """
+    targets = []
+    for value in urls:
+        name, sep, url = value.partition('=')
+        if not sep or '://' in name:
+            name, url = value, value
+        targets.append((name, url.rstrip('/')))
+    targets.extend((kind, None) for kind in spawns)
+    return targets
+
+def print_run(name: str, summary: Dict[str, Any]) -> None:
+    """输出一次运行的对比行"""
+    print(
+        f"{name:>8} clients={summary['clients']:<5} completed={summary['completed']:<6} "
+        f"failed={summary['failed']:<5} streams/s={summary['streams_per_second']:<8} "
+        f"ttft p50={summary['ttft_ms']['p50']}ms p95={summary['ttft_ms']['p95']}ms "
+        f"cpu={summary['server']['cpu_percent_mean']}% errors={summary['errors']}"
+    )
+
+def lookup(summary: Dict[str, Any], path: str) -> Optional[float]:
+    """按 a.b 路径读取汇总中的数值"""
+    value: Any = summary
+    for key in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+def compare(summary: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """
+    与基线结果对比并打印变化
+    
+    Args:
+        summary: 本次汇总
+        baseline: 基线汇总
+        max_regression: 允许的最大相对退化（如 0.1 表示 10%）
+        
+    Returns:
+        List[str]: 超过允许退化的指标
+    """
+    regressions = []
+    print(f"\n{'metric':<26}{'baseline':>12}{'current':>12}{'change':>10}")
+    for path, higher_is_better in TRACKED_METRICS:
+        before, after = lookup(baseline, path), lookup(summary, path)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        flag = ''
+        if worse > max_regression:
+            regressions.append(path)
+            flag = '  REGRESSION'
+        print(f"{path:<26}{before:>12}{after:>12}{change:>+10.1%}{flag}")
+    return regressions
+
+def git_commit() -> Optional[str]:
+    """当前代码版本"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+def baseline_summary(baseline: Dict[str, Any], target: str, clients: int) -> Optional[Dict[str, Any]]:
+    """基线结果中与本次运行对应的汇总（只有一次运行的基线与任何运行对应）"""
+    if 'runs' not in baseline:
+        return baseline.get('summary', baseline)
+    for run in baseline['runs']:
+        if run['target'] == target and run['clients'] == clients:
+            return run['summary']
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description='/api/ask streaming throughput benchmark')
+    parser.add_argument('--url', action='append', default=[],
+                        help='base URL of a running server, optionally name=url; may be repeated')
+    parser.add_argument('--server-pid', type=int, action='append', default=[],
+                        help='PID to sample for CPU/RSS (children included) during --url runs, may be repeated')
+    parser.add_argument('--spawn', choices=['flask', 'asgi'], action='append', default=[],
+                        help='start the server under test; repeat to compare flask and asgi')
+    parser.add_argument('--mock', action='store_true', help='start the local mock upstream for the spawned server')
+    parser.add_argument('--mock-args', default='', help='extra mock server arguments, e.g. "--token-rate 100"')
+    parser.add_argument('--clients', default='50', help='concurrent SSE clients, comma separated levels')
+    parser.add_argument('--requests', type=int, default=0, help='total streams per run (0 = run for --duration)')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run when --requests is 0')
+    parser.add_argument('--warmup', type=int, default=10, help='streams to run before measuring')
+    parser.add_argument('--question', default=DEFAULT_QUESTION)
+    parser.add_argument('--same-question', action='store_true',
+                        help='reuse one question (exercises the answer cache and single-flight)')
+    parser.add_argument('--timeout', type=float, default=120.0, help='per-request timeout in seconds')
+    parser.add_argument('--sample-interval', type=float, default=0.5, help='CPU/RSS sampling interval in seconds')
+    parser.add_argument('--output', help='write JSON result to this file')
+    parser.add_argument('--baseline', help='JSON result of a previous run to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.1,
+                        help='relative regression that fails the run when --baseline is given')
+    args = parser.parse_args()
+    
+    if not args.url and not args.spawn:
+        parser.error('either --url or --spawn is required')
+    if args.requests:
+        args.duration = 0.0
+    levels = [int(level) for level in args.clients.split(',')]
+    targets = parse_targets(args.url, args.spawn)
+    
+    runs = []
+    mock = None
+    try:
+        env = {}
+        if args.spawn and args.mock:
+            mock_port = free_port()
+            mock = spawn(
+                [sys.executable, 'benchmarks/mock_baichuan_server.py', '--port', str(mock_port)]
+                + shlex.split(args.mock_args),
+                {}, f'http://127.0.0.1:{mock_port}/v1/models', 'load_benchmark_mock.log'
+            )
+            env = {'BAICHUAN_API_KEY': 'mock', 'BAICHUAN_BASE_URL': f'http://127.0.0.1:{mock_port}/v1/'}
+        
+        for name, base_url in targets:
+            server = None
+            pids = list(args.server_pid)
+            if base_url is None:
+                # 依次启动被测服务，避免两种模式同时运行时争用 CPU
+                port = free_port()
+                script = 'app.py' if name == 'flask' else 'asgi.py'
+                server = spawn([sys.executable, script],
+                               {**env, 'HOST': '127.0.0.1', 'PORT': str(port), 'FLASK_ENV': 'production'},
+                               f'http://127.0.0.1:{port}/health/live', f'load_benchmark_{name}.log')
+                base_url = f'http://127.0.0.1:{port}'
+                pids = [server.pid]
+            
+            try:
+                for clients in levels:
+                    summary = asyncio.run(run_load(args, name, base_url, pids, clients))
+                    runs.append({'target': name, 'clients': clients, 'summary': summary})
+                    print_run(name, summary)
+            finally:
+                if server is not None:
+                    stop(server)
+    finally:
+        if mock is not None:
+            stop(mock)
+    
+    result: Dict[str, Any] = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'targets': [name for name, _ in targets],
+            'mock_upstream': bool(args.mock),
+            'args': vars(args)
+        }
+    }
+    # 只有一次运行时保持单个 summary 的格式，便于作为基线
+    if len(runs) == 1:
+        result['summary'] = runs[0]['summary']
+    else:
+        result['runs'] = runs
+    print(json.dumps(result.get('summary', runs), ensure_ascii=False, indent=2))
+    
+    if args.output:
+        directory = os.path.dirname(os.path.abspath(args.output))
+        os.makedirs(directory, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    
+    exit_code = 0 if all(run['summary']['failed'] == 0 for run in runs) else 1
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = []
+        for run in runs:
+            before = baseline_summary(baseline, run['target'], run['clients'])
+            if before is None:
+                continue
+            print(f"\n{run['target']} clients={run['clients']}")
+            regressions.extend(f"{run['target']}/c{run['clients']}/{path}"
+                               for path in compare(run['summary'], before, args.max_regression))
+        if regressions:
+            print(f"\nRegressed beyond {args.max_regression:.0%}: {', '.join(regressions)}")
+            exit_code = 1
+    
+    return exit_code
+
+if __name__ == '__main__':
+    sys.exit(main())
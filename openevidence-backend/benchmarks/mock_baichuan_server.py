@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+本地 Baichuan 模拟服务 - OpenAI 兼容接口，用于压测和离线基准
+
+按 Baichuan M2 Plus 的流式结构输出：思考步骤（thinking）、引用（grounding.evidence）、
+带 ^[n]^ 引用标记的内容增量（标记会被切分到相邻的块中），最后是 finish_reason == 'stop' 和 [DONE]。
+非流式请求返回后续问题（提示词中包含“后续问题”时）或带 grounding 的完整回答。
+
+输出速率、抖动、故障注入（HTTP 错误、中途断开、中途停顿）和负载大小均可配置，
+运行中也可以通过 POST /mock/config 修改。任意 API Key 都会被接受。
+
+用法:
+    python benchmarks/mock_baichuan_server.py --port 9100 --token-rate 80 --jitter 0.3
+    BAICHUAN_API_KEY=mock BAICHUAN_BASE_URL=http://127.0.0.1:9100/v1/ python app.py
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = 'Baichuan-M2-Plus'
+
+ANSWER_SENTENCES = [
+    '健康成年人接受单颗种植体植入时，术后常规使用抗生素的获益有限',
+    '多项随机对照试验显示，术前单次预防性给药可以降低早期种植体失败率',
+    '术后延长抗生素疗程并未进一步降低感染风险，反而增加不良反应和耐药风险',
+    '对于糖尿病控制不佳、免疫抑制或需要大范围植骨的患者，应个体化评估感染风险',
+    '阿莫西林是最常用的预防用药，青霉素过敏者可选择克林霉素或阿奇霉素',
+    '术后应保持口腔卫生，可使用氯己定含漱液并避免术区受压',
+    '如出现持续肿胀、发热或脓性渗出，应及时复诊并根据临床表现调整治疗',
+    '现有证据的质量为中等，不同研究在给药方案和随访时间上存在差异'
+]
+
+EVIDENCE_TITLES = [
+    ('Antibiotic prophylaxis in dental implant surgery: a systematic review', '种植手术抗生素预防的系统评价'),
+    ('Postoperative antibiotics and early implant failure: a randomized trial', '术后抗生素与早期种植体失败的随机试验'),
+    ('Antimicrobial resistance in oral surgery', '口腔外科中的抗菌药物耐药'),
+    ('Infection risk factors after guided bone regeneration', '引导骨再生术后感染的危险因素'),
+    ('Chlorhexidine rinse after implant placement', '种植体植入后的氯己定含漱')
+]
+
+JOURNALS = ['Lancet', 'BMJ', 'JAMA', 'Clin Oral Implants Res', 'J Dent Res', 'Cochrane Database Syst Rev']
+
+EVIDENCE_CLASSES = ['systematic_review', 'rct', 'cohort', 'guideline']
+
+FOLLOW_UP_QUESTIONS = [
+    '青霉素过敏患者种植手术应如何选择预防用药？',
+    '糖尿病患者种植术后感染风险有多高？',
+    '种植术后出现哪些症状需要及时复诊？'
+]
+
+THINKING_LABELS = ['理解问题', '检索文献', '评估证据', '整合回答']
+
+class MockSettings:
+    """模拟服务配置（运行中可修改）"""
+    
+    def __init__(self, token_rate: float = 50.0, jitter: float = 0.2, chars_per_token: int = 2,
+                 connect_delay: float = 0.05, thinking_steps: int = 3, thinking_step_delay: float = 0.2,
+                 answer_chars: int = 600, references: int = 5, abstract_chars: int = 300,
+                 citation_rate: float = 0.6, completion_delay: float = 0.5,
+                 error_rate: float = 0.0, error_status: int = 500, disconnect_rate: float = 0.0,
+                 stall_rate: float = 0.0, stall_seconds: float = 5.0, seed: Optional[int] = None):
+        """
+        初始化配置
+        
+        Args:
+            token_rate: 内容输出速率（块/秒，0 表示不限速）
+            jitter: 块间隔的相对抖动（0-1）
+            chars_per_token: 每个内容块的字符数
+            connect_delay: 返回响应头前的延迟（秒）
+            thinking_steps: 思考步骤数
+            thinking_step_delay: 每个思考步骤的耗时（秒）
+            answer_chars: 回答长度（字符，不含引用标记）
+            references: 引用数量
+            abstract_chars: 每条引用的摘要长度（字符）
+            citation_rate: 句末附加引用标记的概率
+            completion_delay: 非流式请求的耗时（秒）
+            error_rate: 直接返回 HTTP 错误的概率
+            error_status: 注入错误的状态码（429 时附带 Retry-After）
+            disconnect_rate: 输出内容中途断开连接的概率
+            stall_rate: 输出内容中途停顿的概率
+            stall_seconds: 停顿时长（秒）
+            seed: 随机种子（设置后每个请求的输出可复现）
+        """
+        self.token_rate = token_rate
+        self.jitter = jitter
+        self.chars_per_token = chars_per_token
+        self.connect_delay = connect_delay
+        self.thinking_steps = thinking_steps
+        self.thinking_step_delay = thinking_step_delay
+        self.answer_chars = answer_chars
+        self.references = references
+        self.abstract_chars = abstract_chars
+        self.citation_rate = citation_rate
+        self.completion_delay = completion_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.disconnect_rate = disconnect_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.seed = seed
+    
+    def update(self, **fields: Any) -> Dict[str, Any]:
+        """
+        修改配置（按原字段类型转换）
+        
+        Args:
+            **fields: 配置项
+            
+        Returns:
+            Dict: 修改后的配置
+            
+        Raises:
+            ValueError: 未知配置项
+        """
+        for name, value in fields.items():
+            if name not in self.__dict__:
+                raise ValueError(f"Unknown mock setting: {name}")
+            current = getattr(self, name)
+            if value is not None and current is not None:
+                value = type(current)(value)
+            setattr(self, name, value)
+        return self.to_dict()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """配置字典"""
+        return dict(self.__dict__)
+
+class InjectedDisconnect(Exception):
+    """注入的中途断开（使连接在未发送完整响应体时关闭）"""
+
+class MockBaichuanServer:
+    """OpenAI 兼容的 Baichuan 模拟服务"""
+    
+    def __init__(self, settings: Optional[MockSettings] = None):
+        """
+        初始化
+        
+        Args:
+            settings: 模拟服务配置
+        """
+        self.settings = settings or MockSettings()
+        self._request_ids = itertools.count(1)
+        self.stats = {
+            'requests': 0,
+            'streams': 0,
+            'streams_open': 0,
+            'completions': 0,
+            'chunks': 0,
+            'injected_errors': 0,
+            'injected_disconnects': 0,
+            'injected_stalls': 0
+        }
+        self.app = Starlette(routes=[
+            Route('/v1/chat/completions', self.chat_completions, methods=['POST']),
+            Route('/v1/models', self.models, methods=['GET']),
+            Route('/mock/stats', self.get_stats, methods=['GET']),
+            Route('/mock/config', self.config, methods=['GET', 'POST'])
+        ])
+    
+    def _rng(self, request_number: int) -> random.Random:
+        """请求的随机数生成器（设置种子时按请求序号确定）"""
+        if self.settings.seed is None:
+            return random.Random()
+        return random.Random(f"{self.settings.seed}:{request_number}")
+    
+    async def chat_completions(self, request: Request):
+        """POST /v1/chat/completions"""
+        body = await request.json()
+        request_number = next(self._request_ids)
+        rng = self._rng(request_number)
+        settings = self.settings
+        self.stats['requests'] += 1
+        
+        await asyncio.sleep(settings.connect_delay)
+        
+        if rng.random() < settings.error_rate:
+            self.stats['injected_errors'] += 1
+            return self._error_response(settings.error_status)
+        
+        completion_id = f"chatcmpl-mock-{request_number}"
+        model = body.get('model') or MODEL_NAME
+        
+        if body.get('stream'):
+            self.stats['streams'] += 1
+            return StreamingResponse(
+                self._stream(completion_id, model, rng),
+                media_type='text/event-stream',
+                headers={'Cache-Control': 'no-cache'}
+            )
+        
+        self.stats['completions'] += 1
+        await asyncio.sleep(settings.completion_delay)
+        return JSONResponse(self._completion(completion_id, model, body.get('messages', []), rng))
+    
+    async def models(self, request: Request):
+        """GET /v1/models（健康检查探测）"""
+        return JSONResponse({
+            'object': 'list',
+            'data': [{'id': MODEL_NAME, 'object': 'model', 'created': 0, 'owned_by': 'baichuan'}]
+        })
+    
+    async def get_stats(self, request: Request):
+        """GET /mock/stats"""
+        return JSONResponse(self.stats)
+    
+    async def config(self, request: Request):
+        """GET/POST /mock/config：查看或修改配置"""
+        if request.method == 'POST':
+            try:
+                return JSONResponse(self.settings.update(**await request.json()))
+            except (ValueError, TypeError) as e:
+                return JSONResponse({'error': str(e)}, status_code=400)
+        return JSONResponse(self.settings.to_dict())
+    
+    def _error_response(self, status: int) -> JSONResponse:
+        """OpenAI 格式的错误响应"""
+        headers = {'Retry-After': '1'} if status == 429 else None
+        return JSONResponse(
+            {'error': {'message': f'Injected upstream error ({status})', 'type': 'mock_error', 'code': status}},
+            status_code=status,
+            headers=headers
+        )
+    
+    async def _stream(self, completion_id: str, model: str, rng: random.Random) -> AsyncIterator[str]:
+        """生成一次流式回答"""
+        settings = self.settings
+        created = int(time.time())
+        
+        def frame(delta: Optional[Dict[str, Any]] = None, finish_reason: Optional[str] = None,
+                  usage: Optional[Dict[str, int]] = None, **extra: Any) -> str:
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta or {}, 'finish_reason': finish_reason, **extra}]
+            }
+            if usage:
+                chunk['usage'] = usage
+            self.stats['chunks'] += 1
+            return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        
+        evidence = build_evidence(settings.references, settings.abstract_chars, rng)
+        tokens = split_tokens(
+            build_answer(settings.answer_chars, len(evidence), settings.citation_rate, rng),
+            settings.chars_per_token
+        )
+        disconnect_at = rng.randrange(len(tokens)) if tokens and rng.random() < settings.disconnect_rate else None
+        stall_at = rng.randrange(len(tokens)) if tokens and rng.random() < settings.stall_rate else None
+        
+        self.stats['streams_open'] += 1
+        try:
+            yield frame({'role': 'assistant'})
+            
+            # 思考阶段
+            steps = [{'label': label, 'status': 'pending'}
+                     for label in itertools.islice(itertools.cycle(THINKING_LABELS), settings.thinking_steps)]
+            for step in steps:
+                step['status'] = 'completed'
+                yield frame(thinking={'status': 'in_progress', 'steps': [dict(s) for s in steps]})
+                await asyncio.sleep(settings.thinking_step_delay)
+            yield frame(thinking={'status': 'completed'})
+            
+            # 引用
+            if evidence:
+                yield frame(grounding={'evidence': evidence})
+            
+            # 内容增量（按绝对时间排期，避免 sleep 误差累积）
+            interval = 1.0 / settings.token_rate if settings.token_rate > 0 else 0.0
+            deadline = time.monotonic()
+            for index, token in enumerate(tokens):
+                if index == disconnect_at:
+                    self.stats['injected_disconnects'] += 1
+                    raise InjectedDisconnect(f"{completion_id} disconnected after {index} tokens")
+                if index == stall_at:
+                    self.stats['injected_stalls'] += 1
+                    await asyncio.sleep(settings.stall_seconds)
+                    deadline = time.monotonic()
+                
+                if interval:
+                    deadline += interval * (1 + rng.uniform(-settings.jitter, settings.jitter))
+                    delay = deadline - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                yield frame({'content': token})
+            
+            yield frame(finish_reason='stop', usage={
+                'prompt_tokens': 64,
+                'completion_tokens': len(tokens),
+                'total_tokens': 64 + len(tokens)
+            })
+            yield 'data: [DONE]\n\n'
+        finally:
+            self.stats['streams_open'] -= 1
+    
+    def _completion(self, completion_id: str, model: str, messages: List[Dict[str, Any]],
+                    rng: random.Random) -> Dict[str, Any]:
+        """非流式响应：后续问题或带 grounding 的完整回答"""
+        prompt = messages[-1].get('content', '') if messages else ''
+        if '后续问题' in prompt:
+            message = {'role': 'assistant', 'content': '\n'.join(FOLLOW_UP_QUESTIONS)}
+        else:
+            evidence = build_evidence(self.settings.references, self.settings.abstract_chars, rng)
+            message = {
+                'role': 'assistant',
+                'content': build_answer(self.settings.answer_chars, len(evidence), self.settings.citation_rate, rng),
+                'grounding': {'evidence': evidence}
+            }
+        
+        completion_tokens = len(message['content']) // max(self.settings.chars_per_token, 1)
+        return {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': message, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': 64, 'completion_tokens': completion_tokens,
+                      'total_tokens': 64 + completion_tokens}
+        }
+
+def build_evidence(count: int, abstract_chars: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    生成 grounding.evidence 引用列表
+    
+    Args:
+        count: 引用数量
+        abstract_chars: 摘要长度（字符）
+        rng: 随机数生成器
+        
+    Returns:
+        List[Dict]: Baichuan 格式的引用
+    """
+    evidence = []
+    for ref_num in range(1, count + 1):
+        title, title_zh = EVIDENCE_TITLES[(ref_num - 1) % len(EVIDENCE_TITLES)]
+        year = rng.randint(2015, 2025)
+        pmid = rng.randint(20000000, 39999999)
+        abstract = ''.join(itertools.islice(itertools.cycle(' '.join(ANSWER_SENTENCES)), abstract_chars))
+        evidence.append({
+            'ref_num': ref_num,
+            'title': title,
+            'title_zh': title_zh,
+            'url': f'https://pubmed.ncbi.nlm.nih.gov/{pmid}/',
+            'author': 'Zhang W, Li X, Smith J',
+            'publication_info': f"{rng.choice(JOURNALS)}. {year} Mar {rng.randint(1, 28)}. "
+                                f"doi: 10.{rng.randint(1000, 9999)}/mock.{year}.{ref_num}",
+            'evidence_class': rng.choice(EVIDENCE_CLASSES),
+            'abstract': abstract
+        })
+    return evidence
+
+def build_answer(length: int, references: int, citation_rate: float, rng: random.Random) -> str:
+    """
+    生成带 ^[n]^ 引用标记的回答正文
+    
+    Args:
+        length: 回答长度（字符，不含引用标记）
+        references: 可引用的引用数量
+        citation_rate: 句末附加引用标记的概率
+        rng: 随机数生成器
+        
+    Returns:
+        str: 回答正文
+    """
+    parts = []
+    written = 0
+    while written < length:
+        sentence = rng.choice(ANSWER_SENTENCES)[:length - written]
+        written += len(sentence)
+        parts.append(sentence)
+        if references and rng.random() < citation_rate:
+            cited = sorted(rng.sample(range(1, references + 1), min(references, rng.randint(1, 2))))
+            parts.append(f"^[{','.join(str(n) for n in cited)}]^")
+        parts.append('。')
+    return ''.join(parts)
+
+def split_tokens(text: str, chars_per_token: int) -> List[str]:
+    """按固定字符数切分内容块（引用标记可能被切分到相邻块中）"""
+    size = max(chars_per_token, 1)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Baichuan-compatible mock server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.getenv('MOCK_PORT', 9100)))
+    parser.add_argument('--token-rate', type=float, default=50.0, help='content chunks per second (0 = unlimited)')
+    parser.add_argument('--jitter', type=float, default=0.2, help='relative inter-chunk jitter (0-1)')
+    parser.add_argument('--chars-per-token', type=int, default=2)
+    parser.add_argument('--connect-delay', type=float, default=0.05, help='seconds before response headers')
+    parser.add_argument('--thinking-steps', type=int, default=3)
+    parser.add_argument('--thinking-step-delay', type=float, default=0.2)
+    parser.add_argument('--answer-chars', type=int, default=600)
+    parser.add_argument('--references', type=int, default=5)
+    parser.add_argument('--abstract-chars', type=int, default=300)
+    parser.add_argument('--citation-rate', type=float, default=0.6)
+    parser.add_argument('--completion-delay', type=float, default=0.5, help='non-streaming response seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='probability of an HTTP error response')
+    parser.add_argument('--error-status', type=int, default=500)
+    parser.add_argument('--disconnect-rate', type=float, default=0.0, help='probability of a mid-stream disconnect')
+    parser.add_argument('--stall-rate', type=float, default=0.0, help='probability of a mid-stream stall')
+    parser.add_argument('--stall-seconds', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    
+    import uvicorn
+    
+    logging.basicConfig(level=logging.INFO)
+    settings = MockSettings(**{
+        name: value for name, value in vars(args).items() if name not in ('host', 'port')
+    })
+    server = MockBaichuanServer(settings)
+    
+    logger.info(f"Mock Baichuan server on http://{args.host}:{args.port}/v1/ ({json.dumps(settings.to_dict())})")
+    uvicorn.run(server.app, host=args.host, port=args.port, log_level='warning')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
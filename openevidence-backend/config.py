@@ -19,6 +19,30 @@ class Config:
     BAICHUAN_BASE_URL = os.environ.get('BAICHUAN_BASE_URL', 'https://api.baichuan-ai.com/v1/')
     BAICHUAN_MODEL = 'Baichuan-M2-Plus'
     
+    # Baichuan HTTP 连接池配置
+    BAICHUAN_MAX_CONNECTIONS = int(os.environ.get('BAICHUAN_MAX_CONNECTIONS', 100))
+    BAICHUAN_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('BAICHUAN_MAX_KEEPALIVE_CONNECTIONS', 20))
+    BAICHUAN_KEEPALIVE_EXPIRY = float(os.environ.get('BAICHUAN_KEEPALIVE_EXPIRY', 30.0))
+    BAICHUAN_HTTP2 = os.environ.get('BAICHUAN_HTTP2', 'false').lower() == 'true'
+    BAICHUAN_CONNECT_TIMEOUT = float(os.environ.get('BAICHUAN_CONNECT_TIMEOUT', 5.0))
+    BAICHUAN_READ_TIMEOUT = float(os.environ.get('BAICHUAN_READ_TIMEOUT', 120.0))
+    BAICHUAN_WRITE_TIMEOUT = float(os.environ.get('BAICHUAN_WRITE_TIMEOUT', 10.0))
+    BAICHUAN_POOL_TIMEOUT = float(os.environ.get('BAICHUAN_POOL_TIMEOUT', 10.0))
+    
+    # 上游流录制 / 回放配置（用于离线性能测试，二者不应同时开启）
+    STREAM_RECORD_PATH = os.environ.get('STREAM_RECORD_PATH', '')
+    STREAM_RECORD_SAMPLE_RATE = float(os.environ.get('STREAM_RECORD_SAMPLE_RATE', 1.0))
+    STREAM_RECORD_MAX_RECORDS = int(os.environ.get('STREAM_RECORD_MAX_RECORDS', 0))
+    STREAM_REPLAY_PATH = os.environ.get('STREAM_REPLAY_PATH', '')
+    STREAM_REPLAY_SPEED = float(os.environ.get('STREAM_REPLAY_SPEED', 1.0))
+    
+    # 上游健康监控配置
+    HEALTH_CHECK_INTERVAL = float(os.environ.get('HEALTH_CHECK_INTERVAL', 30.0))
+    HEALTH_CHECK_TIMEOUT = float(os.environ.get('HEALTH_CHECK_TIMEOUT', 5.0))
+    HEALTH_CHECK_WINDOW = int(os.environ.get('HEALTH_CHECK_WINDOW', 20))
+    HEALTH_CHECK_STALE_AFTER = float(os.environ.get('HEALTH_CHECK_STALE_AFTER', 90.0))
+    HEALTH_PROBE_MODE = os.environ.get('HEALTH_PROBE_MODE', 'models')  # models / completion
+    
     # CORS 配置
     CORS_ORIGINS = [
         'http://localhost:3000',
@@ -31,12 +55,28 @@ class Config:
     # 流式响应配置
     STREAMING_WORD_DELAY = float(os.environ.get('STREAMING_WORD_DELAY', 0.05))
     STREAMING_SEGMENT_DELAY = float(os.environ.get('STREAMING_SEGMENT_DELAY', 0.2))
+    # 输出节奏：none（透传）/ fixed（每个内容块之后延迟 STREAMING_WORD_DELAY）/ adaptive（自适应合并）
+    STREAMING_PACING_MODE = os.environ.get('STREAMING_PACING_MODE', 'adaptive')
+    STREAMING_COALESCE_INTERVAL = float(os.environ.get('STREAMING_COALESCE_INTERVAL', 0.05))
+    STREAMING_COALESCE_MAX_CHARS = int(os.environ.get('STREAMING_COALESCE_MAX_CHARS', 32))
     
     # LLM 配置
     LLM_TEMPERATURE = float(os.environ.get('LLM_TEMPERATURE', 0.1))
     LLM_MAX_TOKENS = int(os.environ.get('LLM_MAX_TOKENS', 2000))
     LLM_TOP_P = float(os.environ.get('LLM_TOP_P', 0.9))
     
+    # 后续问题生成配置（回答达到提示词所需长度后与回答流并行生成）
+    FOLLOW_UP_SPECULATIVE = os.environ.get('FOLLOW_UP_SPECULATIVE', 'true').lower() == 'true'
+    FOLLOW_UP_TIMEOUT = float(os.environ.get('FOLLOW_UP_TIMEOUT', 10.0))
+    FOLLOW_UP_MAX_WORKERS = int(os.environ.get('FOLLOW_UP_MAX_WORKERS', 8))
+    
+    # 后续问题缓存配置（FOLLOW_UP_CACHE_PATH 为空时只缓存在内存中）
+    FOLLOW_UP_CACHE_ENABLED = os.environ.get('FOLLOW_UP_CACHE_ENABLED', 'true').lower() == 'true'
+    FOLLOW_UP_CACHE_MAX_ENTRIES = int(os.environ.get('FOLLOW_UP_CACHE_MAX_ENTRIES', 5000))
+    FOLLOW_UP_CACHE_TTL = float(os.environ.get('FOLLOW_UP_CACHE_TTL', 86400))
+    FOLLOW_UP_CACHE_PATH = os.environ.get('FOLLOW_UP_CACHE_PATH', '')
+    FOLLOW_UP_CACHE_SAVE_INTERVAL = float(os.environ.get('FOLLOW_UP_CACHE_SAVE_INTERVAL', 60))
+    
     # 数据库配置（可选）
     DATABASE_URL = os.environ.get('DATABASE_URL') or 'sqlite:///openevidence.db'
     
@@ -44,6 +84,35 @@ class Config:
     CACHE_TYPE = 'simple'
     CACHE_DEFAULT_TIMEOUT = 300
     
+    # 问答缓存配置（相同问题直接回放已缓存的事件序列）
+    ANSWER_CACHE_ENABLED = os.environ.get('ANSWER_CACHE_ENABLED', 'true').lower() == 'true'
+    ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', 1000))
+    ANSWER_CACHE_MAX_BYTES = int(os.environ.get('ANSWER_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    ANSWER_CACHE_TTL = float(os.environ.get('ANSWER_CACHE_TTL', 3600))
+    
+    # SSE 序列化配置（auto：安装了 orjson 时使用 orjson；时间戳按该精度（秒）缓存，0 表示不缓存）
+    JSON_SERIALIZER = os.environ.get('JSON_SERIALIZER', 'auto')
+    SSE_TIMESTAMP_RESOLUTION = float(os.environ.get('SSE_TIMESTAMP_RESOLUTION', 0.01))
+    
+    # SSE 断线续传配置（客户端带 Last-Event-ID 重连时从按会话保存的事件缓冲续读）
+    SSE_RESUME_ENABLED = os.environ.get('SSE_RESUME_ENABLED', 'true').lower() == 'true'
+    SSE_RESUME_MAX_SESSIONS = int(os.environ.get('SSE_RESUME_MAX_SESSIONS', 1000))
+    SSE_RESUME_MAX_BYTES = int(os.environ.get('SSE_RESUME_MAX_BYTES', 1024 * 1024))
+    SSE_RESUME_TTL = float(os.environ.get('SSE_RESUME_TTL', 120))
+    SSE_RESUME_ABANDON_AFTER = float(os.environ.get('SSE_RESUME_ABANDON_AFTER', 30))
+    # 相同问题同时进行时共用一次上游生成（依赖续传缓冲）
+    SINGLE_FLIGHT_ENABLED = os.environ.get('SINGLE_FLIGHT_ENABLED', 'true').lower() == 'true'
+    
+    # 近似问题缓存配置（默认关闭：医学问题中细微措辞差异可能改变含义）
+    SEMANTIC_CACHE_ENABLED = os.environ.get('SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+    SEMANTIC_CACHE_CAPACITY = int(os.environ.get('SEMANTIC_CACHE_CAPACITY', 10000))
+    SEMANTIC_CACHE_DIM = int(os.environ.get('SEMANTIC_CACHE_DIM', 512))
+    SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', 0.92))
+    
+    # 指标配置（多个工作进程时设置共享的快照目录，服务启动前清空）
+    METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR', '')
+    METRICS_SNAPSHOT_INTERVAL = float(os.environ.get('METRICS_SNAPSHOT_INTERVAL', 5.0))
+    
     # 日志配置
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
     
@@ -58,6 +127,13 @@ class Config:
     # 文本处理配置
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 10000))
     MAX_QUESTION_LENGTH = int(os.environ.get('MAX_QUESTION_LENGTH', 2500))
+    
+    # 医学术语词典配置（python -m utils.glossary 生成；为空时使用内置词典）
+    MEDICAL_GLOSSARY_PATH = os.environ.get('MEDICAL_GLOSSARY_PATH', '')
+    # 术语匹配自动机的缓存文件（避免每次启动重新构建）
+    MEDICAL_GLOSSARY_MATCHER_PATH = os.environ.get('MEDICAL_GLOSSARY_MATCHER_PATH', '')
+    # 完成事件附带回答的结构统计（句子 / 段落数、术语命中、是否含引用，随内容增量统计）
+    ANSWER_STRUCTURE_ENABLED = os.environ.get('ANSWER_STRUCTURE_ENABLED', 'true').lower() == 'true'
 
 class DevelopmentConfig(Config):
     """开发环境配置"""
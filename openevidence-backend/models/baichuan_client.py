@@ -3,34 +3,69 @@ Baichuan M2 Plus 模型客户端
 """
 
 import os
+import time
 import logging
-from typing import Optional, Iterator, Dict, Any
-from openai import OpenAI
+from typing import Optional, Iterator, AsyncIterator, Dict, Any, Callable
+from openai import OpenAI, AsyncOpenAI, NotFoundError
+
+from models.http_transport import (
+    build_timeout, create_http_client, create_async_http_client, get_transport_stats
+)
+from models.stream_recording import StreamRecorder
+from utils.metrics import REGISTRY, STAGE_ERRORS
 
 logger = logging.getLogger(__name__)
 
+# 上游请求指标（同步、异步客户端共用）
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    'openevidence_upstream_requests_total', 'Baichuan upstream requests by kind and outcome', ('kind', 'outcome')
+)
+UPSTREAM_RESPONSE_SECONDS = REGISTRY.histogram(
+    'openevidence_upstream_response_seconds',
+    'Time until Baichuan responded (headers for streams, full body for completions)', ('kind',)
+)
+UPSTREAM_STREAMS_OPEN = REGISTRY.gauge('openevidence_upstream_streams_open', 'Open Baichuan response streams')
+UPSTREAM_CHUNKS = REGISTRY.counter('openevidence_upstream_chunks_total', 'Chunks received from Baichuan streams')
+
+_STREAM_RESPONSE_SECONDS = UPSTREAM_RESPONSE_SECONDS.labels('stream')
+_COMPLETION_RESPONSE_SECONDS = UPSTREAM_RESPONSE_SECONDS.labels('completion')
+_UPSTREAM_ERRORS = STAGE_ERRORS.labels('upstream')
+
+def _record_request(kind: str, outcome: str) -> None:
+    """记录一次上游请求"""
+    UPSTREAM_REQUESTS.labels(kind, outcome).inc()
+    if outcome == 'error':
+        _UPSTREAM_ERRORS.inc()
+
 class BaichuanClient:
     """Baichuan M2 Plus 模型客户端"""
     
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 transport_config: Optional[Any] = None, recorder: Optional[StreamRecorder] = None):
         """
         初始化 Baichuan 客户端
         
         Args:
             api_key: API 密钥
             base_url: API 基础URL
+            transport_config: 连接池配置类（默认为 config.get_config()）
+            recorder: 上游调用录制器（None 表示不录制）
         """
         self.api_key = api_key or os.getenv('BAICHUAN_API_KEY')
         self.base_url = base_url or os.getenv('BAICHUAN_BASE_URL', 'https://api.baichuan-ai.com/v1/')
         self.model_name = 'Baichuan-M2-Plus'
+        self.recorder = recorder
         
         if not self.api_key:
             raise ValueError("Baichuan API key is required. Set BAICHUAN_API_KEY environment variable.")
         
-        # 初始化 OpenAI 客户端（兼容 Baichuan API）
+        # 初始化 OpenAI 客户端（兼容 Baichuan API），使用可配置的连接池
+        self.http_client = create_http_client(transport_config)
         self.client = OpenAI(
             api_key=self.api_key,
-            base_url=self.base_url
+            base_url=self.base_url,
+            http_client=self.http_client,
+            timeout=build_timeout(transport_config)
         )
         
         logger.info(f"Baichuan client initialized with base URL: {self.base_url}")
@@ -47,6 +82,8 @@ class BaichuanClient:
         Returns:
             聊天完成响应
         """
+        kind = 'stream' if stream else 'completion'
+        start = time.monotonic()
         try:
             completion = self.client.chat.completions.create(
                 model=self.model_name,
@@ -55,23 +92,34 @@ class BaichuanClient:
                 **kwargs
             )
             
+            elapsed = time.monotonic() - start
+            UPSTREAM_RESPONSE_SECONDS.labels(kind).observe(elapsed)
+            _record_request(kind, 'ok')
+            if self.recorder is not None and not stream:
+                self.recorder.record_completion(messages, kwargs, completion, elapsed)
             return completion
             
         except Exception as e:
+            _record_request(kind, 'error')
             logger.error(f"Error in chat completion: {str(e)}")
             raise
     
-    def chat_completion_stream(self, messages: list, **kwargs) -> Iterator[Any]:
+    def chat_completion_stream(self, messages: list, on_connect: Optional[Callable[[], None]] = None,
+                               **kwargs) -> Iterator[Any]:
         """
         创建流式聊天完成
         
         Args:
             messages: 消息列表
+            on_connect: 收到上游响应头（流建立）时的回调
             **kwargs: 其他参数
             
         Yields:
             流式响应块
         """
+        outcome = 'ok'
+        start = time.monotonic()
+        recording = self.recorder.start(messages, kwargs) if self.recorder is not None else None
         try:
             stream = self.client.chat.completions.create(
                 model=self.model_name,
@@ -79,13 +127,33 @@ class BaichuanClient:
                 stream=True,
                 **kwargs
             )
+            _STREAM_RESPONSE_SECONDS.observe(time.monotonic() - start)
+            if recording is not None:
+                recording.connect()
+            if on_connect is not None:
+                on_connect()
             
-            for chunk in stream:
-                yield chunk
+            UPSTREAM_STREAMS_OPEN.inc()
+            try:
+                for chunk in stream:
+                    UPSTREAM_CHUNKS.inc()
+                    if recording is not None:
+                        recording.add(chunk)
+                    yield chunk
+            finally:
+                # 提前结束迭代时及时将连接归还连接池
+                UPSTREAM_STREAMS_OPEN.dec()
+                stream.close()
                 
         except Exception as e:
+            outcome = 'error'
             logger.error(f"Error in streaming chat completion: {str(e)}")
             raise
+        finally:
+            # 提前关闭（回答完成后不再读取 [DONE]、客户端断开）不计为错误
+            _record_request('stream', outcome)
+            if recording is not None:
+                recording.finish(outcome)
     
     def is_available(self) -> bool:
         """
@@ -113,6 +181,40 @@ class BaichuanClient:
             logger.error(f"Baichuan service unavailable: {str(e)}")
             return False
     
+    def probe(self, mode: str = 'models', timeout: float = 5.0) -> None:
+        """
+        轻量探测上游服务，失败时抛出异常
+        
+        Args:
+            mode: 'models' 请求模型列表（不消耗 token）；'completion' 发送一次最小的聊天完成
+            timeout: 探测超时（秒），探测不重试
+        """
+        client = self.client.with_options(timeout=timeout, max_retries=0)
+        
+        if mode == 'completion':
+            client.chat.completions.create(
+                model=self.model_name,
+                messages=[{"role": "user", "content": "测试连接"}],
+                max_tokens=10,
+                stream=False
+            )
+            return
+        
+        try:
+            client.models.list()
+        except NotFoundError:
+            # 上游未提供 /models 端点时，404 同样说明服务可达
+            pass
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计
+        
+        Returns:
+            Dict: 连接池统计（连接数、使用中、空闲、等待次数等）
+        """
+        return get_transport_stats(self.http_client)
+    
     def get_model_info(self) -> Dict[str, Any]:
         """
         获取模型信息
@@ -130,4 +232,136 @@ class BaichuanClient:
                 'chinese_language',
                 'evidence_grounding'
             ]
-        }
\ No newline at end of file
+        }
+
+
+class AsyncBaichuanClient:
+    """Baichuan M2 Plus 异步模型客户端（供 ASGI 模式使用）"""
+    
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 transport_config: Optional[Any] = None, recorder: Optional[StreamRecorder] = None):
+        """
+        初始化异步 Baichuan 客户端
+        
+        Args:
+            api_key: API 密钥
+            base_url: API 基础URL
+            transport_config: 连接池配置类（默认为 config.get_config()）
+            recorder: 上游调用录制器（None 表示不录制）
+        """
+        self.api_key = api_key or os.getenv('BAICHUAN_API_KEY')
+        self.base_url = base_url or os.getenv('BAICHUAN_BASE_URL', 'https://api.baichuan-ai.com/v1/')
+        self.model_name = 'Baichuan-M2-Plus'
+        self.recorder = recorder
+        
+        if not self.api_key:
+            raise ValueError("Baichuan API key is required. Set BAICHUAN_API_KEY environment variable.")
+        
+        # 初始化异步 OpenAI 客户端（兼容 Baichuan API），使用可配置的连接池
+        self.http_client = create_async_http_client(transport_config)
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=self.http_client,
+            timeout=build_timeout(transport_config)
+        )
+        
+        logger.info(f"Async Baichuan client initialized with base URL: {self.base_url}")
+    
+    async def chat_completion(self, messages: list, stream: bool = False, **kwargs) -> Any:
+        """
+        创建聊天完成
+        
+        Args:
+            messages: 消息列表
+            stream: 是否使用流式响应
+            **kwargs: 其他参数
+            
+        Returns:
+            聊天完成响应
+        """
+        kind = 'stream' if stream else 'completion'
+        start = time.monotonic()
+        try:
+            completion = await self.client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                stream=stream,
+                **kwargs
+            )
+            
+            elapsed = time.monotonic() - start
+            UPSTREAM_RESPONSE_SECONDS.labels(kind).observe(elapsed)
+            _record_request(kind, 'ok')
+            if self.recorder is not None and not stream:
+                self.recorder.record_completion(messages, kwargs, completion, elapsed)
+            return completion
+            
+        except Exception as e:
+            _record_request(kind, 'error')
+            logger.error(f"Error in async chat completion: {str(e)}")
+            raise
+    
+    async def chat_completion_stream(self, messages: list, on_connect: Optional[Callable[[], None]] = None,
+                                     **kwargs) -> AsyncIterator[Any]:
+        """
+        创建异步流式聊天完成
+        
+        Args:
+            messages: 消息列表
+            on_connect: 收到上游响应头（流建立）时的回调
+            **kwargs: 其他参数
+            
+        Yields:
+            流式响应块
+        """
+        outcome = 'ok'
+        start = time.monotonic()
+        recording = self.recorder.start(messages, kwargs) if self.recorder is not None else None
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                stream=True,
+                **kwargs
+            )
+            _STREAM_RESPONSE_SECONDS.observe(time.monotonic() - start)
+            if recording is not None:
+                recording.connect()
+            if on_connect is not None:
+                on_connect()
+            
+            UPSTREAM_STREAMS_OPEN.inc()
+            try:
+                async for chunk in stream:
+                    UPSTREAM_CHUNKS.inc()
+                    if recording is not None:
+                        recording.add(chunk)
+                    yield chunk
+            finally:
+                # 提前结束迭代时及时将连接归还连接池
+                UPSTREAM_STREAMS_OPEN.dec()
+                await stream.close()
+                
+        except Exception as e:
+            outcome = 'error'
+            logger.error(f"Error in async streaming chat completion: {str(e)}")
+            raise
+        finally:
+            # 提前关闭（回答完成后不再读取 [DONE]、客户端断开）不计为错误
+            _record_request('stream', outcome)
+            if recording is not None:
+                recording.finish(outcome)
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计
+        
+        Returns:
+            Dict: 连接池统计（连接数、使用中、空闲、等待次数等）
+        """
+        return get_transport_stats(self.http_client)
+    
+    async def close(self) -> None:
+        """关闭底层 HTTP 连接池"""
+        await self.client.close()
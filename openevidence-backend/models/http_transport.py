@@ -0,0 +1,277 @@
+"""
+Baichuan HTTP 传输层
+为 OpenAI 兼容客户端提供可配置的连接池（连接数、keep-alive、HTTP/2、超时），
+并统计连接池使用情况，便于按 QPS 调整连接池大小
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+def _http2_available() -> bool:
+    """检查 HTTP/2 依赖（h2）是否已安装"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _resolve_config(config: Optional[Any] = None) -> Any:
+    """获取传输层配置，默认使用当前环境的配置类"""
+    if config is not None:
+        return config
+    from config import get_config
+    return get_config()
+
+def build_limits(config: Optional[Any] = None) -> httpx.Limits:
+    """
+    构建连接池限制
+    
+    Args:
+        config: 配置类（默认为当前环境配置）
+        
+    Returns:
+        httpx.Limits: 连接池限制
+    """
+    config = _resolve_config(config)
+    return httpx.Limits(
+        max_connections=config.BAICHUAN_MAX_CONNECTIONS,
+        max_keepalive_connections=config.BAICHUAN_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.BAICHUAN_KEEPALIVE_EXPIRY
+    )
+
+def build_timeout(config: Optional[Any] = None) -> httpx.Timeout:
+    """
+    构建超时配置
+    
+    Args:
+        config: 配置类（默认为当前环境配置）
+        
+    Returns:
+        httpx.Timeout: 超时配置
+    """
+    config = _resolve_config(config)
+    return httpx.Timeout(
+        connect=config.BAICHUAN_CONNECT_TIMEOUT,
+        read=config.BAICHUAN_READ_TIMEOUT,
+        write=config.BAICHUAN_WRITE_TIMEOUT,
+        pool=config.BAICHUAN_POOL_TIMEOUT
+    )
+
+def use_http2(config: Optional[Any] = None) -> bool:
+    """
+    是否启用 HTTP/2（未安装 h2 时回退到 HTTP/1.1）
+    
+    Args:
+        config: 配置类（默认为当前环境配置）
+        
+    Returns:
+        bool: 是否启用 HTTP/2
+    """
+    config = _resolve_config(config)
+    if not config.BAICHUAN_HTTP2:
+        return False
+    if not _http2_available():
+        logger.warning("BAICHUAN_HTTP2 is enabled but 'h2' is not installed, falling back to HTTP/1.1")
+        return False
+    return True
+
+class PoolStats:
+    """连接池统计（线程安全）"""
+    
+    def __init__(self, max_connections: Optional[int]):
+        """
+        初始化统计
+        
+        Args:
+            max_connections: 最大连接数
+        """
+        self.max_connections = max_connections
+        self.requests_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waits = 0
+        self.pool_timeouts = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """请求开始：若所有连接均被占用则记为一次等待"""
+        with self._lock:
+            self.requests_total += 1
+            if self.max_connections is not None and self.in_flight >= self.max_connections:
+                self.waits += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+    
+    def release(self) -> None:
+        """请求结束（响应体读取完毕或关闭）"""
+        with self._lock:
+            self.in_flight -= 1
+    
+    def record_error(self, error: Exception) -> None:
+        """记录传输错误"""
+        with self._lock:
+            self.errors += 1
+            if isinstance(error, httpx.PoolTimeout):
+                self.pool_timeouts += 1
+    
+    def snapshot(self, pool: Any = None) -> Dict[str, Any]:
+        """
+        获取统计快照
+        
+        Args:
+            pool: httpcore 连接池（用于统计空闲/使用中的连接）
+            
+        Returns:
+            Dict: 统计信息
+        """
+        connections = list(getattr(pool, 'connections', []) or [])
+        idle = sum(1 for conn in connections if conn.is_idle())
+        
+        with self._lock:
+            return {
+                'max_connections': self.max_connections,
+                'connections': len(connections),
+                'in_use': len(connections) - idle,
+                'idle': idle,
+                'requests_total': self.requests_total,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'waits': self.waits,
+                'pool_timeouts': self.pool_timeouts,
+                'errors': self.errors
+            }
+
+class _TrackedStream(httpx.SyncByteStream):
+    """响应体关闭时释放连接池统计的同步流包装"""
+    
+    def __init__(self, stream: httpx.SyncByteStream, stats: PoolStats):
+        self._stream = stream
+        self._stats = stats
+        self._released = False
+    
+    def __iter__(self):
+        for part in self._stream:
+            yield part
+    
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self._stats.release()
+
+class _AsyncTrackedStream(httpx.AsyncByteStream):
+    """响应体关闭时释放连接池统计的异步流包装"""
+    
+    def __init__(self, stream: httpx.AsyncByteStream, stats: PoolStats):
+        self._stream = stream
+        self._stats = stats
+        self._released = False
+    
+    async def __aiter__(self):
+        async for part in self._stream:
+            yield part
+    
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._stats.release()
+
+class PooledHTTPTransport(httpx.HTTPTransport):
+    """带连接池统计的同步传输层"""
+    
+    def __init__(self, limits: httpx.Limits, http2: bool = False, **kwargs):
+        super().__init__(limits=limits, http2=http2, **kwargs)
+        self.stats = PoolStats(limits.max_connections)
+    
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.acquire()
+        try:
+            response = super().handle_request(request)
+        except Exception as e:
+            self.stats.record_error(e)
+            self.stats.release()
+            raise
+        
+        response.stream = _TrackedStream(response.stream, self.stats)
+        return response
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计"""
+        return self.stats.snapshot(getattr(self, '_pool', None))
+
+class AsyncPooledHTTPTransport(httpx.AsyncHTTPTransport):
+    """带连接池统计的异步传输层"""
+    
+    def __init__(self, limits: httpx.Limits, http2: bool = False, **kwargs):
+        super().__init__(limits=limits, http2=http2, **kwargs)
+        self.stats = PoolStats(limits.max_connections)
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.acquire()
+        try:
+            response = await super().handle_async_request(request)
+        except Exception as e:
+            self.stats.record_error(e)
+            self.stats.release()
+            raise
+        
+        response.stream = _AsyncTrackedStream(response.stream, self.stats)
+        return response
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计"""
+        return self.stats.snapshot(getattr(self, '_pool', None))
+
+def create_http_client(config: Optional[Any] = None) -> httpx.Client:
+    """
+    创建带连接池配置的同步 HTTP 客户端
+    
+    Args:
+        config: 配置类（默认为当前环境配置）
+        
+    Returns:
+        httpx.Client: HTTP 客户端（transport 为 PooledHTTPTransport）
+    """
+    config = _resolve_config(config)
+    transport = PooledHTTPTransport(limits=build_limits(config), http2=use_http2(config))
+    return httpx.Client(transport=transport, timeout=build_timeout(config), follow_redirects=True)
+
+def create_async_http_client(config: Optional[Any] = None) -> httpx.AsyncClient:
+    """
+    创建带连接池配置的异步 HTTP 客户端
+    
+    Args:
+        config: 配置类（默认为当前环境配置）
+        
+    Returns:
+        httpx.AsyncClient: HTTP 客户端（transport 为 AsyncPooledHTTPTransport）
+    """
+    config = _resolve_config(config)
+    transport = AsyncPooledHTTPTransport(limits=build_limits(config), http2=use_http2(config))
+    return httpx.AsyncClient(transport=transport, timeout=build_timeout(config), follow_redirects=True)
+
+def get_transport_stats(http_client: Any) -> Dict[str, Any]:
+    """
+    获取 HTTP 客户端的连接池统计
+    
+    Args:
+        http_client: create_http_client / create_async_http_client 创建的客户端
+        
+    Returns:
+        Dict: 统计信息（非池化传输层返回空字典）
+    """
+    transport = getattr(http_client, '_transport', None)
+    if hasattr(transport, 'get_stats'):
+        return transport.get_stats()
+    return {}
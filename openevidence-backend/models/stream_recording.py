@@ -0,0 +1,459 @@
+"""
+Baichuan 上游流录制与回放
+录制模式把上游原始响应块及其相对请求开始的时间偏移按 JSONL 写入文件（每行一次上游调用）；
+回放客户端按录制速度（或任意倍速、不等待）把录制的响应块重新交给 /api/ask 和 StreamingService，
+用于在真实流量形态上做无网络、无 API 费用的确定性性能测试
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+from itertools import cycle
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+logger = logging.getLogger(__name__)
+
+# 录制文件格式版本
+RECORDING_FORMAT_VERSION = 1
+
+# 每个响应块都相同的字段，只在记录的 envelope 中保存一次
+ENVELOPE_FIELDS = ('id', 'object', 'created', 'model')
+
+def request_key(messages: List[Dict[str, Any]]) -> str:
+    """
+    计算请求消息的摘要（录制文件中不保存问题原文）
+    
+    Args:
+        messages: 消息列表
+        
+    Returns:
+        str: 摘要（SHA-256 前 16 位）
+    """
+    payload = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+class StreamRecording:
+    """单次上游流的录制"""
+    
+    def __init__(self, recorder: 'StreamRecorder', messages: List[Dict[str, Any]], params: Dict[str, Any]):
+        """
+        初始化（记录请求开始时刻）
+        
+        Args:
+            recorder: 所属录制器
+            messages: 请求消息
+            params: 生成参数
+        """
+        self.recorder = recorder
+        self.start = time.monotonic()
+        self.record: Dict[str, Any] = {
+            'v': RECORDING_FORMAT_VERSION,
+            'kind': 'stream',
+            'recorded_at': datetime.now().isoformat(),
+            'request_key': request_key(messages),
+            'params': params,
+            'connect_ms': None,
+            'envelope': None,
+            'chunks': []
+        }
+    
+    def _offset_ms(self) -> float:
+        """距请求开始的毫秒数"""
+        return round((time.monotonic() - self.start) * 1000, 1)
+    
+    def connect(self) -> None:
+        """记录上游流建立时刻"""
+        self.record['connect_ms'] = self._offset_ms()
+    
+    def add(self, chunk: Any) -> None:
+        """
+        记录一个响应块
+        
+        Args:
+            chunk: 上游响应块
+        """
+        data = chunk.model_dump(exclude_none=True)
+        if self.record['envelope'] is None:
+            self.record['envelope'] = {field: data[field] for field in ENVELOPE_FIELDS if field in data}
+        for field, value in self.record['envelope'].items():
+            if data.get(field) == value:
+                del data[field]
+        self.record['chunks'].append([self._offset_ms(), data])
+    
+    def finish(self, outcome: str) -> None:
+        """
+        结束录制并写入文件
+        
+        Args:
+            outcome: 'ok' 或 'error'
+        """
+        self.record['outcome'] = outcome
+        self.record['duration_ms'] = self._offset_ms()
+        self.recorder.write(self.record)
+
+class StreamRecorder:
+    """上游调用录制器（线程安全，每次调用追加一行 JSON）"""
+    
+    def __init__(self, path: str, sample_rate: float = 1.0, max_records: int = 0):
+        """
+        初始化录制器
+        
+        Args:
+            path: 录制文件路径（追加写入）
+            sample_rate: 录制比例（0-1）
+            max_records: 最多录制的调用数（0 表示不限制）
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_records = max_records
+        self.records = 0
+        self._lock = threading.Lock()
+        self._file = None
+        
+        logger.info(f"Upstream stream recording enabled (path: {path}, sample rate: {sample_rate})")
+    
+    def _accept(self) -> bool:
+        """按录制比例和条数上限决定是否录制本次调用"""
+        if self.max_records and self.records >= self.max_records:
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+    
+    def start(self, messages: List[Dict[str, Any]], params: Dict[str, Any]) -> Optional[StreamRecording]:
+        """
+        开始录制一次流式调用
+        
+        Args:
+            messages: 请求消息
+            params: 生成参数
+            
+        Returns:
+            Optional[StreamRecording]: 录制对象，本次不录制时返回 None
+        """
+        if not self._accept():
+            return None
+        return StreamRecording(self, messages, params)
+    
+    def record_completion(self, messages: List[Dict[str, Any]], params: Dict[str, Any],
+                          completion: Any, elapsed: float) -> None:
+        """
+        录制一次非流式调用（后续问题生成）
+        
+        Args:
+            messages: 请求消息
+            params: 生成参数
+            completion: 上游响应
+            elapsed: 耗时（秒）
+        """
+        if not self._accept():
+            return
+        self.write({
+            'v': RECORDING_FORMAT_VERSION,
+            'kind': 'completion',
+            'recorded_at': datetime.now().isoformat(),
+            'request_key': request_key(messages),
+            'params': params,
+            'duration_ms': round(elapsed * 1000, 1),
+            'response': completion.model_dump(exclude_none=True)
+        })
+    
+    def write(self, record: Dict[str, Any]) -> None:
+        """
+        追加一条录制记录
+        
+        Args:
+            record: 录制记录
+        """
+        try:
+            line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+            with self._lock:
+                if self.max_records and self.records >= self.max_records:
+                    return
+                if self._file is None:
+                    self._file = open(self.path, 'a', encoding='utf-8')
+                self._file.write(line)
+                self._file.flush()
+                self.records += 1
+        except Exception as e:
+            logger.error(f"Error writing stream recording: {str(e)}")
+    
+    def close(self) -> None:
+        """关闭录制文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def load_recordings(path: str) -> List[Dict[str, Any]]:
+    """
+    读取录制文件（跳过无法解析和版本不符的行）
+    
+    Args:
+        path: 录制文件路径
+        
+    Returns:
+        List[Dict]: 录制记录
+    """
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping malformed recording at {path}:{line_number}")
+                continue
+            if record.get('v') == RECORDING_FORMAT_VERSION:
+                records.append(record)
+    return records
+
+class ReplayedStreamError(Exception):
+    """回放录制时出错的上游流"""
+
+class StreamReplay:
+    """录制记录的回放源（线程安全）"""
+    
+    def __init__(self, records: List[Dict[str, Any]], speed: float = 1.0, match_requests: bool = True):
+        """
+        初始化回放源
+        
+        Args:
+            records: 录制记录
+            speed: 回放倍速（1 为录制速度，0 表示不等待）
+            match_requests: 优先回放与请求消息摘要相同的录制
+        """
+        self.speed = speed
+        self.match_requests = match_requests
+        self.streams = [r for r in records if r['kind'] == 'stream']
+        self.completions = [r for r in records if r['kind'] == 'completion']
+        self._cycles: Dict[Tuple[str, str], Iterator[Dict[str, Any]]] = {}
+        self._by_key: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for record in records:
+            self._by_key.setdefault((record['kind'], record['request_key']), []).append(record)
+        self._lock = threading.Lock()
+        
+        if not self.streams:
+            raise ValueError("Recording contains no streams")
+    
+    @classmethod
+    def from_file(cls, path: str, speed: float = 1.0, match_requests: bool = True) -> 'StreamReplay':
+        """
+        从录制文件创建回放源
+        
+        Args:
+            path: 录制文件路径
+            speed: 回放倍速
+            match_requests: 优先回放与请求消息摘要相同的录制
+            
+        Returns:
+            StreamReplay: 回放源
+        """
+        replay = cls(load_recordings(path), speed=speed, match_requests=match_requests)
+        logger.info(
+            f"Loaded {len(replay.streams)} streams and {len(replay.completions)} completions "
+            f"for replay from {path} (speed: {speed})"
+        )
+        return replay
+    
+    def next_record(self, kind: str, messages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        选择下一条要回放的记录（相同请求优先，否则按录制顺序循环）
+        
+        Args:
+            kind: 'stream' 或 'completion'
+            messages: 请求消息
+            
+        Returns:
+            Optional[Dict]: 录制记录，没有该类记录时返回 None
+        """
+        key = (kind, request_key(messages)) if self.match_requests else None
+        if key not in self._by_key:
+            key = (kind, '')
+            if not (self.streams if kind == 'stream' else self.completions):
+                return None
+        
+        with self._lock:
+            if key not in self._cycles:
+                pool = self._by_key[key] if key[1] else (self.streams if kind == 'stream' else self.completions)
+                self._cycles[key] = cycle(pool)
+            return next(self._cycles[key])
+    
+    def delay(self, offset_ms: Optional[float], start: float) -> float:
+        """
+        距按倍速回放到 offset_ms 时刻还需等待的秒数
+        
+        Args:
+            offset_ms: 录制时的时间偏移（毫秒）
+            start: 回放开始时刻（time.monotonic）
+            
+        Returns:
+            float: 等待秒数（不等待时为 0）
+        """
+        if not self.speed or offset_ms is None:
+            return 0.0
+        return max(start + offset_ms / 1000 / self.speed - time.monotonic(), 0.0)
+
+def _stream_error(record: Dict[str, Any]) -> ReplayedStreamError:
+    """录制时出错的流在回放结束时抛出的异常"""
+    return ReplayedStreamError(f"Recorded upstream stream {record['request_key']} ended with an error")
+
+class ReplayBaichuanClient:
+    """回放录制流的 Baichuan 客户端（与 BaichuanClient 接口一致）"""
+    
+    def __init__(self, replay: StreamReplay):
+        """
+        初始化
+        
+        Args:
+            replay: 回放源
+        """
+        self.replay = replay
+        self.api_key = 'replay'
+        self.base_url = 'replay://'
+        self.model_name = 'Baichuan-M2-Plus'
+    
+    def chat_completion(self, messages: list, stream: bool = False, **kwargs) -> Any:
+        """
+        回放一次非流式调用
+        
+        Args:
+            messages: 消息列表
+            stream: 是否使用流式响应
+            **kwargs: 其他参数（忽略）
+            
+        Returns:
+            录制的聊天完成响应
+        """
+        if stream:
+            return self.chat_completion_stream(messages, **kwargs)
+        
+        record = self.replay.next_record('completion', messages)
+        if record is None:
+            raise ReplayedStreamError("Recording contains no completions")
+        time.sleep(self.replay.delay(record['duration_ms'], time.monotonic()))
+        return ChatCompletion.model_validate(record['response'])
+    
+    def chat_completion_stream(self, messages: list, on_connect: Optional[Callable[[], None]] = None,
+                               **kwargs) -> Iterator[Any]:
+        """
+        按录制的时间偏移回放一次流式调用
+        
+        Args:
+            messages: 消息列表
+            on_connect: 流建立时的回调
+            **kwargs: 其他参数（忽略）
+            
+        Yields:
+            流式响应块
+        """
+        record = self.replay.next_record('stream', messages)
+        envelope = record.get('envelope') or {}
+        start = time.monotonic()
+        
+        time.sleep(self.replay.delay(record['connect_ms'], start))
+        if on_connect is not None:
+            on_connect()
+        
+        for offset_ms, data in record['chunks']:
+            wait = self.replay.delay(offset_ms, start)
+            if wait:
+                time.sleep(wait)
+            yield ChatCompletionChunk.model_validate({**envelope, **data})
+        
+        if record.get('outcome') == 'error':
+            raise _stream_error(record)
+    
+    def is_available(self) -> bool:
+        """回放客户端始终可用"""
+        return True
+    
+    def probe(self, mode: str = 'models', timeout: float = 5.0) -> None:
+        """回放模式下不探测上游"""
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """回放模式没有连接池"""
+        return {}
+    
+    def get_model_info(self) -> Dict[str, Any]:
+        """获取模型信息"""
+        return {'model_name': self.model_name, 'api_base': self.base_url, 'features': ['replay']}
+
+class AsyncReplayBaichuanClient:
+    """回放录制流的异步 Baichuan 客户端（与 AsyncBaichuanClient 接口一致）"""
+    
+    def __init__(self, replay: StreamReplay):
+        """
+        初始化
+        
+        Args:
+            replay: 回放源
+        """
+        self.replay = replay
+        self.api_key = 'replay'
+        self.base_url = 'replay://'
+        self.model_name = 'Baichuan-M2-Plus'
+    
+    async def chat_completion(self, messages: list, stream: bool = False, **kwargs) -> Any:
+        """
+        回放一次非流式调用
+        
+        Args:
+            messages: 消息列表
+            stream: 是否使用流式响应
+            **kwargs: 其他参数（忽略）
+            
+        Returns:
+            录制的聊天完成响应
+        """
+        if stream:
+            return self.chat_completion_stream(messages, **kwargs)
+        
+        record = self.replay.next_record('completion', messages)
+        if record is None:
+            raise ReplayedStreamError("Recording contains no completions")
+        await asyncio.sleep(self.replay.delay(record['duration_ms'], time.monotonic()))
+        return ChatCompletion.model_validate(record['response'])
+    
+    async def chat_completion_stream(self, messages: list, on_connect: Optional[Callable[[], None]] = None,
+                                     **kwargs) -> AsyncIterator[Any]:
+        """
+        按录制的时间偏移回放一次异步流式调用
+        
+        Args:
+            messages: 消息列表
+            on_connect: 流建立时的回调
+            **kwargs: 其他参数（忽略）
+            
+        Yields:
+            流式响应块
+        """
+        record = self.replay.next_record('stream', messages)
+        envelope = record.get('envelope') or {}
+        start = time.monotonic()
+        
+        await asyncio.sleep(self.replay.delay(record['connect_ms'], start))
+        if on_connect is not None:
+            on_connect()
+        
+        for offset_ms, data in record['chunks']:
+            wait = self.replay.delay(offset_ms, start)
+            if wait:
+                await asyncio.sleep(wait)
+            yield ChatCompletionChunk.model_validate({**envelope, **data})
+        
+        if record.get('outcome') == 'error':
+            raise _stream_error(record)
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """回放模式没有连接池"""
+        return {}
+    
+    async def close(self) -> None:
+        """回放模式没有需要关闭的连接"""
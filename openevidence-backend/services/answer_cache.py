@@ -0,0 +1,346 @@
+"""
+问答缓存服务
+对相同问题（规范化后）+ 系统提示词 + 模型参数缓存完整的 SSE 事件序列，
+命中时直接全速回放，不再调用 Baichuan
+"""
+
+import json
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from utils.serialization import dumps
+
+if TYPE_CHECKING:
+    from services.semantic_cache import SemanticQuestionIndex
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION_RE = re.compile(r'[?？!！。.,，;；~～\s]+$')
+
+def normalize_question(question: str) -> str:
+    """
+    规范化问题文本：NFKC（全角转半角）、合并空白、小写、去除末尾标点
+    
+    Args:
+        question: 原始问题
+        
+    Returns:
+        str: 规范化后的问题
+    """
+    text = unicodedata.normalize('NFKC', question)
+    text = _WHITESPACE_RE.sub(' ', text).strip().lower()
+    return _TRAILING_PUNCTUATION_RE.sub('', text)
+
+class BoundedTTLCache:
+    """带 TTL 的 LRU 缓存，按条目数和总字节数限制容量（线程安全）"""
+    
+    def __init__(self, max_entries: int = 1000, max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None, sizeof: Optional[Callable[[Any], int]] = None):
+        """
+        初始化缓存
+        
+        Args:
+            max_entries: 最大条目数
+            max_bytes: 最大总字节数（None 表示不限制）
+            ttl: 条目存活时间（秒，None 表示不过期）
+            sizeof: 计算条目大小的函数（默认按 1 字节计）
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof or (lambda value: 1)
+        
+        # key -> (value, size, expires_at)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        # 精确未命中、由调用方的二级查找（如近似问题匹配）命中的次数
+        self.secondary_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: str, record_stats: bool = True) -> Optional[Any]:
+        """
+        获取缓存条目（命中时移动到最近使用端）
+        
+        Args:
+            key: 缓存键
+            record_stats: 是否计入命中/未命中统计
+            
+        Returns:
+            Optional[Any]: 缓存值，未命中或已过期返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if record_stats:
+                    self.misses += 1
+                return None
+            
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                if record_stats:
+                    self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            if record_stats:
+                self.hits += 1
+            return value
+    
+    def record_secondary_hit(self) -> None:
+        """把上一次 get 记录的未命中改记为二级命中（调用方的二级查找成功后调用）"""
+        with self._lock:
+            self.misses -= 1
+            self.secondary_hits += 1
+    
+    def put(self, key: str, value: Any, expires_in: Optional[float] = None) -> bool:
+        """
+        写入缓存条目，超出容量时淘汰最久未使用的条目
+        
+        Args:
+            key: 缓存键
+            value: 缓存值
+            expires_in: 该条目的剩余存活时间（秒，None 表示使用 ttl）
+            
+        Returns:
+            bool: 是否写入（单个条目超过总字节上限时不写入）
+        """
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+        
+        if expires_in is None:
+            expires_in = self.ttl
+        expires_at = time.monotonic() + expires_in if expires_in is not None else None
+        
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            
+            while (len(self._entries) > self.max_entries or
+                   (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+        
+        return True
+    
+    def _remove(self, key: str) -> None:
+        """删除条目（调用方需持有锁）"""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+    
+    def items(self) -> List[Tuple[str, Any, Optional[float]]]:
+        """
+        获取未过期的条目（按最久未使用到最近使用排列，用于持久化）
+        
+        Returns:
+            List[Tuple]: (缓存键, 缓存值, 剩余存活时间（秒，None 表示不过期）)
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value, expires_at - now if expires_at is not None else None)
+                for key, (value, _, expires_at) in self._entries.items()
+                if expires_at is None or expires_at > now
+            ]
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+        
+        Returns:
+            Dict: 命中/未命中次数、命中率、条目数、占用字节数等
+        """
+        with self._lock:
+            served = self.hits + self.secondary_hits
+            lookups = served + self.misses
+            return {
+                'hits': self.hits,
+                'secondary_hits': self.secondary_hits,
+                'misses': self.misses,
+                'hit_rate': round(served / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl
+            }
+
+def _event_sequence_size(events: List[Dict[str, Any]]) -> int:
+    """事件序列序列化后的字节数"""
+    return len(dumps(events))
+
+class AnswerCache:
+    """问答事件序列缓存"""
+    
+    def __init__(self, max_entries: int = 1000, max_bytes: Optional[int] = 64 * 1024 * 1024,
+                 ttl: Optional[float] = 3600.0, enabled: bool = True,
+                 semantic_index: Optional['SemanticQuestionIndex'] = None):
+        """
+        初始化问答缓存
+        
+        Args:
+            max_entries: 最大缓存问题数
+            max_bytes: 缓存事件序列的最大总字节数
+            ttl: 缓存存活时间（秒）
+            enabled: 是否启用
+            semantic_index: 近似问题索引（None 表示只做精确匹配）
+        """
+        self.enabled = enabled
+        self.semantic_index = semantic_index
+        self._cache = BoundedTTLCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            ttl=ttl,
+            sizeof=_event_sequence_size
+        )
+        logger.info(
+            f"Answer cache initialized (enabled: {enabled}, max entries: {max_entries}, "
+            f"semantic: {semantic_index is not None})"
+        )
+    
+    @staticmethod
+    def build_context(system_prompt: str, model_params: Dict[str, Any]) -> str:
+        """
+        构建缓存上下文：系统提示词 + 模型参数
+        
+        Args:
+            system_prompt: 系统提示词
+            model_params: 模型名称及生成参数
+            
+        Returns:
+            str: 上下文摘要（SHA-256）
+        """
+        identity = json.dumps({
+            'system_prompt': system_prompt,
+            'model_params': model_params
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def build_key(question: str, context: str) -> str:
+        """
+        构建缓存键：规范化问题 + 缓存上下文
+        
+        Args:
+            question: 用户问题
+            context: build_context 生成的上下文摘要
+            
+        Returns:
+            str: 缓存键（SHA-256）
+        """
+        identity = f"{context}\n{normalize_question(question)}"
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str, question: Optional[str] = None,
+            context: str = '') -> Optional[List[Dict[str, Any]]]:
+        """
+        获取缓存的事件序列，精确未命中时按近似问题查找
+        
+        Args:
+            key: 缓存键
+            question: 用户问题（提供时启用近似问题匹配）
+            context: 缓存上下文，近似匹配只在同一上下文内进行
+            
+        Returns:
+            Optional[List[Dict]]: 事件序列，未命中返回 None
+        """
+        if not self.enabled:
+            return None
+        
+        events = self._cache.get(key)
+        if events is not None or question is None or self.semantic_index is None:
+            return events
+        
+        try:
+            match = self.semantic_index.lookup(question, context)
+            if match is None:
+                return None
+            
+            matched_key, score = match
+            events = self._cache.get(matched_key, record_stats=False)
+            if events is None:
+                # 对应的缓存条目已淘汰或过期
+                self.semantic_index.remove(matched_key)
+                return None
+            
+            # 精确查找已记为未命中，改记为近似命中
+            self._cache.record_secondary_hit()
+            logger.info(f"Semantic cache hit (similarity: {score:.3f})")
+            return events
+            
+        except Exception as e:
+            logger.error(f"Error in semantic cache lookup: {str(e)}")
+            return None
+    
+    def put(self, key: str, events: List[Dict[str, Any]], question: Optional[str] = None,
+            context: str = '') -> bool:
+        """
+        缓存完整的事件序列
+        
+        Args:
+            key: 缓存键
+            events: 事件序列（需包含完成事件）
+            question: 用户问题（提供时加入近似问题索引）
+            context: 缓存上下文
+            
+        Returns:
+            bool: 是否写入
+        """
+        if not self.enabled or not events:
+            return False
+        
+        stored = self._cache.put(key, events)
+        if stored and question is not None and self.semantic_index is not None:
+            try:
+                self.semantic_index.add(question, key, context)
+            except Exception as e:
+                logger.error(f"Error adding question to semantic index: {str(e)}")
+        return stored
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        self._cache.clear()
+        if self.semantic_index is not None:
+            self.semantic_index.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        stats = self._cache.get_stats()
+        # hits 为返回缓存回答的总次数，分别列出精确命中和近似命中
+        stats['exact_hits'] = stats['hits']
+        stats['semantic_hits'] = stats.pop('secondary_hits')
+        stats['hits'] = stats['exact_hits'] + stats['semantic_hits']
+        stats['enabled'] = self.enabled
+        if self.semantic_index is not None:
+            stats['semantic'] = self.semantic_index.get_stats()
+            stats['semantic']['served'] = stats['semantic_hits']
+        return stats
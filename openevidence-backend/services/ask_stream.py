@@ -0,0 +1,349 @@
+"""
+问答流处理器
+将 Baichuan 流式响应块转换为 /api/ask 的 SSE 事件，
+与具体的服务器模型（Flask 线程 / ASGI 事件循环）无关
+"""
+
+import logging
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, TYPE_CHECKING
+
+from utils.citation_parser import CitationParser
+from utils.citation_tokenizer import StreamingCitationTokenizer, join_tokens
+from utils.metrics import REGISTRY, STAGE_ERRORS
+from utils.serialization import dumps, timestamp
+
+if TYPE_CHECKING:
+    from services.follow_up import FollowUpTask
+    from services.request_timing import RequestTimer
+    from utils.text_processor import TextProcessor
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNKS = REGISTRY.counter(
+    'openevidence_stream_chunks_total', 'Upstream chunks processed by stream handlers', ('component',)
+)
+STREAM_EVENTS = REGISTRY.counter(
+    'openevidence_stream_events_total', 'SSE events produced by stream handlers', ('component',)
+)
+_CHUNKS = STREAM_CHUNKS.labels('ask')
+_EVENTS = STREAM_EVENTS.labels('ask')
+_CHUNK_ERRORS = STAGE_ERRORS.labels('chunk')
+
+def event_name(event: Dict[str, Any]) -> str:
+    """
+    事件对应的 SSE event 字段
+    
+    Args:
+        event: 事件数据
+        
+    Returns:
+        str: 带 type 的事件取 type，其余为 error / complete / content
+    """
+    if 'type' in event:
+        return event['type']
+    if 'error' in event:
+        return 'error'
+    if event.get('isComplete'):
+        return 'complete'
+    return 'content'
+
+class AskStreamProcessor:
+    """单次问答请求的流式事件处理器"""
+    
+    def __init__(self, citation_parser: CitationParser, session_id: str,
+                 timer: Optional['RequestTimer'] = None,
+                 text_processor: Optional['TextProcessor'] = None):
+        """
+        初始化处理器
+        
+        Args:
+            citation_parser: 引用解析器
+            session_id: 会话ID
+            timer: 请求计时器（记录思考、引用、首个内容和结束阶段）
+            text_processor: 文本处理器（给出时随回答统计文本结构，随完成事件发送）
+        """
+        self.citation_parser = citation_parser
+        self.timer = timer
+        self.citation_tokenizer = StreamingCitationTokenizer()
+        self.session_id = session_id
+        self.current_content = ""
+        self.references = []
+        self.reference_index = frozenset()
+        self.thinking_complete = False
+        self.finished = False
+        self.structure_analyzer = text_processor.create_stream_analyzer() if text_processor is not None else None
+        # 已发送的事件序列（用于问答缓存）
+        self.events = []
+    
+    def process_chunk(self, chunk: Any) -> List[Dict[str, Any]]:
+        """
+        处理单个流式响应块
+        
+        Args:
+            chunk: Baichuan 流式响应块
+            
+        Returns:
+            List[Dict]: 需要发送的事件列表；收到 finish_reason == 'stop' 时置 finished
+        """
+        _CHUNKS.inc()
+        events = self._build_events(chunk)
+        if events:
+            _EVENTS.inc(len(events))
+            self.events.extend(events)
+        return events
+    
+    def _build_events(self, chunk: Any) -> List[Dict[str, Any]]:
+        """将单个响应块转换为事件列表"""
+        events = []
+        
+        try:
+            choice = chunk.choices[0]
+            
+            # 检查是否是思考阶段
+            if hasattr(choice, 'thinking') and choice.thinking:
+                self._mark('first_thinking')
+                thinking_status = choice.thinking.get('status')
+                if thinking_status == 'completed':
+                    self.thinking_complete = True
+                    # 发送思考完成信号
+                    events.append({
+                        'type': 'thinking_complete',
+                        'isComplete': False,
+                        'timestamp': timestamp()
+                    })
+                return events
+            
+            # 检查是否有引用信息
+            if hasattr(choice, 'grounding') and choice.grounding:
+                grounding = choice.grounding
+                if 'evidence' in grounding:
+                    # 解析引用信息
+                    self.references = self.citation_parser.parse_baichuan_references(
+                        grounding['evidence']
+                    )
+                    self.reference_index = self.citation_parser.build_reference_index(self.references)
+                    self._mark('references_loaded')
+                    
+                    # 发送引用信息
+                    events.append({
+                        'type': 'references_loaded',
+                        'references': self.references,
+                        'isComplete': False,
+                        'timestamp': timestamp()
+                    })
+                    return events
+            
+            # 处理文本内容（跨块的引用标记会暂存到标记完整后再发送）
+            delta = choice.delta
+            if delta and delta.content:
+                content = delta.content
+                self.current_content += content
+                if self.structure_analyzer is not None:
+                    self.structure_analyzer.feed(content)
+                
+                content_event = self._build_content_event(self.citation_tokenizer.feed(content))
+                if content_event:
+                    self._mark('first_content')
+                    events.append(content_event)
+            
+            # 检查是否完成
+            if choice.finish_reason == 'stop':
+                self.finished = True
+                self._mark('stop')
+                
+                # 发送暂存的剩余文本
+                content_event = self._build_content_event(self.citation_tokenizer.flush())
+                if content_event:
+                    self._mark('first_content')
+                    events.append(content_event)
+                
+        except Exception as chunk_error:
+            _CHUNK_ERRORS.inc()
+            logger.error(f"Error processing chunk: {str(chunk_error)}")
+        
+        return events
+    
+    def _mark(self, stage: str) -> None:
+        """记录请求阶段时刻"""
+        if self.timer is not None:
+            self.timer.mark(stage)
+    
+    def _tag(self, **tags: Any) -> None:
+        """添加请求计时日志字段"""
+        if self.timer is not None:
+            self.timer.tag(**tags)
+    
+    def _build_content_event(self, tokens: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        将分词器输出的片段构建为内容事件
+        
+        Args:
+            tokens: 文本片段和引用片段
+            
+        Returns:
+            Optional[Dict]: 内容事件，没有可发送的文本时返回 None
+        """
+        content, citations = join_tokens(tokens)
+        if not content:
+            return None
+        
+        citations = self.citation_parser.validate_citations(
+            citations, self.references, self.reference_index
+        )
+        if citations:
+            # 发送带引用的内容
+            return {
+                'content': content,
+                'citations': citations,
+                'isComplete': False,
+                'timestamp': timestamp()
+            }
+        
+        # 发送普通内容
+        return {
+            'content': content,
+            'isComplete': False,
+            'timestamp': timestamp()
+        }
+    
+    def build_follow_up_ready(self, follow_up_questions: List[str]) -> Dict[str, Any]:
+        """
+        构建后续问题就绪事件（完成事件发送时后续问题尚未就绪时，在完成事件之后发送）
+        
+        Args:
+            follow_up_questions: 后续问题列表
+            
+        Returns:
+            Dict: 后续问题事件
+        """
+        event = {
+            'type': 'follow_up_ready',
+            'followUpQuestions': follow_up_questions,
+            'isComplete': False,
+            'timestamp': timestamp()
+        }
+        self.events.append(event)
+        return event
+    
+    def build_completion(self, follow_up_questions: Optional[List[str]]) -> Dict[str, Any]:
+        """
+        构建完成事件
+        
+        Args:
+            follow_up_questions: 后续问题列表（None 表示尚未就绪，之后以 follow_up_ready 事件发送）
+            
+        Returns:
+            Dict: 完成事件
+        """
+        completion = {
+            'isComplete': True,
+            'references': self.references,
+            'followUpQuestions': follow_up_questions or [],
+            'followUpPending': follow_up_questions is None,
+            'sessionId': self.session_id,
+            'timestamp': timestamp()
+        }
+        # 回答的结构统计（增量统计，不再扫描完整回答）
+        if self.structure_analyzer is not None:
+            structure = self.structure_analyzer.finalize()
+            if structure is not None:
+                completion['structure'] = structure
+        self.events.append(completion)
+        return completion
+    
+    def finish(self, follow_up: 'FollowUpTask') -> Iterator[Dict[str, Any]]:
+        """
+        回答结束：发送完成事件，不等待后续问题（回答较短时此时才开始生成）；
+        后续问题尚未就绪时，就绪（超时或出错时为默认问题）后再发送后续问题就绪事件
+        
+        Args:
+            follow_up: 本次请求的后续问题任务
+            
+        Yields:
+            Dict: 完成事件，以及可能的后续问题就绪事件
+        """
+        follow_up.start(self.current_content)
+        pending = not follow_up.done()
+        yield self.build_completion(None if pending else follow_up.result(self.current_content))
+        self._tag(status='completed')
+        
+        if pending:
+            yield self.build_follow_up_ready(follow_up.result(self.current_content))
+        self._mark('follow_up_done')
+        self._tag(follow_up_speculative=follow_up.speculative)
+    
+    async def finish_async(self, follow_up: 'FollowUpTask') -> AsyncIterator[Dict[str, Any]]:
+        """
+        回答结束（异步版本，后续问题在事件循环任务中生成），参数同 finish
+        
+        Yields:
+            Dict: 完成事件，以及可能的后续问题就绪事件
+        """
+        follow_up.start_async(self.current_content)
+        pending = not follow_up.done()
+        yield self.build_completion(None if pending else await follow_up.result_async(self.current_content))
+        self._tag(status='completed')
+        
+        if pending:
+            yield self.build_follow_up_ready(await follow_up.result_async(self.current_content))
+        self._mark('follow_up_done')
+        self._tag(follow_up_speculative=follow_up.speculative)
+    
+    def replay(self, cached_events: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        回放缓存的事件序列（刷新时间戳，完成事件使用当前会话ID）
+        
+        Args:
+            cached_events: 缓存的事件序列
+            
+        Yields:
+            Dict: 事件
+        """
+        for cached_event in cached_events:
+            event = dict(cached_event)
+            event['timestamp'] = timestamp()
+            
+            if event.get('isComplete'):
+                event['sessionId'] = self.session_id
+                event['cached'] = True
+                self.references = event.get('references', [])
+                self.finished = True
+                self._mark('stop')
+            elif 'content' in event:
+                self.current_content += event['content']
+                self._mark('first_content')
+            
+            yield event
+    
+    @staticmethod
+    def build_error(error: Exception) -> Dict[str, Any]:
+        """
+        构建错误事件
+        
+        Args:
+            error: 异常
+            
+        Returns:
+            Dict: 错误事件
+        """
+        return {
+            'error': f'Streaming error: {str(error)}',
+            'isComplete': True,
+            'timestamp': timestamp()
+        }
+    
+    @staticmethod
+    def format_sse(event: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+        """
+        格式化为 SSE 数据帧
+        
+        Args:
+            event: 事件数据
+            event_id: 事件 ID（给出时同时输出 id: 和 event: 字段，用于断线续传）
+            
+        Returns:
+            bytes: UTF-8 编码的 SSE 数据帧
+        """
+        if event_id is None:
+            return b"data: " + dumps(event) + b"\n\n"
+        return f"id: {event_id}\nevent: {event_name(event)}\ndata: ".encode('utf-8') + dumps(event) + b"\n\n"
@@ -0,0 +1,218 @@
+"""
+批量文本分析
+对存档的回答（JSONL，每行一个 JSON 对象）运行 analyze_text_structure、extract_key_points 和
+segment_text_with_citations。输入按块提交到进程池（在途的块数有上限，输入可以是任意长的流），
+结果按输入顺序输出；每行的解析、分析和序列化都在工作进程中完成
+
+用法:
+    python -m services.batch_analysis answers.jsonl -o results.jsonl --workers 8
+    cat answers.jsonl | python -m services.batch_analysis - --text-field content > results.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from utils.citation_parser import CitationParser
+from utils.serialization import dumps
+from utils.text_processor import TextProcessor
+
+logger = logging.getLogger(__name__)
+
+# 可选的分析项
+OPERATIONS = ('structure', 'key_points', 'citation_segments')
+
+# 每个任务包含的记录数（越大进程间通信开销越小，但结果输出越不均匀）
+DEFAULT_CHUNK_SIZE = 64
+
+# 工作进程中的分析器（由进程池的 initializer 创建）
+_worker = None
+
+class _RecordAnalyzer:
+    """单条记录的分析（每个进程一个实例）"""
+    
+    def __init__(self, operations: Sequence[str], text_field: str, references_field: str,
+                 glossary_path: str, matcher_path: str):
+        self.operations = tuple(operations)
+        self.text_field = text_field
+        self.references_field = references_field
+        self.text_processor = TextProcessor(glossary_path=glossary_path, matcher_path=matcher_path)
+        self.citation_parser = CitationParser()
+    
+    def analyze(self, record: Any) -> Dict[str, Any]:
+        """分析一条记录，记录格式错误时返回 error"""
+        if not isinstance(record, dict):
+            return {'error': 'Record is not a JSON object'}
+        text = record.get(self.text_field)
+        if not isinstance(text, str):
+            return {'id': record.get('id'), 'error': f"Missing text field: {self.text_field}"}
+        
+        result: Dict[str, Any] = {'id': record.get('id')}
+        if 'structure' in self.operations:
+            result['structure'] = self.text_processor.analyze_text_structure(text)
+        if 'key_points' in self.operations:
+            result['key_points'] = self.text_processor.extract_key_points(text)
+        if 'citation_segments' in self.operations:
+            references = record.get(self.references_field) or []
+            result['citation_segments'] = self.citation_parser.segment_text_with_citations(text, references)
+        return result
+    
+    def analyze_line(self, line: str) -> bytes:
+        """解析、分析并序列化一行 JSONL"""
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            return dumps({'error': f"Invalid JSON: {str(e)}"})
+        return dumps(self.analyze(record))
+
+def _init_worker(options: Dict[str, Any], log_level: int) -> None:
+    """进程池 initializer：创建本进程的分析器"""
+    global _worker
+    logging.getLogger().setLevel(log_level)
+    _worker = _RecordAnalyzer(**options)
+
+def _run_chunk(method: str, items: List[Any]) -> List[Any]:
+    """在工作进程中处理一块记录"""
+    handler = getattr(_worker, method)
+    return [handler(item) for item in items]
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _map_ordered(method: str, items: Iterable[Any], options: Dict[str, Any], workers: Optional[int],
+                 chunk_size: int, max_pending: Optional[int]) -> Iterator[Any]:
+    """
+    按块提交到进程池并按输入顺序输出结果
+    
+    与 Executor.map 不同，输入按需读取：在途的块数达到上限后先等待最早的块完成
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1:
+        # 单进程直接处理，没有进程间通信
+        handler = getattr(_RecordAnalyzer(**options), method)
+        for item in items:
+            yield handler(item)
+        return
+    
+    max_pending = max_pending or 2 * workers
+    log_level = logging.getLogger().getEffectiveLevel()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(options, log_level)) as executor:
+        pending = deque()
+        try:
+            for chunk in _chunks(items, max(chunk_size, 1)):
+                pending.append(executor.submit(_run_chunk, method, chunk))
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # 调用方提前停止读取时取消尚未开始的块
+            for future in pending:
+                future.cancel()
+
+def _options(operations: Sequence[str], text_field: str, references_field: str,
+             glossary_path: str, matcher_path: str) -> Dict[str, Any]:
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f"Unknown operations: {sorted(unknown)}")
+    return {
+        'operations': tuple(operations),
+        'text_field': text_field,
+        'references_field': references_field,
+        'glossary_path': glossary_path,
+        'matcher_path': matcher_path
+    }
+
+def analyze_records(records: Iterable[Dict[str, Any]], workers: Optional[int] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, operations: Sequence[str] = OPERATIONS,
+                    text_field: str = 'content', references_field: str = 'references',
+                    glossary_path: str = '', matcher_path: str = '',
+                    max_pending: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    批量分析记录
+    
+    Args:
+        records: 记录（含 id、回答文本和可选的引用列表），可以是惰性的迭代器
+        workers: 工作进程数（默认 CPU 核数，1 表示在当前进程中处理）
+        chunk_size: 每个任务包含的记录数
+        operations: 分析项（OPERATIONS 的子集）
+        text_field: 回答文本字段
+        references_field: 引用列表字段
+        glossary_path: 术语词典文件（为空时使用内置词典）
+        matcher_path: 术语匹配自动机的缓存文件
+        max_pending: 在途的最大块数（默认为工作进程数的两倍）
+        
+    Returns:
+        Iterator[Dict]: 分析结果（与输入顺序一致）
+    """
+    options = _options(operations, text_field, references_field, glossary_path, matcher_path)
+    return _map_ordered('analyze', records, options, workers, chunk_size, max_pending)
+
+def analyze_jsonl(lines: Iterable[str], workers: Optional[int] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE, operations: Sequence[str] = OPERATIONS,
+                  text_field: str = 'content', references_field: str = 'references',
+                  glossary_path: str = '', matcher_path: str = '',
+                  max_pending: Optional[int] = None) -> Iterator[bytes]:
+    """
+    批量分析 JSONL 文本行（跳过空行），参数同 analyze_records
+    
+    Returns:
+        Iterator[bytes]: 每行输入对应的 UTF-8 JSON 结果（不含换行，与输入顺序一致）
+    """
+    options = _options(operations, text_field, references_field, glossary_path, matcher_path)
+    lines = (line for line in lines if line.strip())
+    return _map_ordered('analyze_line', lines, options, workers, chunk_size, max_pending)
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch text analysis of archived answers (JSONL in, JSONL out)')
+    parser.add_argument('input', help="JSONL file, or '-' for stdin")
+    parser.add_argument('-o', '--output', default='-', help="output JSONL file (default: stdout)")
+    parser.add_argument('--workers', type=int, default=0, help='worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument('--text-field', default='content')
+    parser.add_argument('--references-field', default='references')
+    parser.add_argument('--glossary', default=os.environ.get('MEDICAL_GLOSSARY_PATH', ''))
+    parser.add_argument('--matcher', default=os.environ.get('MEDICAL_GLOSSARY_MATCHER_PATH', ''))
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=args.log_level.upper())
+    
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    target = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    count = 0
+    start = time.perf_counter()
+    try:
+        for result in analyze_jsonl(source, workers=args.workers or None, chunk_size=args.chunk_size,
+                                    operations=args.operations, text_field=args.text_field,
+                                    references_field=args.references_field,
+                                    glossary_path=args.glossary, matcher_path=args.matcher):
+            target.write(result + b'\n')
+            count += 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout.buffer:
+            target.close()
+        else:
+            target.flush()
+    
+    elapsed = time.perf_counter() - start
+    print(f"Analyzed {count} records in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f} records/s)",
+          file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+"""
+后续问题生成调度
+后续问题提示词只使用回答的前 FOLLOW_UP_CONTEXT_LENGTH 个字符，回答达到该长度后即可
+在回答流式输出的同时生成后续问题（结果与回答结束后再生成完全一致）；
+完成事件不等待后续问题，尚未就绪时在其后单独发送，超时则使用默认后续问题
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, List, Optional, TYPE_CHECKING
+
+from services.llm_service import FOLLOW_UP_CONTEXT_LENGTH
+from utils.metrics import REGISTRY, STAGE_ERRORS
+
+if TYPE_CHECKING:
+    from services.follow_up_cache import FollowUpCache
+
+logger = logging.getLogger(__name__)
+
+FOLLOW_UP_RESULTS = REGISTRY.counter(
+    'openevidence_follow_up_results_total', 'Follow-up question results by outcome', ('outcome', 'speculative')
+)
+FOLLOW_UP_CACHE_LOOKUPS = REGISTRY.counter(
+    'openevidence_follow_up_cache_lookups_total', 'Follow-up cache lookups by result', ('result',)
+)
+_FOLLOW_UP_ERRORS = STAGE_ERRORS.labels('follow_up')
+
+class FollowUpScheduler:
+    """后续问题生成调度器（所有请求共享；同步请求使用线程池，异步请求使用事件循环任务）"""
+    
+    def __init__(self, llm_service: Any, max_workers: int = 8, timeout: float = 10.0,
+                 speculative: bool = True, cache: Optional['FollowUpCache'] = None):
+        """
+        初始化调度器
+        
+        Args:
+            llm_service: LLM 服务（提供 generate_follow_up_questions / _async 和默认后续问题）
+            max_workers: 同步请求使用的线程池大小
+            timeout: 回答结束后等待后续问题的最长时间（秒）
+            speculative: 回答达到提示词所需长度后是否提前开始生成
+            cache: 后续问题缓存（None 表示每次都调用上游）
+        """
+        self.llm_service = llm_service
+        self.timeout = timeout
+        self.speculative = speculative
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='follow-up')
+        logger.info("Follow-up scheduler initialized")
+    
+    def track(self, question: str) -> 'FollowUpTask':
+        """
+        为一次问答请求创建后续问题任务
+        
+        Args:
+            question: 原始问题
+            
+        Returns:
+            FollowUpTask: 后续问题任务
+        """
+        return FollowUpTask(self, question)
+    
+    def submit(self, question: str, answer_content: str) -> Future:
+        """
+        在线程池中生成后续问题（缓存命中时直接返回已完成的 Future）
+        
+        Args:
+            question: 原始问题
+            answer_content: 回答内容
+            
+        Returns:
+            Future: 后续问题列表
+        """
+        key = self._cache_key(question, answer_content)
+        cached = self._cache_get(key)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+        
+        future = self._executor.submit(
+            self.llm_service.generate_follow_up_questions,
+            question, answer_content[:FOLLOW_UP_CONTEXT_LENGTH]
+        )
+        if key is not None:
+            future.add_done_callback(lambda done: self._cache_put(key, done))
+        return future
+    
+    def create_task(self, question: str, answer_content: str) -> 'asyncio.Future':
+        """
+        创建生成后续问题的事件循环任务（缓存命中时直接返回已完成的 Future）
+        
+        Args:
+            question: 原始问题
+            answer_content: 回答内容
+            
+        Returns:
+            asyncio.Future: 后续问题列表
+        """
+        key = self._cache_key(question, answer_content)
+        cached = self._cache_get(key)
+        if cached is not None:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(cached)
+            return future
+        
+        task = asyncio.ensure_future(
+            self.llm_service.generate_follow_up_questions_async(
+                question, answer_content[:FOLLOW_UP_CONTEXT_LENGTH]
+            )
+        )
+        if key is not None:
+            task.add_done_callback(lambda done: self._cache_put(key, done))
+        return task
+    
+    def _cache_key(self, question: str, answer_content: str) -> Optional[str]:
+        """按后续问题请求内容构建缓存键，未启用缓存时返回 None"""
+        if self.cache is None or not self.cache.enabled:
+            return None
+        
+        try:
+            identity = self.llm_service.get_follow_up_identity(question, answer_content)
+            return self.cache.build_key(identity)
+        except Exception as e:
+            logger.error(f"Error building follow-up cache key: {str(e)}")
+            return None
+    
+    def _cache_get(self, key: Optional[str]) -> Optional[List[str]]:
+        """读取缓存的后续问题"""
+        if key is None:
+            return None
+        
+        questions = self.cache.get(key)
+        FOLLOW_UP_CACHE_LOOKUPS.labels('hit' if questions is not None else 'miss').inc()
+        return questions
+    
+    def _cache_put(self, key: str, future: Any) -> None:
+        """生成完成后写入缓存（取消、失败或返回默认问题时不缓存）"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        
+        questions = future.result()
+        if questions == self.llm_service.get_default_follow_up_questions():
+            return
+        self.cache.put(key, questions)
+    
+    def shutdown(self) -> None:
+        """关闭线程池（不等待进行中的生成）"""
+        self._executor.shutdown(wait=False)
+
+class FollowUpTask:
+    """单次问答请求的后续问题生成任务"""
+    
+    def __init__(self, scheduler: FollowUpScheduler, question: str):
+        """
+        初始化任务
+        
+        Args:
+            scheduler: 调度器
+            question: 原始问题
+        """
+        self.scheduler = scheduler
+        self.question = question
+        self.speculative = False
+        # 结果是否为默认后续问题（超时、出错或生成失败），此时回答不写入问答缓存
+        self.used_defaults = False
+        self._future: Optional[Future] = None
+        self._task: Optional[asyncio.Future] = None
+    
+    @property
+    def started(self) -> bool:
+        """是否已开始生成"""
+        return self._future is not None or self._task is not None
+    
+    def _ready_to_speculate(self, answer_content: str) -> bool:
+        """回答长度已足够构建最终提示词"""
+        return (self.scheduler.speculative and not self.started and
+                len(answer_content) >= FOLLOW_UP_CONTEXT_LENGTH)
+    
+    def maybe_start(self, answer_content: str) -> None:
+        """
+        回答达到提示词所需长度时在线程池中提前开始生成
+        
+        Args:
+            answer_content: 当前已生成的回答
+        """
+        if self._ready_to_speculate(answer_content):
+            self.speculative = True
+            self._start(answer_content)
+    
+    def maybe_start_async(self, answer_content: str) -> None:
+        """
+        回答达到提示词所需长度时创建事件循环任务提前开始生成
+        
+        Args:
+            answer_content: 当前已生成的回答
+        """
+        if self._ready_to_speculate(answer_content):
+            self.speculative = True
+            self._start_async(answer_content)
+    
+    def _start(self, answer_content: str) -> None:
+        """在线程池中开始生成"""
+        self._future = self.scheduler.submit(self.question, answer_content)
+    
+    def _start_async(self, answer_content: str) -> None:
+        """创建事件循环任务开始生成"""
+        self._task = self.scheduler.create_task(self.question, answer_content)
+    
+    def start(self, answer_content: str) -> None:
+        """
+        回答结束时尚未开始则在线程池中开始生成
+        
+        Args:
+            answer_content: 完整回答
+        """
+        if self._future is None:
+            self._start(answer_content)
+    
+    def start_async(self, answer_content: str) -> None:
+        """
+        回答结束时尚未开始则创建事件循环任务开始生成
+        
+        Args:
+            answer_content: 完整回答
+        """
+        if self._task is None:
+            self._start_async(answer_content)
+    
+    def done(self) -> bool:
+        """生成是否已结束（结果可以立即取得，不需要等待）"""
+        pending = self._future if self._future is not None else self._task
+        return pending is not None and pending.done()
+    
+    def result(self, answer_content: str) -> List[str]:
+        """
+        获取后续问题（尚未开始时立即开始），超时返回默认后续问题
+        
+        Args:
+            answer_content: 完整回答
+            
+        Returns:
+            List[str]: 后续问题列表
+        """
+        if self._future is None:
+            self._start(answer_content)
+        
+        start = time.monotonic()
+        try:
+            questions = self._future.result(timeout=self.scheduler.timeout)
+            self._record('ok')
+            return self._checked(questions)
+        except FutureTimeoutError:
+            self._record('timeout')
+            # 线程池中正在运行的生成无法中断，由上游请求的超时结束（启用缓存时结果仍会写入缓存）
+            logger.warning(f"Follow-up generation timed out after {self.scheduler.timeout}s, using defaults")
+            return self._use_defaults()
+        except Exception as e:
+            self._record('error')
+            logger.error(f"Error waiting for follow-up questions: {str(e)}")
+            return self._use_defaults()
+        finally:
+            logger.debug(
+                f"Follow-up questions ready after {(time.monotonic() - start) * 1000:.1f}ms "
+                f"(speculative: {self.speculative})"
+            )
+    
+    async def result_async(self, answer_content: str) -> List[str]:
+        """
+        异步获取后续问题（尚未开始时立即开始），超时返回默认后续问题
+        
+        Args:
+            answer_content: 完整回答
+            
+        Returns:
+            List[str]: 后续问题列表
+        """
+        if self._task is None:
+            self._start_async(answer_content)
+        
+        start = time.monotonic()
+        try:
+            questions = await asyncio.wait_for(self._task, timeout=self.scheduler.timeout)
+            self._record('ok')
+            return self._checked(questions)
+        except asyncio.TimeoutError:
+            # wait_for 超时会取消任务
+            self._record('timeout')
+            logger.warning(f"Follow-up generation timed out after {self.scheduler.timeout}s, using defaults")
+            return self._use_defaults()
+        except Exception as e:
+            self._record('error')
+            logger.error(f"Error waiting for follow-up questions (async): {str(e)}")
+            return self._use_defaults()
+        finally:
+            logger.debug(
+                f"Follow-up questions ready after {(time.monotonic() - start) * 1000:.1f}ms "
+                f"(speculative: {self.speculative})"
+            )
+    
+    def _checked(self, questions: List[str]) -> List[str]:
+        """生成失败时 llm_service 也返回默认后续问题"""
+        self.used_defaults = questions == self.scheduler.llm_service.get_default_follow_up_questions()
+        return questions
+    
+    def _use_defaults(self) -> List[str]:
+        """超时或出错时使用默认后续问题"""
+        self.used_defaults = True
+        return self.scheduler.llm_service.get_default_follow_up_questions()
+    
+    def _record(self, outcome: str) -> None:
+        """记录后续问题结果"""
+        FOLLOW_UP_RESULTS.labels(outcome, 'true' if self.speculative else 'false').inc()
+        if outcome != 'ok':
+            _FOLLOW_UP_ERRORS.inc()
+    
+    def cancel(self) -> None:
+        """请求提前结束（客户端断开或出错）时取消尚未完成的生成（线程池中只能取消尚未开始运行的）"""
+        if self._future is not None:
+            self._future.cancel()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
@@ -0,0 +1,203 @@
+"""
+后续问题缓存服务
+后续问题提示词由原始问题和回答前 500 个字符构成，相同问题会产生相同的提示词；
+按请求内容（模型、生成参数、提示词）的摘要缓存生成结果，可选持久化到磁盘，重启后仍可命中
+"""
+
+import os
+import json
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from services.answer_cache import BoundedTTLCache
+
+logger = logging.getLogger(__name__)
+
+# 持久化文件格式版本
+PERSIST_FORMAT_VERSION = 1
+
+class FollowUpCache:
+    """后续问题缓存（线程安全）"""
+    
+    def __init__(self, max_entries: int = 5000, ttl: Optional[float] = 86400.0, enabled: bool = True,
+                 persist_path: Optional[str] = None, save_interval: float = 60.0):
+        """
+        初始化后续问题缓存
+        
+        Args:
+            max_entries: 最大缓存条目数
+            ttl: 缓存存活时间（秒）
+            enabled: 是否启用
+            persist_path: 持久化文件路径（None 表示只缓存在内存中）
+            save_interval: 有新条目时写入磁盘的最短间隔（秒）
+        """
+        self.enabled = enabled
+        self.persist_path = persist_path or None
+        self.save_interval = save_interval
+        self.loaded = 0
+        self.saves = 0
+        self._cache = BoundedTTLCache(max_entries=max_entries, ttl=ttl)
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._save_lock = threading.Lock()
+        
+        if self.enabled and self.persist_path:
+            self.load()
+            # 进程退出时保存最新内容（等待后台线程中进行中的保存完成）
+            atexit.register(self.save, blocking=True)
+        
+        logger.info(
+            f"Follow-up cache initialized (enabled: {enabled}, max entries: {max_entries}, "
+            f"persist: {self.persist_path}, loaded: {self.loaded})"
+        )
+    
+    @staticmethod
+    def build_key(identity: Dict[str, Any]) -> str:
+        """
+        构建缓存键
+        
+        Args:
+            identity: 后续问题请求内容（模型、生成参数、提示词）
+            
+        Returns:
+            str: 缓存键（SHA-256）
+        """
+        payload = json.dumps(identity, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[List[str]]:
+        """
+        获取缓存的后续问题
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            Optional[List[str]]: 后续问题列表，未命中返回 None
+        """
+        if not self.enabled:
+            return None
+        return self._cache.get(key)
+    
+    def put(self, key: str, questions: List[str]) -> bool:
+        """
+        缓存后续问题
+        
+        Args:
+            key: 缓存键
+            questions: 后续问题列表
+            
+        Returns:
+            bool: 是否写入
+        """
+        if not self.enabled or not questions:
+            return False
+        
+        stored = self._cache.put(key, list(questions))
+        if stored and self.persist_path:
+            self._dirty = True
+            if time.monotonic() - self._last_save >= self.save_interval:
+                # 在后台线程写入磁盘，不阻塞请求
+                threading.Thread(target=self.save, name='follow-up-cache-save', daemon=True).start()
+        return stored
+    
+    def load(self) -> int:
+        """
+        从磁盘加载缓存（跳过已过期的条目）
+        
+        Returns:
+            int: 加载的条目数
+        """
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return 0
+        
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            
+            if data.get('version') != PERSIST_FORMAT_VERSION:
+                logger.warning(f"Ignoring follow-up cache file with unknown version: {self.persist_path}")
+                return 0
+            
+            now = time.time()
+            loaded = 0
+            # 文件中按最久未使用到最近使用排列，依次写入以保持 LRU 顺序
+            for key, questions, expires_at in data.get('entries', []):
+                if expires_at is not None and expires_at <= now:
+                    continue
+                expires_in = expires_at - now if expires_at is not None else None
+                if self._cache.put(key, questions, expires_in=expires_in):
+                    loaded += 1
+            
+            self.loaded = loaded
+            logger.info(f"Loaded {loaded} follow-up cache entries from {self.persist_path}")
+            return loaded
+            
+        except Exception as e:
+            logger.error(f"Error loading follow-up cache: {str(e)}")
+            return 0
+    
+    def save(self, blocking: bool = False) -> bool:
+        """
+        将缓存写入磁盘（先写临时文件再原子替换）
+        
+        Args:
+            blocking: 已有保存在进行中时是否等待其完成（进程退出时使用，否则跳过）
+            
+        Returns:
+            bool: 是否写入
+        """
+        if not self.persist_path:
+            return False
+        
+        if not self._save_lock.acquire(blocking=blocking):
+            return False
+        
+        try:
+            if not self._dirty:
+                return False
+            self._dirty = False
+            self._last_save = time.monotonic()
+            
+            # 剩余存活时间转换为绝对时间，重启后继续计算
+            now = time.time()
+            entries = [
+                [key, questions, now + expires_in if expires_in is not None else None]
+                for key, questions, expires_in in self._cache.items()
+            ]
+            
+            directory = os.path.dirname(os.path.abspath(self.persist_path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.persist_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': PERSIST_FORMAT_VERSION, 'entries': entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+            
+            self.saves += 1
+            return True
+            
+        except Exception as e:
+            self._dirty = True
+            logger.error(f"Error saving follow-up cache: {str(e)}")
+            return False
+        finally:
+            self._save_lock.release()
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        self._cache.clear()
+        if self.persist_path:
+            self._dirty = True
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        stats = self._cache.get_stats()
+        stats['enabled'] = self.enabled
+        stats['persist_path'] = self.persist_path
+        stats['loaded'] = self.loaded
+        stats['saves'] = self.saves
+        return stats
@@ -0,0 +1,162 @@
+"""
+上游健康监控服务
+后台按固定间隔探测 Baichuan 上游，记录延迟和错误率；
+/health 等端点直接读取缓存状态，不再每次请求都调用上游
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class HealthMonitor:
+    """上游健康监控器"""
+    
+    def __init__(self, probe: Callable[[], Any], interval: float = 30.0,
+                 window: int = 20, stale_after: Optional[float] = None):
+        """
+        初始化健康监控器
+        
+        Args:
+            probe: 探测函数，抛出异常视为失败
+            interval: 探测间隔（秒）
+            window: 计算错误率和平均延迟的最近探测次数
+            stale_after: 超过该时间（秒）没有成功探测则视为未就绪，默认为 3 倍探测间隔
+        """
+        self.probe = probe
+        self.interval = interval
+        self.stale_after = stale_after if stale_after is not None else interval * 3
+        
+        self._results = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        
+        self._available = False
+        self._last_check = None
+        self._last_check_monotonic = None
+        self._last_success_monotonic = None
+        self._last_success = None
+        self._last_latency_ms = None
+        self._last_error = None
+        self._consecutive_failures = 0
+        self._probes_total = 0
+        self._failures_total = 0
+        
+        logger.info("Health monitor initialized")
+    
+    def start(self) -> None:
+        """启动后台探测线程（立即执行第一次探测）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='upstream-health-monitor', daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Health monitor started (interval: {self.interval}s)")
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止后台探测线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def _run(self) -> None:
+        """后台探测循环"""
+        while not self._stop_event.is_set():
+            self.probe_once()
+            self._stop_event.wait(self.interval)
+    
+    def probe_once(self) -> bool:
+        """
+        执行一次探测并记录结果
+        
+        Returns:
+            bool: 探测是否成功
+        """
+        start = time.monotonic()
+        error = None
+        
+        try:
+            self.probe()
+        except Exception as e:
+            error = e
+        
+        finished = time.monotonic()
+        latency_ms = (finished - start) * 1000
+        
+        with self._lock:
+            self._probes_total += 1
+            self._last_check = datetime.now().isoformat()
+            self._last_check_monotonic = finished
+            self._last_latency_ms = latency_ms
+            self._results.append((error is None, latency_ms))
+            
+            if error is None:
+                self._available = True
+                self._last_success = self._last_check
+                self._last_success_monotonic = finished
+                self._last_error = None
+                self._consecutive_failures = 0
+            else:
+                self._available = False
+                self._last_error = str(error)
+                self._consecutive_failures += 1
+                self._failures_total += 1
+        
+        if error is not None:
+            logger.error(f"Upstream health probe failed: {str(error)}")
+        
+        return error is None
+    
+    def is_available(self) -> bool:
+        """最近一次探测是否成功（读取缓存）"""
+        return self._available
+    
+    def is_live(self) -> bool:
+        """存活检查：进程可以处理请求即为存活"""
+        return True
+    
+    def is_ready(self) -> bool:
+        """就绪检查：最近一次探测成功，且成功探测未过期"""
+        with self._lock:
+            if not self._available or self._last_success_monotonic is None:
+                return False
+            return time.monotonic() - self._last_success_monotonic <= self.stale_after
+    
+    def get_status(self) -> Dict[str, Any]:
+        """
+        获取缓存的健康状态
+        
+        Returns:
+            Dict: 健康状态（可用性、延迟、错误率等）
+        """
+        with self._lock:
+            results = list(self._results)
+            successes = [latency for ok, latency in results if ok]
+            age = (time.monotonic() - self._last_check_monotonic
+                   if self._last_check_monotonic is not None else None)
+            
+            status = {
+                'available': self._available,
+                'last_check': self._last_check,
+                'last_success': self._last_success,
+                'seconds_since_check': round(age, 3) if age is not None else None,
+                'last_latency_ms': round(self._last_latency_ms, 2) if self._last_latency_ms is not None else None,
+                'avg_latency_ms': round(sum(successes) / len(successes), 2) if successes else None,
+                'error_rate': round(1 - len(successes) / len(results), 4) if results else None,
+                'consecutive_failures': self._consecutive_failures,
+                'probes_total': self._probes_total,
+                'failures_total': self._failures_total,
+                'last_error': self._last_error,
+                'interval': self.interval
+            }
+        
+        status['ready'] = self.is_ready()
+        return status
@@ -3,22 +3,47 @@
 """
 
 import logging
-from typing import List, Dict, Any, Iterator, Optional
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional, Callable
 import json
 import re
 
-from models.baichuan_client import BaichuanClient
+from models.baichuan_client import BaichuanClient, AsyncBaichuanClient
+from models.stream_recording import StreamRecorder
 
 logger = logging.getLogger(__name__)
 
+# 后续问题提示词中使用的回答长度（回答达到该长度后提示词不再变化，可提前生成后续问题）
+FOLLOW_UP_CONTEXT_LENGTH = 500
+
 class BaichuanLLMService:
     """基于 Baichuan M2 Plus 的 LLM 服务"""
     
-    def __init__(self):
-        """初始化 LLM 服务"""
+    def __init__(self, client: Optional[Any] = None, async_client: Optional[Any] = None,
+                 recorder: Optional[StreamRecorder] = None):
+        """
+        初始化 LLM 服务
+        
+        Args:
+            client: 同步客户端（默认创建 BaichuanClient，回放模式下传入回放客户端）
+            async_client: 异步客户端（默认在 ASGI 模式下按需创建）
+            recorder: 上游调用录制器（None 表示不录制）
+        """
         try:
-            self.client = BaichuanClient()
+            self.recorder = recorder
+            self.client = client or BaichuanClient(recorder=recorder)
+            self._async_client = async_client
             self.system_prompt = self._get_system_prompt()
+            # 生成参数：降低随机性，提高准确性
+            self.generation_params = {
+                'temperature': 0.1,
+                'max_tokens': 2000,
+                'top_p': 0.9
+            }
+            # 后续问题生成参数
+            self.follow_up_params = {
+                'temperature': 0.3,
+                'max_tokens': 200
+            }
             logger.info("Baichuan LLM Service initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Baichuan LLM Service: {str(e)}")
@@ -44,39 +69,100 @@ class BaichuanLLMService:
 - 使用引用标记标注信息来源
 - 结尾可以提供相关的后续问题建议"""
     
-    def ask_question_stream(self, question: str) -> Iterator[Any]:
+    @property
+    def async_client(self) -> AsyncBaichuanClient:
+        """异步客户端（ASGI 模式下按需创建）"""
+        if self._async_client is None:
+            self._async_client = AsyncBaichuanClient(
+                api_key=self.client.api_key,
+                base_url=self.client.base_url,
+                recorder=self.recorder
+            )
+        return self._async_client
+    
+    async def aclose(self) -> None:
+        """关闭异步客户端的连接池（未创建时不做任何事）"""
+        if self._async_client is not None:
+            await self._async_client.close()
+    
+    def get_model_params(self) -> Dict[str, Any]:
+        """获取模型名称及生成参数（用于问答缓存键）"""
+        return {'model': self.client.model_name, **self.generation_params}
+    
+    def _build_messages(self, question: str) -> List[Dict[str, str]]:
+        """构建问答消息列表"""
+        return [
+            {"role": "assistant", "content": self.system_prompt},
+            {"role": "user", "content": question}
+        ]
+    
+    def ask_question_stream(self, question: str,
+                            on_connect: Optional[Callable[[], None]] = None) -> Iterator[Any]:
         """
         流式问答
         
         Args:
             question: 用户问题
+            on_connect: 上游流建立时的回调
             
         Yields:
             流式响应块
         """
         try:
-            messages = [
-                {"role": "assistant", "content": self.system_prompt},
-                {"role": "user", "content": question}
-            ]
+            messages = self._build_messages(question)
             
             logger.info(f"Sending question to Baichuan: {question[:100]}...")
             
             # 调用 Baichuan M2 Plus 流式 API
             stream = self.client.chat_completion_stream(
                 messages=messages,
-                temperature=0.1,  # 降低随机性，提高准确性
-                max_tokens=2000,
-                top_p=0.9
+                on_connect=on_connect,
+                **self.generation_params
             )
             
-            for chunk in stream:
-                yield chunk
+            try:
+                for chunk in stream:
+                    yield chunk
+            finally:
+                stream.close()
                 
         except Exception as e:
             logger.error(f"Error in streaming question: {str(e)}")
             raise
     
+    async def ask_question_stream_async(self, question: str,
+                                        on_connect: Optional[Callable[[], None]] = None) -> AsyncIterator[Any]:
+        """
+        异步流式问答
+        
+        Args:
+            question: 用户问题
+            on_connect: 上游流建立时的回调
+            
+        Yields:
+            流式响应块
+        """
+        try:
+            messages = self._build_messages(question)
+            
+            logger.info(f"Sending question to Baichuan (async): {question[:100]}...")
+            
+            stream = self.async_client.chat_completion_stream(
+                messages=messages,
+                on_connect=on_connect,
+                **self.generation_params
+            )
+            
+            try:
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await stream.aclose()
+                
+        except Exception as e:
+            logger.error(f"Error in async streaming question: {str(e)}")
+            raise
+    
     def ask_question(self, question: str) -> Dict[str, Any]:
         """
         非流式问答
@@ -88,17 +174,12 @@ class BaichuanLLMService:
             Dict: 完整响应
         """
         try:
-            messages = [
-                {"role": "assistant", "content": self.system_prompt},
-                {"role": "user", "content": question}
-            ]
+            messages = self._build_messages(question)
             
             response = self.client.chat_completion(
                 messages=messages,
                 stream=False,
-                temperature=0.1,
-                max_tokens=2000,
-                top_p=0.9
+                **self.generation_params
             )
             
             # 解析响应
@@ -132,52 +213,102 @@ class BaichuanLLMService:
             List[str]: 后续问题列表
         """
         try:
-            # 基于问题内容生成相关的后续问题
-            follow_up_prompt = f"""
-基于以下医学问答对话，生成3个相关的后续问题：
-
-原始问题：{original_question}
-回答内容：{answer_content[:500]}...
-
-请生成3个具体、实用的后续问题，格式为简洁的问句。每个问题一行，不需要编号。
-"""
-            
-            messages = [
-                {"role": "user", "content": follow_up_prompt}
-            ]
-            
             response = self.client.chat_completion(
-                messages=messages,
+                messages=self._build_follow_up_messages(original_question, answer_content),
                 stream=False,
-                temperature=0.3,
-                max_tokens=200
+                **self.follow_up_params
             )
             
-            content = response.choices[0].message.content.strip()
+            return self._parse_follow_up_questions(response.choices[0].message.content)
             
-            # 解析后续问题
-            questions = [q.strip() for q in content.split('\n') if q.strip()]
+        except Exception as e:
+            logger.error(f"Error generating follow-up questions: {str(e)}")
+            return self.get_default_follow_up_questions()
+    
+    async def generate_follow_up_questions_async(self, original_question: str,
+                                                 answer_content: str) -> List[str]:
+        """
+        异步生成后续问题
+        
+        Args:
+            original_question: 原始问题
+            answer_content: 回答内容
             
-            # 确保返回3个问题
-            if len(questions) < 3:
-                # 添加通用后续问题
-                generic_questions = [
-                    "这种治疗方法有哪些潜在的副作用？",
-                    "对于特殊人群（如孕妇、老年人）有什么特别的注意事项？",
-                    "最新的研究进展如何？"
-                ]
-                questions.extend(generic_questions[:3-len(questions)])
+        Returns:
+            List[str]: 后续问题列表
+        """
+        try:
+            response = await self.async_client.chat_completion(
+                messages=self._build_follow_up_messages(original_question, answer_content),
+                stream=False,
+                **self.follow_up_params
+            )
             
-            return questions[:3]
+            return self._parse_follow_up_questions(response.choices[0].message.content)
             
         except Exception as e:
-            logger.error(f"Error generating follow-up questions: {str(e)}")
-            # 返回默认后续问题
-            return [
-                "这个治疗方案的最新研究进展如何？",
-                "对于不同年龄段的患者有什么特殊考虑？",
-                "有哪些替代治疗方案可以选择？"
+            logger.error(f"Error generating follow-up questions (async): {str(e)}")
+            return self.get_default_follow_up_questions()
+    
+    def get_follow_up_identity(self, original_question: str, answer_content: str) -> Dict[str, Any]:
+        """
+        获取后续问题请求的完整内容（模型、生成参数、提示词），用于后续问题缓存键
+        
+        Args:
+            original_question: 原始问题
+            answer_content: 回答内容
+            
+        Returns:
+            Dict: 请求内容
+        """
+        return {
+            'model': self.client.model_name,
+            'params': self.follow_up_params,
+            'messages': self._build_follow_up_messages(original_question, answer_content)
+        }
+    
+    def _build_follow_up_messages(self, original_question: str, answer_content: str) -> List[Dict[str, str]]:
+        """构建后续问题生成的消息列表"""
+        # 基于问题内容生成相关的后续问题
+        follow_up_prompt = f"""
+基于以下医学问答对话，生成3个相关的后续问题：
+
+原始问题：{original_question}
+回答内容：{answer_content[:FOLLOW_UP_CONTEXT_LENGTH]}...
+
+请生成3个具体、实用的后续问题，格式为简洁的问句。每个问题一行，不需要编号。
+"""
+        
+        return [
+            {"role": "user", "content": follow_up_prompt}
+        ]
+    
+    def _parse_follow_up_questions(self, content: str) -> List[str]:
+        """解析模型返回的后续问题"""
+        content = content.strip()
+        
+        # 解析后续问题
+        questions = [q.strip() for q in content.split('\n') if q.strip()]
+        
+        # 确保返回3个问题
+        if len(questions) < 3:
+            # 添加通用后续问题
+            generic_questions = [
+                "这种治疗方法有哪些潜在的副作用？",
+                "对于特殊人群（如孕妇、老年人）有什么特别的注意事项？",
+                "最新的研究进展如何？"
             ]
+            questions.extend(generic_questions[:3-len(questions)])
+        
+        return questions[:3]
+    
+    def get_default_follow_up_questions(self) -> List[str]:
+        """默认后续问题"""
+        return [
+            "这个治疗方案的最新研究进展如何？",
+            "对于不同年龄段的患者有什么特殊考虑？",
+            "有哪些替代治疗方案可以选择？"
+        ]
     
     def _parse_grounding_info(self, grounding: Dict) -> List[Dict]:
         """
@@ -307,6 +438,17 @@ class BaichuanLLMService:
         except Exception:
             return False
     
+    def probe_upstream(self, mode: str = 'models', timeout: float = 5.0) -> None:
+        """探测上游服务（供健康监控使用），失败时抛出异常"""
+        self.client.probe(mode=mode, timeout=timeout)
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取上游连接池统计"""
+        stats = {'sync': self.client.get_pool_stats()}
+        if self._async_client is not None:
+            stats['async'] = self._async_client.get_pool_stats()
+        return stats
+    
     def get_api_base(self) -> str:
         """获取 API 基础URL"""
         return self.client.base_url
@@ -0,0 +1,334 @@
+"""
+流式输出节奏控制
+控制内容事件的发送节奏，与具体的服务器模型（Flask 线程 / ASGI 事件循环）无关：
+  - none:     直接透传，不增加延迟
+  - fixed:    每个内容事件之后固定延迟（STREAMING_WORD_DELAY）
+  - adaptive: 合并上游快速到达的内容事件，按时间/长度预算发送；第一个内容事件直接发送，
+              暂存的内容到达时间预算时由调用方发送（flush_due），从不主动等待，
+              回答结束时间与上游一致
+
+等待上游时的时间预算：ASGI 用 asyncio.wait(timeout=pacer.remaining())，
+Flask 用 DeadlineReader（后台线程读取上游，queue.get(timeout=pacer.remaining())）
+"""
+
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PACING_MODES = ('none', 'fixed', 'adaptive')
+
+# 用户偏好 response_speed 对应的节奏模式
+RESPONSE_SPEED_PACING = {
+    'fast': 'none',
+    'normal': 'adaptive',
+    'slow': 'fixed'
+}
+
+def resolve_pacing_mode(pacing: Optional[str] = None, response_speed: Optional[str] = None,
+                        default: str = 'adaptive') -> str:
+    """
+    确定请求的节奏模式：请求指定的模式 > response_speed 偏好 > 默认配置
+    
+    Args:
+        pacing: 请求指定的节奏模式
+        response_speed: 用户偏好的响应速度（fast / normal / slow）
+        default: 默认节奏模式
+        
+    Returns:
+        str: 节奏模式
+    """
+    if pacing in PACING_MODES:
+        return pacing
+    if pacing:
+        logger.warning(f"Unknown pacing mode '{pacing}', using default")
+    
+    if response_speed in RESPONSE_SPEED_PACING:
+        return RESPONSE_SPEED_PACING[response_speed]
+    
+    return default if default in PACING_MODES else 'adaptive'
+
+def _is_content_event(event: Dict[str, Any]) -> bool:
+    """是否为内容事件"""
+    return 'content' in event and not event.get('isComplete')
+
+class OutputPacer:
+    """透传节奏控制器（none 模式），也是其他模式的基类；每个响应流一个实例"""
+    
+    mode = 'none'
+    # 是否会暂存事件（等待上游时需要按时间预算发送）
+    holds_events = False
+    
+    def push(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        提交一个事件
+        
+        Args:
+            event: 事件
+            
+        Returns:
+            List[Dict]: 现在需要发送的事件
+        """
+        return [event]
+    
+    def flush(self) -> List[Dict[str, Any]]:
+        """流结束时发送暂存的事件"""
+        return []
+    
+    def remaining(self) -> Optional[float]:
+        """距离暂存的事件必须发送还剩的时间（秒），没有暂存的事件时为 None"""
+        return None
+    
+    def flush_due(self) -> List[Dict[str, Any]]:
+        """发送已到时间预算的暂存事件（等待上游期间由调用方调用）"""
+        return []
+    
+    def delay_after(self, event: Dict[str, Any]) -> float:
+        """发送事件之后需要等待的时间（秒）"""
+        return 0.0
+
+class FixedRatePacer(OutputPacer):
+    """固定速率：每个内容事件之后固定延迟"""
+    
+    mode = 'fixed'
+    
+    def __init__(self, delay: float = 0.05):
+        """
+        初始化
+        
+        Args:
+            delay: 内容事件之后的延迟（秒）
+        """
+        self.delay = delay
+    
+    def delay_after(self, event: Dict[str, Any]) -> float:
+        return self.delay if _is_content_event(event) else 0.0
+
+class AdaptiveCoalescingPacer(OutputPacer):
+    """
+    自适应合并：上游数据块到达较快时合并为较大的内容事件，较慢时直接透传
+    
+    第一个内容事件直接发送（不增加首字延迟）；之后合并的内容最多暂存 interval 秒或 max_chars 个字符，
+    时间预算由调用方在等待上游时检查（remaining / flush_due），带引用的内容立即发送（前端按引用分段）；
+    从不主动等待，不会增加回答的总耗时
+    """
+    
+    mode = 'adaptive'
+    holds_events = True
+    
+    def __init__(self, interval: float = 0.05, max_chars: int = 32, smoothing: float = 0.3,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        初始化
+        
+        Args:
+            interval: 最长合并时间（秒）；上游平均到达间隔超过该值时不再合并
+            max_chars: 最多合并的字符数
+            smoothing: 上游到达间隔的指数平滑系数
+            clock: 单调时钟
+        """
+        self.interval = interval
+        self.max_chars = max_chars
+        self.smoothing = smoothing
+        self.clock = clock
+        
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_chars = 0
+        self._buffer_started = 0.0
+        self._last_arrival: Optional[float] = None
+        self._avg_gap: Optional[float] = None
+        self._sent_first = False
+    
+    def push(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if not _is_content_event(event):
+            return self.flush() + [event]
+        
+        now = self.clock()
+        if self._last_arrival is not None:
+            gap = now - self._last_arrival
+            self._avg_gap = gap if self._avg_gap is None else (
+                self.smoothing * gap + (1 - self.smoothing) * self._avg_gap
+            )
+        self._last_arrival = now
+        
+        if not self._sent_first:
+            self._sent_first = True
+            return [event]
+        
+        if not self._buffer:
+            self._buffer_started = now
+        self._buffer.append(event)
+        self._buffer_chars += len(event['content'])
+        
+        if (event.get('citations') or
+                self._buffer_chars >= self.max_chars or
+                now - self._buffer_started >= self.interval or
+                (self._avg_gap is not None and self._avg_gap >= self.interval)):
+            return self.flush()
+        return []
+    
+    def flush(self) -> List[Dict[str, Any]]:
+        if not self._buffer:
+            return []
+        
+        events = self._buffer
+        self._buffer = []
+        self._buffer_chars = 0
+        if len(events) == 1:
+            return events
+        
+        # 以最后一个事件为基础合并内容和引用
+        merged = dict(events[-1])
+        merged['content'] = ''.join(event['content'] for event in events)
+        citations = sorted({num for event in events for num in (event.get('citations') or [])})
+        if citations:
+            merged['citations'] = citations
+        return [merged]
+    
+    def remaining(self) -> Optional[float]:
+        if not self._buffer:
+            return None
+        return max(0.0, self.interval - (self.clock() - self._buffer_started))
+    
+    def flush_due(self) -> List[Dict[str, Any]]:
+        if self._buffer and self.clock() - self._buffer_started >= self.interval:
+            return self.flush()
+        return []
+
+def create_pacer(mode: str, word_delay: float = 0.05, interval: float = 0.05,
+                 max_chars: int = 32) -> OutputPacer:
+    """
+    创建节奏控制器
+    
+    Args:
+        mode: 节奏模式（none / fixed / adaptive）
+        word_delay: fixed 模式的延迟（秒）
+        interval: adaptive 模式的最长合并时间（秒）
+        max_chars: adaptive 模式最多合并的字符数
+        
+    Returns:
+        OutputPacer: 节奏控制器
+    """
+    if mode == 'fixed':
+        return FixedRatePacer(word_delay)
+    if mode == 'adaptive':
+        return AdaptiveCoalescingPacer(interval=interval, max_chars=max_chars)
+    return OutputPacer()
+
+def create_pacer_from_config(mode: str, config: Any) -> OutputPacer:
+    """
+    按配置类创建节奏控制器
+    
+    Args:
+        mode: 节奏模式
+        config: 配置类
+        
+    Returns:
+        OutputPacer: 节奏控制器
+    """
+    return create_pacer(
+        mode,
+        word_delay=config.STREAMING_WORD_DELAY,
+        interval=config.STREAMING_COALESCE_INTERVAL,
+        max_chars=config.STREAMING_COALESCE_MAX_CHARS
+    )
+
+# 上游读取线程的结束标记
+_END = object()
+
+class DeadlineReader:
+    """
+    带时间预算的上游读取（Flask 模式，每个响应流一个实例）
+    
+    同步读取上游无法设置超时：节奏控制器会暂存事件时，由后台线程读取上游数据块放入队列，
+    迭代时最多等到暂存内容的时间预算用完；其他节奏模式直接在当前线程读取
+    """
+    
+    def __init__(self, chunks: Iterator[Any], pacer: OutputPacer):
+        """
+        初始化并开始读取
+        
+        Args:
+            chunks: 上游数据块（同步迭代器）
+            pacer: 本次流的节奏控制器
+        """
+        self.chunks = chunks
+        self.pacer = pacer
+        self._queue: Optional[queue.Queue] = None
+        self._error: Optional[Exception] = None
+        self._stopped = threading.Event()
+        if pacer.holds_events:
+            self._queue = queue.Queue()
+            threading.Thread(target=self._pump, name='upstream-reader', daemon=True).start()
+    
+    def _pump(self) -> None:
+        """读取线程：依次放入数据块，最后放入结束标记（出错时先记录异常）"""
+        try:
+            for chunk in self.chunks:
+                if self._stopped.is_set():
+                    break
+                self._queue.put(chunk)
+        except Exception as e:
+            self._error = e
+        finally:
+            # 上游流只在读取线程中关闭（生成器不能在其他线程执行时关闭）
+            self._close_chunks()
+            self._queue.put(_END)
+    
+    def _close_chunks(self) -> None:
+        close = getattr(self.chunks, 'close', None)
+        if close is not None:
+            close()
+    
+    def __iter__(self) -> Iterator[Optional[Any]]:
+        """
+        迭代上游数据块
+        
+        Yields:
+            上游数据块；暂存内容的时间预算已用完而下一个数据块尚未到达时为 None（调用方应发送 pacer.flush_due()）
+        """
+        if self._queue is None:
+            yield from self.chunks
+            return
+        
+        while True:
+            try:
+                item = self._queue.get(timeout=self.pacer.remaining())
+            except queue.Empty:
+                yield None
+                continue
+            if item is _END:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield item
+    
+    def close(self) -> None:
+        """停止读取并释放上游流（读取线程正在等待上游时，在下一个数据块到达时释放）"""
+        if self._queue is None:
+            self._close_chunks()
+        else:
+            self._stopped.set()
+
+def paced(pacer: OutputPacer, events: Iterable[Dict[str, Any]],
+          sleep: Callable[[float], None] = time.sleep) -> Iterator[Dict[str, Any]]:
+    """
+    按节奏发送事件（同步版本，供 Flask 生成器使用）
+    
+    Args:
+        pacer: 节奏控制器
+        events: 事件
+        sleep: 等待函数
+        
+    Yields:
+        Dict: 需要发送的事件
+    """
+    for event in events:
+        for paced_event in pacer.push(event):
+            yield paced_event
+            delay = pacer.delay_after(paced_event)
+            if delay > 0:
+                sleep(delay)
@@ -0,0 +1,220 @@
+"""
+问答请求分阶段计时
+记录 /api/ask 每个阶段相对请求接收时刻的单调时钟耗时，按阶段汇总到指标注册表的固定分桶直方图
+（/metrics 与 /api/timing/stats 共用），并为每个请求输出一行结构化日志，用于区分 Baichuan 上游耗时和本服务自身的开销
+"""
+
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+ASK_REQUESTS = REGISTRY.counter(
+    'openevidence_ask_requests_total', 'Completed /api/ask requests by server, outcome and cache use',
+    ('server', 'status', 'cached')
+)
+ASK_STAGE_SECONDS = REGISTRY.histogram(
+    'openevidence_ask_stage_seconds', '/api/ask stage times relative to accepting the request', ('stage',)
+)
+ASK_INTERVAL_SECONDS = REGISTRY.histogram(
+    'openevidence_ask_interval_seconds', 'Per-stage /api/ask latency intervals', ('interval',)
+)
+
+# 请求阶段（按正常请求中出现的先后顺序）
+STAGES = (
+    'accept',             # 接收请求
+    'upstream_connect',   # 上游流建立（收到响应头）
+    'first_thinking',     # 第一个思考数据块
+    'references_loaded',  # 引用加载
+    'first_content',      # 第一个内容事件
+    'stop',               # 上游 finish_reason == 'stop'
+    'follow_up_done',     # 后续问题就绪
+    'last_byte'           # 最后一个数据帧发送完成
+)
+
+# 派生区间：名称 -> (起始阶段, 结束阶段)
+INTERVALS = {
+    'ttft': ('accept', 'first_content'),           # 首个内容事件耗时
+    'ttlt': ('accept', 'last_byte'),               # 整个响应耗时
+    'connect': ('accept', 'upstream_connect'),     # 本服务准备 + 上游建立连接
+    'upstream_ttft': ('upstream_connect', 'first_content'),
+    'upstream_stream': ('upstream_connect', 'stop'),
+    'follow_up_wait': ('stop', 'follow_up_done'),  # 回答结束后等待后续问题
+    'tail': ('stop', 'last_byte')                  # 回答结束到最后一个字节
+}
+
+_STAGE_SECONDS = {stage: ASK_STAGE_SECONDS.labels(stage) for stage in STAGES[1:]}
+_INTERVAL_SECONDS = {name: ASK_INTERVAL_SECONDS.labels(name) for name in INTERVALS}
+
+def _histogram_stats(bounds: Sequence[float], value: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把指标注册表中的直方图样本（秒）换算为毫秒统计
+    
+    Args:
+        bounds: 分桶上界（秒），最后隐含 +Inf 分桶
+        value: 直方图样本（counts / sum）
+        
+    Returns:
+        Dict: 次数、平均值、p50/p95/p99 估计及累计分桶计数
+    """
+    bounds_ms = [bound * 1000 for bound in bounds]
+    counts = value['counts']
+    total = sum(counts)
+    
+    def quantile(q: float) -> Optional[float]:
+        # 按分桶线性插值估算分位数
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                lower = bounds_ms[index - 1] if index > 0 else 0.0
+                if index == len(bounds_ms):
+                    # +Inf 分桶只能给出下界
+                    return round(lower, 1)
+                upper = bounds_ms[index]
+                return round(lower + (upper - lower) * (rank - cumulative) / count, 1)
+            cumulative += count
+        return round(bounds_ms[-1], 1)
+    
+    cumulative = 0
+    buckets = {}
+    for bound, count in zip([f"{bound:g}" for bound in bounds_ms] + ['+Inf'], counts):
+        cumulative += count
+        buckets[bound] = cumulative
+    
+    return {
+        'count': total,
+        'mean_ms': round(value['sum'] * 1000 / total, 1) if total else None,
+        'p50_ms': quantile(0.5),
+        'p95_ms': quantile(0.95),
+        'p99_ms': quantile(0.99),
+        'buckets': buckets
+    }
+
+class RequestTimer:
+    """单个请求的阶段计时器（每个阶段只记录第一次出现的时刻）"""
+    
+    def __init__(self, request_id: str, clock: Callable[[], float] = time.monotonic):
+        """
+        初始化计时器（同时记录 accept 阶段）
+        
+        Args:
+            request_id: 请求（会话）ID
+            clock: 单调时钟
+        """
+        self.request_id = request_id
+        self.clock = clock
+        self.start = clock()
+        self.marks: Dict[str, float] = {'accept': self.start}
+        # 附加到结构化日志中的字段
+        self.tags: Dict[str, Any] = {}
+    
+    def mark(self, stage: str) -> None:
+        """
+        记录阶段时刻（已记录的阶段忽略）
+        
+        Args:
+            stage: 阶段名称
+        """
+        if stage not in self.marks:
+            self.marks[stage] = self.clock()
+    
+    def tag(self, **tags: Any) -> None:
+        """添加日志字段"""
+        self.tags.update(tags)
+    
+    def stage_ms(self) -> Dict[str, float]:
+        """各阶段相对 accept 的耗时（毫秒）"""
+        return {
+            stage: round((self.marks[stage] - self.start) * 1000, 2)
+            for stage in STAGES if stage in self.marks
+        }
+    
+    def interval_ms(self) -> Dict[str, float]:
+        """两个阶段都已记录的派生区间耗时（毫秒）"""
+        return {
+            name: round((self.marks[end] - self.marks[begin]) * 1000, 2)
+            for name, (begin, end) in INTERVALS.items()
+            if begin in self.marks and end in self.marks
+        }
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        请求计时汇总
+        
+        Returns:
+            Dict: 请求ID、附加字段、阶段耗时和派生区间耗时
+        """
+        return {
+            'request_id': self.request_id,
+            **self.tags,
+            'stages_ms': self.stage_ms(),
+            'intervals_ms': self.interval_ms()
+        }
+
+class TimingRecorder:
+    """把请求的阶段耗时记录到指标注册表的直方图中（/metrics 与 /api/timing/stats 共用）"""
+    
+    def start(self, request_id: str = '') -> RequestTimer:
+        """
+        创建请求计时器（请求ID可在解析请求后再设置）
+        
+        Args:
+            request_id: 请求（会话）ID
+            
+        Returns:
+            RequestTimer: 计时器
+        """
+        return RequestTimer(request_id)
+    
+    def record(self, timer: RequestTimer) -> Dict[str, Any]:
+        """
+        汇总请求耗时并输出结构化日志
+        
+        Args:
+            timer: 请求计时器
+            
+        Returns:
+            Dict: 请求计时汇总
+        """
+        summary = timer.summary()
+        
+        try:
+            for stage, value in summary['stages_ms'].items():
+                if stage in _STAGE_SECONDS:
+                    _STAGE_SECONDS[stage].observe(value / 1000)
+            for name, value in summary['intervals_ms'].items():
+                _INTERVAL_SECONDS[name].observe(value / 1000)
+            
+            ASK_REQUESTS.labels(
+                timer.tags.get('server', ''),
+                timer.tags.get('status', ''),
+                'true' if timer.tags.get('cached') else 'false'
+            ).inc()
+            
+            logger.info(f"ask_timing {json.dumps(summary, ensure_ascii=False)}")
+        except Exception as e:
+            logger.error(f"Error recording request timing: {str(e)}")
+        
+        return summary
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取各阶段和派生区间的耗时分布（多进程模式下为所有进程合并后的分布）
+        
+        Returns:
+            Dict: stages（相对 accept）和 intervals 的直方图统计
+        """
+        merged = REGISTRY.merged()
+        stats = {}
+        for key, metric, names in [('stages', ASK_STAGE_SECONDS, _STAGE_SECONDS),
+                                   ('intervals', ASK_INTERVAL_SECONDS, _INTERVAL_SECONDS)]:
+            samples = {labels[0]: value for labels, value in merged[metric.name]['samples']}
+            stats[key] = {name: _histogram_stats(metric.buckets, samples[name]) for name in names}
+        return stats
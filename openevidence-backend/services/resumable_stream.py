@@ -0,0 +1,505 @@
+"""
+可续传的 SSE 事件流
+/api/ask 的事件由后台生产者写入按会话保存的有界缓冲，每个事件带单调递增的 ID；
+HTTP 响应只是缓冲的读取者。连接中断后，客户端带 Last-Event-ID 重新请求即可从缓冲续读，
+上游生成不受影响，不必重新提问。缓冲按会话限制字节数，完成后保留 TTL 秒再淘汰
+
+同一时刻的相同问题（single-flight）共用一个缓冲：后到的请求作为读取者从第一个事件开始追读，
+只有一条上游流。每个读取者按自己的速度读取，生产者不等待慢的读取者
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from services.answer_cache import BoundedTTLCache
+from services.ask_stream import AskStreamProcessor
+from utils.metrics import REGISTRY
+from utils.serialization import timestamp
+
+logger = logging.getLogger(__name__)
+
+STREAM_RESUMES = REGISTRY.counter(
+    'openevidence_sse_resumes_total', 'Reconnects with Last-Event-ID by result', ('result',)
+)
+STREAMS_ABANDONED = REGISTRY.counter(
+    'openevidence_sse_streams_abandoned_total', 'Streams stopped because no client reattached'
+)
+SINGLE_FLIGHT_JOINS = REGISTRY.counter(
+    'openevidence_single_flight_joins_total', 'Requests served by an identical in-flight generation'
+)
+
+def stream_key(session_id: str, question: str) -> str:
+    """
+    会话缓冲的键（同一会话中的不同问题分别缓冲）
+    
+    Args:
+        session_id: 会话ID
+        question: 用户问题
+        
+    Returns:
+        str: 缓冲键
+    """
+    digest = hashlib.sha256(question.encode('utf-8')).hexdigest()[:16]
+    return f"{session_id}:{digest}"
+
+def _wake(future: asyncio.Future) -> None:
+    """唤醒异步读取者"""
+    if not future.done():
+        future.set_result(None)
+
+class ResumableStream:
+    """单个问答的事件缓冲：一个生产者写入，任意个读取者按事件 ID 续读（线程安全）"""
+    
+    def __init__(self, key: str, max_bytes: int = 1024 * 1024, abandon_after: float = 30.0,
+                 on_close: Optional[Callable[['ResumableStream'], None]] = None):
+        """
+        初始化
+        
+        Args:
+            key: 缓冲键
+            max_bytes: 缓冲的最大字节数（超出时淘汰最早的事件）
+            abandon_after: 没有读取者超过该时长（秒）时视为放弃，生产者停止生成
+            on_close: 生产者结束时的回调
+        """
+        self.key = key
+        self.max_bytes = max_bytes
+        self.abandon_after = abandon_after
+        self.on_close = on_close
+        self.done = False
+        self.producer: Any = None
+        # single-flight 键，以及加入的其他会话的缓冲键
+        self.flight_key: Optional[str] = None
+        self.aliases: List[str] = []
+        
+        # 事件 ID 连续：_frames[i] 的 ID 为 _first_id + i
+        self._frames: List[bytes] = []
+        self._first_id = 1
+        self._bytes = 0
+        self._last_id = 0
+        # 带会话ID的完成事件 (事件ID, 事件)，共享的读取者读取时换成自己的会话ID
+        self._completion: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._readers = 0
+        self._detached_at = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+    
+    @property
+    def last_id(self) -> int:
+        """最后一个事件的 ID"""
+        return self._last_id
+    
+    def publish(self, event: Dict[str, Any]) -> None:
+        """
+        追加一个事件并唤醒读取者
+        
+        Args:
+            event: 事件数据
+        """
+        with self._cond:
+            self._last_id += 1
+            frame = AskStreamProcessor.format_sse(event, self._last_id)
+            if 'sessionId' in event:
+                self._completion = (self._last_id, event)
+            self._frames.append(frame)
+            self._bytes += len(frame)
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self._notify()
+    
+    def _evict(self) -> None:
+        """淘汰最早的事件直到不超过字节上限，至少保留最新的一个（调用方需持有锁）"""
+        count = 0
+        while self._bytes > self.max_bytes and count < len(self._frames) - 1:
+            self._bytes -= len(self._frames[count])
+            count += 1
+        del self._frames[:count]
+        self._first_id += count
+    
+    def close(self) -> None:
+        """生产者结束（完成、出错或放弃）"""
+        with self._cond:
+            self.done = True
+            self._notify()
+        if self.on_close is not None:
+            self.on_close(self)
+    
+    def _notify(self) -> None:
+        """唤醒所有读取者（调用方需持有锁）"""
+        self._cond.notify_all()
+        waiters, self._waiters = self._waiters, []
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for loop, future in waiters:
+            if loop is running:
+                _wake(future)
+            else:
+                loop.call_soon_threadsafe(_wake, future)
+    
+    def can_resume(self, last_event_id: int) -> bool:
+        """
+        是否能从 last_event_id 之后续读（之后的事件都还在缓冲中）
+        
+        Args:
+            last_event_id: 客户端收到的最后一个事件 ID
+            
+        Returns:
+            bool: 能否续读
+        """
+        with self._cond:
+            return self._first_id - 1 <= last_event_id <= self._last_id
+    
+    def abandoned(self) -> bool:
+        """没有读取者的时间是否超过 abandon_after"""
+        return self._readers == 0 and time.monotonic() - self._detached_at > self.abandon_after
+    
+    def _collect(self, last_event_id: int) -> Tuple[List[bytes], bool, bool]:
+        """
+        取出 last_event_id 之后的数据帧（调用方需持有锁）
+        
+        Returns:
+            Tuple: (数据帧（最后一个的 ID 为 last_id）, 是否已结束, 是否有未读事件已被淘汰)
+        """
+        if last_event_id < self._first_id - 1:
+            return [], self.done, True
+        return self._frames[last_event_id + 1 - self._first_id:], self.done, False
+    
+    def _personalize(self, frames: List[bytes], first_id: int, session_id: Optional[str],
+                     completion: Optional[Tuple[int, Dict[str, Any]]]) -> List[bytes]:
+        """把共享缓冲中的完成事件换成读取者自己的会话ID"""
+        if session_id is None or completion is None:
+            return frames
+        event_id, event = completion
+        index = event_id - first_id
+        if not 0 <= index < len(frames) or event.get('sessionId') == session_id:
+            return frames
+        frames = list(frames)
+        frames[index] = AskStreamProcessor.format_sse(dict(event, sessionId=session_id), event_id)
+        return frames
+    
+    def _attach(self) -> None:
+        with self._cond:
+            self._readers += 1
+    
+    def _detach(self) -> None:
+        with self._cond:
+            self._readers -= 1
+            self._detached_at = time.monotonic()
+    
+    def read(self, last_event_id: int = 0, session_id: Optional[str] = None) -> Iterator[bytes]:
+        """
+        读取 last_event_id 之后的数据帧，直到生产者结束
+        
+        Args:
+            last_event_id: 已收到的最后一个事件 ID（0 表示从头读取）
+            session_id: 读取者的会话ID（与生产者不同时替换完成事件中的会话ID）
+            
+        Yields:
+            bytes: SSE 数据帧
+        """
+        self._attach()
+        try:
+            while True:
+                with self._cond:
+                    frames, done, overrun = self._collect(last_event_id)
+                    if not frames and not done and not overrun:
+                        self._cond.wait()
+                        continue
+                    first_id, last_event_id = last_event_id + 1, self._last_id
+                    completion = self._completion
+                if overrun:
+                    yield _overrun_frame()
+                    return
+                for frame in self._personalize(frames, first_id, session_id, completion):
+                    yield frame
+                if done and not frames:
+                    return
+        finally:
+            self._detach()
+    
+    async def read_async(self, last_event_id: int = 0,
+                         session_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        异步读取 last_event_id 之后的数据帧，直到生产者结束
+        
+        Args:
+            last_event_id: 已收到的最后一个事件 ID（0 表示从头读取）
+            session_id: 读取者的会话ID（与生产者不同时替换完成事件中的会话ID）
+            
+        Yields:
+            bytes: SSE 数据帧
+        """
+        loop = asyncio.get_running_loop()
+        self._attach()
+        try:
+            while True:
+                future = None
+                with self._cond:
+                    frames, done, overrun = self._collect(last_event_id)
+                    if not frames and not done and not overrun:
+                        future = loop.create_future()
+                        self._waiters.append((loop, future))
+                    else:
+                        first_id, last_event_id = last_event_id + 1, self._last_id
+                        completion = self._completion
+                if future is not None:
+                    await future
+                    continue
+                if overrun:
+                    yield _overrun_frame()
+                    return
+                for frame in self._personalize(frames, first_id, session_id, completion):
+                    yield frame
+                if done and not frames:
+                    return
+        finally:
+            self._detach()
+
+def _overrun_frame() -> bytes:
+    """读取者落后于缓冲淘汰时发送的错误事件（客户端需重新提问）"""
+    return AskStreamProcessor.format_sse({
+        'error': 'Stream buffer overrun, please ask again',
+        'isComplete': True,
+        'timestamp': timestamp()
+    })
+
+def run_producer(stream: ResumableStream, events: Iterator[Dict[str, Any]]) -> threading.Thread:
+    """
+    在后台线程中把事件写入缓冲（Flask 模式）
+    
+    Args:
+        stream: 事件缓冲
+        events: 事件生成器
+        
+    Returns:
+        threading.Thread: 生产者线程
+    """
+    def pump():
+        try:
+            for event in events:
+                stream.publish(event)
+                if stream.abandoned():
+                    STREAMS_ABANDONED.inc()
+                    logger.info(f"No client reattached to stream {stream.key}, stopping generation")
+                    break
+        except Exception as e:
+            logger.error(f"Error producing stream events: {str(e)}")
+        finally:
+            # 提前结束时关闭生成器，释放上游连接
+            events.close()
+            stream.close()
+    
+    thread = threading.Thread(target=pump, name='ask-producer', daemon=True)
+    stream.producer = thread
+    thread.start()
+    return thread
+
+def run_producer_async(stream: ResumableStream, events: AsyncIterator[Dict[str, Any]]) -> asyncio.Task:
+    """
+    在事件循环任务中把事件写入缓冲（ASGI 模式）
+    
+    Args:
+        stream: 事件缓冲
+        events: 异步事件生成器
+        
+    Returns:
+        asyncio.Task: 生产者任务
+    """
+    async def pump():
+        try:
+            async for event in events:
+                stream.publish(event)
+                if stream.abandoned():
+                    STREAMS_ABANDONED.inc()
+                    logger.info(f"No client reattached to stream {stream.key}, stopping generation")
+                    break
+        except Exception as e:
+            logger.error(f"Error producing stream events: {str(e)}")
+        finally:
+            await events.aclose()
+            stream.close()
+    
+    # 保存任务引用，避免任务在运行中被回收
+    stream.producer = asyncio.get_running_loop().create_task(pump())
+    return stream.producer
+
+def sse_frames(events: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    不经过缓冲，直接为事件编号并格式化（未启用续传时使用）
+    
+    Args:
+        events: 事件生成器
+        
+    Yields:
+        str: SSE 数据帧
+    """
+    try:
+        for event_id, event in enumerate(events, 1):
+            yield AskStreamProcessor.format_sse(event, event_id)
+    finally:
+        events.close()
+
+async def sse_frames_async(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """
+    不经过缓冲，直接为事件编号并格式化（异步版本）
+    
+    Args:
+        events: 异步事件生成器
+        
+    Yields:
+        str: SSE 数据帧
+    """
+    event_id = 0
+    try:
+        async for event in events:
+            event_id += 1
+            yield AskStreamProcessor.format_sse(event, event_id)
+    finally:
+        await events.aclose()
+
+class ResumableStreamStore:
+    """按会话保存的事件缓冲（进行中的缓冲保留 max_age 秒，完成后保留 ttl 秒）"""
+    
+    def __init__(self, enabled: bool = True, max_sessions: int = 1000, max_bytes: int = 1024 * 1024,
+                 ttl: float = 120.0, abandon_after: float = 30.0, max_age: float = 900.0,
+                 single_flight: bool = True):
+        """
+        初始化
+        
+        Args:
+            enabled: 是否启用续传
+            max_sessions: 最多保存的缓冲数（超出时淘汰最久未使用的）
+            max_bytes: 每个缓冲的最大字节数
+            ttl: 完成后保留的时间（秒）
+            abandon_after: 没有读取者超过该时长（秒）时停止生成
+            max_age: 进行中的缓冲最长保留时间（秒）
+            single_flight: 相同问题同时进行时是否共用一次生成
+        """
+        self.enabled = enabled
+        self.single_flight = enabled and single_flight
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.abandon_after = abandon_after
+        self._streams = BoundedTTLCache(max_entries=max_sessions, ttl=max_age)
+        # 进行中的生成：single-flight 键 -> 缓冲
+        self._in_flight: Dict[str, ResumableStream] = {}
+        self._lock = threading.Lock()
+        
+        logger.info(
+            f"Resumable streams initialized (enabled: {enabled}, max sessions: {max_sessions}, "
+            f"max bytes: {max_bytes}, ttl: {ttl}s, single flight: {self.single_flight})"
+        )
+    
+    def create(self, session_id: str, question: str, flight_key: Optional[str] = None) -> ResumableStream:
+        """
+        为新的问答创建缓冲（替换同一会话中相同问题的旧缓冲）
+        
+        Args:
+            session_id: 会话ID
+            question: 用户问题
+            flight_key: single-flight 键（给出时相同键的请求可以加入本次生成）
+            
+        Returns:
+            ResumableStream: 事件缓冲
+        """
+        stream = ResumableStream(
+            stream_key(session_id, question),
+            max_bytes=self.max_bytes,
+            abandon_after=self.abandon_after,
+            on_close=self._on_close
+        )
+        self._streams.put(stream.key, stream)
+        if self.single_flight and flight_key is not None:
+            stream.flight_key = flight_key
+            with self._lock:
+                self._in_flight[flight_key] = stream
+        return stream
+    
+    def join(self, flight_key: str, session_id: str, question: str) -> Optional[ResumableStream]:
+        """
+        加入相同问题正在进行的生成
+        
+        Args:
+            flight_key: single-flight 键
+            session_id: 会话ID（加入后也可以用该会话断线续传）
+            question: 用户问题
+            
+        Returns:
+            Optional[ResumableStream]: 进行中的缓冲，没有或已无法从头读取时返回 None
+        """
+        if not self.single_flight:
+            return None
+        
+        with self._lock:
+            stream = self._in_flight.get(flight_key)
+            if stream is None or stream.done or not stream.can_resume(0):
+                return None
+            key = stream_key(session_id, question)
+            if key != stream.key:
+                stream.aliases.append(key)
+        
+        self._streams.put(key, stream)
+        SINGLE_FLIGHT_JOINS.inc()
+        logger.info(f"Joining in-flight stream {stream.key} (session: {session_id})")
+        return stream
+    
+    def _on_close(self, stream: ResumableStream) -> None:
+        """生产者结束后不再接受加入，缓冲只再保留 ttl 秒"""
+        with self._lock:
+            if stream.flight_key is not None and self._in_flight.get(stream.flight_key) is stream:
+                del self._in_flight[stream.flight_key]
+            keys = [stream.key] + stream.aliases
+        
+        for key in keys:
+            if self._streams.get(key, record_stats=False) is stream:
+                self._streams.put(key, stream, expires_in=self.ttl)
+    
+    def resume(self, session_id: str, question: str,
+               last_event_id: Optional[str]) -> Optional[Tuple[ResumableStream, int]]:
+        """
+        查找可以续读的缓冲
+        
+        Args:
+            session_id: 会话ID
+            question: 用户问题
+            last_event_id: Last-Event-ID 请求头（None 表示不是重连）
+            
+        Returns:
+            Optional[Tuple]: (事件缓冲, 最后收到的事件 ID)，无法续读时返回 None（需要重新生成）
+        """
+        if not self.enabled or last_event_id is None:
+            return None
+        
+        try:
+            event_id = int(last_event_id.strip())
+        except ValueError:
+            STREAM_RESUMES.labels('invalid').inc()
+            return None
+        
+        stream = self._streams.get(stream_key(session_id, question))
+        if stream is None:
+            STREAM_RESUMES.labels('missing').inc()
+            return None
+        if not stream.can_resume(event_id):
+            STREAM_RESUMES.labels('evicted').inc()
+            return None
+        
+        STREAM_RESUMES.labels('resumed').inc()
+        logger.info(f"Resuming stream {stream.key} after event {event_id}")
+        return stream, event_id
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓冲统计"""
+        stats = self._streams.get_stats()
+        stats['enabled'] = self.enabled
+        stats['ttl'] = self.ttl
+        stats['max_bytes_per_session'] = self.max_bytes
+        stats['single_flight'] = self.single_flight
+        with self._lock:
+            stats['in_flight'] = len(self._in_flight)
+        return stats
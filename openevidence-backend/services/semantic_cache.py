@@ -0,0 +1,239 @@
+"""
+语义近似问题缓存
+使用字符 n-gram 哈希向量（纯 CPU，适用于中文）和 NumPy 最近邻索引，
+将措辞不同但含义相同的问题映射到问答缓存中已有的回答
+"""
+
+import logging
+import re
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.answer_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+# 问句中不影响语义的虚词和常见同义表达（按顺序替换）
+QUESTION_CANONICAL_FORMS = [
+    ('请问', ''),
+    ('是否', ''),
+    ('一下', ''),
+    ('服用', '吃'),
+    ('使用', '用'),
+    ('吗', ''),
+    ('呢', ''),
+    ('的', ''),
+]
+
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+_PUNCTUATION_RE = re.compile(r'[\s,，。、;；:：?？!！]+')
+
+class CharNgramVectorizer:
+    """字符 n-gram 哈希向量化器"""
+    
+    def __init__(self, dim: int = 512, ngram_range: Tuple[int, int] = (1, 2)):
+        """
+        初始化向量化器
+        
+        Args:
+            dim: 向量维度（哈希桶数）
+            ngram_range: n-gram 长度范围（闭区间）
+        """
+        self.dim = dim
+        self.ngram_range = ngram_range
+    
+    @staticmethod
+    def canonicalize(question: str) -> str:
+        """规范化问题并去除虚词、统一常见同义表达"""
+        text = normalize_question(question)
+        for source, target in QUESTION_CANONICAL_FORMS:
+            text = text.replace(source, target)
+        return _PUNCTUATION_RE.sub(' ', text).strip()
+    
+    def transform(self, question: str) -> np.ndarray:
+        """
+        将问题转换为 L2 归一化的哈希向量
+        
+        Args:
+            question: 问题文本
+            
+        Returns:
+            np.ndarray: float32 向量
+        """
+        text = self.canonicalize(question)
+        vector = np.zeros(self.dim, dtype=np.float32)
+        min_n, max_n = self.ngram_range
+        
+        for n in range(min_n, max_n + 1):
+            for i in range(len(text) - n + 1):
+                gram = text[i:i + n]
+                if gram.isspace():
+                    continue
+                # 使用稳定哈希（跨进程一致），最高位决定符号以抵消哈希冲突偏差
+                h = zlib.crc32(gram.encode('utf-8'))
+                vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+def _match_signature(question: str, namespace: str) -> int:
+    """
+    匹配签名：命名空间 + 问题中的数字（年龄、剂量等）
+    签名不同的问题不视为近似
+    """
+    numbers = _NUMBER_RE.findall(normalize_question(question))
+    return zlib.crc32('|'.join([namespace] + numbers).encode('utf-8'))
+
+class SemanticQuestionIndex:
+    """基于 NumPy 的近似问题最近邻索引（固定容量，LRU 淘汰，线程安全）"""
+    
+    def __init__(self, capacity: int = 10000, dim: int = 512, threshold: float = 0.92,
+                 vectorizer: Optional[CharNgramVectorizer] = None):
+        """
+        初始化索引
+        
+        Args:
+            capacity: 最大问题数（向量矩阵预分配，内存占用 capacity × dim × 4 字节）
+            dim: 向量维度
+            threshold: 余弦相似度阈值，达到阈值才视为命中
+            vectorizer: 向量化器
+        """
+        self.capacity = capacity
+        self.threshold = threshold
+        self.vectorizer = vectorizer or CharNgramVectorizer(dim=dim)
+        
+        self._vectors = np.zeros((capacity, self.vectorizer.dim), dtype=np.float32)
+        self._signatures = np.zeros(capacity, dtype=np.int64)
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._keys: List[Optional[str]] = [None] * capacity
+        self._key_to_slot: Dict[str, int] = {}
+        self._size = 0  # 已使用过的槽位上界
+        self._free_slots: List[int] = []
+        self._clock = 0
+        self._lock = threading.Lock()
+        
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+        
+        logger.info(f"Semantic question index initialized (capacity: {capacity}, dim: {self.vectorizer.dim})")
+    
+    def add(self, question: str, key: str, namespace: str = '') -> None:
+        """
+        添加问题到索引
+        
+        Args:
+            question: 问题文本
+            key: 对应的问答缓存键
+            namespace: 命名空间（系统提示词 + 模型参数），只在同一命名空间内匹配
+        """
+        vector = self.vectorizer.transform(question)
+        signature = _match_signature(question, namespace)
+        
+        with self._lock:
+            self._clock += 1
+            slot = self._key_to_slot.get(key)
+            if slot is None:
+                slot = self._allocate_slot()
+                self._key_to_slot[key] = slot
+                self._keys[slot] = key
+            
+            self._vectors[slot] = vector
+            self._signatures[slot] = signature
+            self._last_used[slot] = self._clock
+    
+    def _allocate_slot(self) -> int:
+        """分配槽位，索引已满时淘汰最久未使用的问题（调用方需持有锁）"""
+        if self._free_slots:
+            return self._free_slots.pop()
+        if self._size < self.capacity:
+            self._size += 1
+            return self._size - 1
+        
+        slot = int(np.argmin(self._last_used[:self._size]))
+        self._release_slot(slot)
+        self.evictions += 1
+        return self._free_slots.pop()
+    
+    def _release_slot(self, slot: int) -> None:
+        """释放槽位（调用方需持有锁）"""
+        key = self._keys[slot]
+        if key is not None:
+            del self._key_to_slot[key]
+        self._keys[slot] = None
+        self._vectors[slot] = 0.0
+        self._last_used[slot] = 0
+        self._free_slots.append(slot)
+    
+    def lookup(self, question: str, namespace: str = '') -> Optional[Tuple[str, float]]:
+        """
+        查找最相似的已缓存问题
+        
+        Args:
+            question: 问题文本
+            namespace: 命名空间
+            
+        Returns:
+            Optional[Tuple[str, float]]: (缓存键, 相似度)，未达到阈值返回 None
+        """
+        vector = self.vectorizer.transform(question)
+        signature = _match_signature(question, namespace)
+        
+        with self._lock:
+            self.lookups += 1
+            if self._size == 0:
+                return None
+            
+            scores = self._vectors[:self._size] @ vector
+            # 命名空间或数字不一致的问题不参与匹配
+            scores[self._signatures[:self._size] != signature] = -1.0
+            
+            slot = int(np.argmax(scores))
+            score = float(scores[slot])
+            key = self._keys[slot]
+            if key is None or score < self.threshold:
+                return None
+            
+            self._clock += 1
+            self._last_used[slot] = self._clock
+            self.hits += 1
+            return key, score
+    
+    def remove(self, key: str) -> None:
+        """从索引中移除问题（对应的缓存条目已失效时调用）"""
+        with self._lock:
+            slot = self._key_to_slot.get(key)
+            if slot is not None:
+                self._release_slot(slot)
+    
+    def clear(self) -> None:
+        """清空索引"""
+        with self._lock:
+            self._vectors[:] = 0.0
+            self._last_used[:] = 0
+            self._keys = [None] * self.capacity
+            self._key_to_slot.clear()
+            self._free_slots.clear()
+            self._size = 0
+    
+    def __len__(self) -> int:
+        return len(self._key_to_slot)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取索引统计"""
+        with self._lock:
+            return {
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'hit_rate': round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._key_to_slot),
+                'capacity': self.capacity,
+                'threshold': self.threshold,
+                'memory_bytes': int(self._vectors.nbytes + self._signatures.nbytes + self._last_used.nbytes)
+            }
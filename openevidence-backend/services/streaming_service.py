@@ -3,47 +3,81 @@
 处理 Baichuan M2 Plus 模型的流式输出
 """
 
-import json
-import time
 import logging
-from typing import Iterator, Dict, Any, List
-from datetime import datetime
+from typing import Iterator, Dict, Any, List, FrozenSet, Optional
+
+from services.pacing import OutputPacer, create_pacer, paced
+from utils.citation_parser import CitationParser
+from utils.metrics import REGISTRY, STAGE_ERRORS
+from utils.serialization import dumps, timestamp
 
 logger = logging.getLogger(__name__)
 
+# 流处理指标（与 AskStreamProcessor 共用，按 component 区分）
+STREAM_CHUNKS = REGISTRY.counter(
+    'openevidence_stream_chunks_total', 'Upstream chunks processed by stream handlers', ('component',)
+)
+STREAM_EVENTS = REGISTRY.counter(
+    'openevidence_stream_events_total', 'SSE events produced by stream handlers', ('component',)
+)
+_CHUNKS = STREAM_CHUNKS.labels('streaming_service')
+_EVENTS = STREAM_EVENTS.labels('streaming_service')
+_CHUNK_ERRORS = STAGE_ERRORS.labels('streaming_chunk')
+_STREAM_ERRORS = STAGE_ERRORS.labels('streaming')
+
 class StreamingService:
-    """流式响应服务"""
+    """
+    流式响应服务
     
-    def __init__(self, word_delay: float = 0.05, segment_delay: float = 0.2):
+    线程安全约定：
+        - 一个 StreamingService 实例可被所有请求线程共享；实例上只保存配置和注入的共享组件，
+          每个流的状态（引用列表、引用编号索引、已生成内容）都是 process_baichuan_stream 的局部变量
+        - 注入的 CitationParser 在初始化后只读（预编译正则、无可变状态），可跨线程共享；
+          替换或修改解析器需在服务开始处理请求之前完成
+    """
+    
+    def __init__(self, word_delay: float = 0.05, segment_delay: float = 0.2,
+                 citation_parser: Optional[CitationParser] = None, pacing_mode: str = 'fixed'):
         """
         初始化流式服务
         
         Args:
-            word_delay: 词间延迟（秒）
+            word_delay: 词间延迟（秒，fixed 节奏模式使用）
             segment_delay: 段落间延迟（秒）
+            citation_parser: 共享的引用解析器（默认创建一个，由本服务的所有流共用）
+            pacing_mode: 默认输出节奏模式（none / fixed / adaptive）
         """
         self.word_delay = word_delay
         self.segment_delay = segment_delay
+        self.citation_parser = citation_parser or CitationParser()
+        self.pacing_mode = pacing_mode
         logger.info("Streaming service initialized")
     
-    def process_baichuan_stream(self, stream: Iterator[Any], question: str) -> Iterator[str]:
+    def process_baichuan_stream(self, stream: Iterator[Any], question: str,
+                                pacer: Optional[OutputPacer] = None) -> Iterator[bytes]:
         """
         处理 Baichuan 流式响应
         
         Args:
             stream: Baichuan 流式响应
             question: 原始问题
+            pacer: 本次流的节奏控制器（默认按 pacing_mode 创建）
             
         Yields:
-            str: SSE 格式的数据
+            bytes: SSE 数据帧
         """
+        if pacer is None:
+            pacer = create_pacer(self.pacing_mode, word_delay=self.word_delay)
+        
         try:
             current_content = ""
             references = []
+            reference_index = frozenset()
             thinking_complete = False
             content_started = False
             
             for chunk in stream:
+                _CHUNKS.inc()
                 try:
                     choice = chunk.choices[0]
                     
@@ -61,18 +95,18 @@ class StreamingService:
                                     'step': latest_step.get('label', ''),
                                     'status': latest_step.get('status', ''),
                                     'isComplete': False,
-                                    'timestamp': datetime.now().isoformat()
+                                    'timestamp': timestamp()
                                 }
-                                yield self._create_sse_response(thinking_data)
+                                yield from self._emit(pacer, thinking_data)
                         
                         elif thinking_status == 'completed' and not thinking_complete:
                             thinking_complete = True
                             thinking_data = {
                                 'type': 'thinking_complete',
                                 'isComplete': False,
-                                'timestamp': datetime.now().isoformat()
+                                'timestamp': timestamp()
                             }
-                            yield self._create_sse_response(thinking_data)
+                            yield from self._emit(pacer, thinking_data)
                         
                         continue
                     
@@ -80,9 +114,8 @@ class StreamingService:
                     if hasattr(choice, 'grounding') and choice.grounding and not references:
                         grounding = choice.grounding
                         if 'evidence' in grounding:
-                            from utils.citation_parser import CitationParser
-                            parser = CitationParser()
-                            references = parser.parse_baichuan_references(grounding['evidence'])
+                            references = self.citation_parser.parse_baichuan_references(grounding['evidence'])
+                            reference_index = self.citation_parser.build_reference_index(references)
                             
                             # 发送引用信息
                             references_data = {
@@ -90,9 +123,9 @@ class StreamingService:
                                 'references': references,
                                 'count': len(references),
                                 'isComplete': False,
-                                'timestamp': datetime.now().isoformat()
+                                'timestamp': timestamp()
                             }
-                            yield self._create_sse_response(references_data)
+                            yield from self._emit(pacer, references_data)
                         
                         continue
                     
@@ -107,13 +140,13 @@ class StreamingService:
                             start_data = {
                                 'type': 'content_start',
                                 'isComplete': False,
-                                'timestamp': datetime.now().isoformat()
+                                'timestamp': timestamp()
                             }
-                            yield self._create_sse_response(start_data)
+                            yield from self._emit(pacer, start_data)
                         
                         # 检测并处理引用标记
                         processed_content, citations = self._process_content_with_citations(
-                            content, references
+                            content, references, reference_index
                         )
                         
                         # 发送内容块
@@ -121,17 +154,14 @@ class StreamingService:
                             'content': processed_content,
                             'citations': citations if citations else None,
                             'isComplete': False,
-                            'timestamp': datetime.now().isoformat()
+                            'timestamp': timestamp()
                         }
                         
                         # 如果有引用，标记为引用内容
                         if citations:
                             content_data['type'] = 'cited_content'
                         
-                        yield self._create_sse_response(content_data)
-                        
-                        # 添加流式延迟
-                        time.sleep(self.word_delay)
+                        yield from self._emit(pacer, content_data)
                     
                     # 4. 检查完成状态
                     if choice.finish_reason == 'stop':
@@ -146,41 +176,64 @@ class StreamingService:
                             'references': references,
                             'followUpQuestions': follow_up_questions,
                             'totalContent': current_content,
-                            'timestamp': datetime.now().isoformat()
+                            'timestamp': timestamp()
                         }
-                        yield self._create_sse_response(completion_data)
+                        yield from self._emit(pacer, completion_data)
                         break
                 
                 except Exception as chunk_error:
+                    _CHUNK_ERRORS.inc()
                     logger.error(f"Error processing chunk: {str(chunk_error)}")
                     continue
             
+            # 发送合并中的剩余内容
+            for event in pacer.flush():
+                _EVENTS.inc()
+                yield self._create_sse_response(event)
+            
         except Exception as e:
+            _STREAM_ERRORS.inc()
             logger.error(f"Error in Baichuan stream processing: {str(e)}")
             error_data = {
                 'error': f'Stream processing error: {str(e)}',
                 'isComplete': True,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': timestamp()
             }
             yield self._create_sse_response(error_data)
     
-    def _process_content_with_citations(self, content: str, references: List[Dict]) -> tuple:
+    def _emit(self, pacer: OutputPacer, data: Dict[str, Any]) -> Iterator[bytes]:
+        """
+        按节奏发送事件
+        
+        Args:
+            pacer: 节奏控制器
+            data: 事件数据
+            
+        Yields:
+            bytes: SSE 数据帧
+        """
+        for event in paced(pacer, [data]):
+            _EVENTS.inc()
+            yield self._create_sse_response(event)
+    
+    def _process_content_with_citations(self, content: str, references: List[Dict],
+                                        reference_index: Optional[FrozenSet[int]] = None) -> tuple:
         """
         处理内容中的引用标记
         
         Args:
             content: 内容文本
             references: 引用列表
+            reference_index: 引用编号索引
             
         Returns:
             tuple: (处理后的内容, 引用编号列表)
         """
         try:
-            from utils.citation_parser import CitationParser
-            parser = CitationParser()
-            
-            # 提取引用信息
-            processed_content, citations = parser.extract_citations_from_text(content, references)
+            # 提取引用信息（使用共享的解析器，不再为每个数据块创建实例）
+            processed_content, citations = self.citation_parser.extract_citations_from_text(
+                content, references, reference_index
+            )
             
             return processed_content, citations
             
@@ -234,7 +287,7 @@ class StreamingService:
                 "还有哪些需要了解的相关信息？"
             ]
     
-    def _create_sse_response(self, data: Dict[str, Any]) -> str:
+    def _create_sse_response(self, data: Dict[str, Any]) -> bytes:
         """
         创建 SSE 格式响应
         
@@ -242,15 +295,15 @@ class StreamingService:
             data: 响应数据
             
         Returns:
-            str: SSE 格式字符串
+            bytes: UTF-8 编码的 SSE 数据帧
         """
         try:
-            return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+            return b"data: " + dumps(data) + b"\n\n"
         except Exception as e:
             logger.error(f"Error creating SSE response: {str(e)}")
-            return f"data: {json.dumps({'error': 'SSE format error'})}\n\n"
+            return b"data: " + dumps({'error': 'SSE format error'}) + b"\n\n"
     
-    def create_error_response(self, error_message: str) -> str:
+    def create_error_response(self, error_message: str) -> bytes:
         """
         创建错误响应
         
@@ -258,24 +311,24 @@ class StreamingService:
             error_message: 错误信息
             
         Returns:
-            str: 错误 SSE 响应
+            bytes: 错误 SSE 响应
         """
         error_data = {
             'error': error_message,
             'isComplete': True,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp()
         }
         return self._create_sse_response(error_data)
     
-    def create_heartbeat(self) -> str:
+    def create_heartbeat(self) -> bytes:
         """
         创建心跳信号
         
         Returns:
-            str: 心跳 SSE 响应
+            bytes: 心跳 SSE 响应
         """
         heartbeat_data = {
             'type': 'heartbeat',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': timestamp()
         }
         return self._create_sse_response(heartbeat_data)
\ No newline at end of file
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+问答缓存测试 - 按条目数和字节数的 LRU 淘汰、TTL 过期、命中统计（精确命中、近似命中、未命中）
+"""
+
+import random
+from collections import OrderedDict
+
+from services.answer_cache import AnswerCache, BoundedTTLCache, normalize_question
+
+def test_lru_eviction_by_entries():
+    """超过条目数时淘汰最久未使用的条目，读取会刷新使用顺序"""
+    cache = BoundedTTLCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.get_stats()['evictions'] == 1
+
+def test_lru_eviction_by_bytes():
+    """超过总字节数时淘汰最久未使用的条目，单个条目超过上限时不写入"""
+    cache = BoundedTTLCache(max_entries=100, max_bytes=10, sizeof=len)
+    assert cache.put('a', 'xxxx')
+    assert cache.put('b', 'yyyy')
+    assert cache.put('c', 'zzzz')
+    
+    stats = cache.get_stats()
+    assert stats['entries'] == 2 and stats['bytes'] == 8 and stats['evictions'] == 1
+    assert cache.get('a') is None
+    
+    assert not cache.put('d', 'x' * 11)
+    assert cache.get('d') is None
+    assert len(cache) == 2
+    
+    # 替换已有条目时按新大小计算
+    assert cache.put('b', 'y')
+    assert cache.get_stats()['bytes'] == 5
+
+def test_ttl_expiry_counts_as_miss():
+    """过期条目读取时删除，计为过期和未命中；items 不返回过期条目"""
+    cache = BoundedTTLCache(ttl=3600)
+    cache.put('fresh', 1)
+    cache.put('stale', 2, expires_in=0)
+    assert [key for key, _, _ in cache.items()] == ['fresh']
+    
+    assert cache.get('stale') is None
+    stats = cache.get_stats()
+    assert stats['expirations'] == 1 and stats['misses'] == 1 and stats['entries'] == 1
+    
+    (_, _, expires_in), = cache.items()
+    assert 3590 < expires_in <= 3600
+    
+    # 没有 TTL 时不过期
+    cache = BoundedTTLCache()
+    cache.put('k', 1)
+    assert cache.items() == [('k', 1, None)]
+
+def test_hit_accounting():
+    """命中、未命中和二级命中的统计；record_stats=False 不计入"""
+    cache = BoundedTTLCache()
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('missing')
+    cache.get('a', record_stats=False)
+    cache.get('missing', record_stats=False)
+    cache.get('other')
+    cache.record_secondary_hit()
+    
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['secondary_hits'], stats['misses']) == (1, 1, 1)
+    assert stats['hit_rate'] == round(2 / 3, 4)
+    assert BoundedTTLCache().get_stats()['hit_rate'] == 0.0
+
+def test_fuzz_against_reference_lru():
+    """随机读写与参考 LRU 模型一致，容量限制始终成立"""
+    rng = random.Random(4)
+    for _ in range(100):
+        max_entries = rng.randint(1, 8)
+        max_bytes = rng.randint(5, 40)
+        cache = BoundedTTLCache(max_entries=max_entries, max_bytes=max_bytes, sizeof=len)
+        model = OrderedDict()
+        
+        for _ in range(200):
+            key = rng.choice('abcdefghij')
+            if rng.random() < 0.5:
+                value = 'x' * rng.randint(1, 12)
+                stored = cache.put(key, value)
+                assert stored == (len(value) <= max_bytes)
+                if stored:
+                    model.pop(key, None)
+                    model[key] = value
+                    while len(model) > max_entries or sum(map(len, model.values())) > max_bytes:
+                        model.popitem(last=False)
+            else:
+                assert cache.get(key) == model.get(key)
+                if key in model:
+                    model.move_to_end(key)
+            
+            assert [key for key, _, _ in cache.items()] == list(model)
+            stats = cache.get_stats()
+            assert stats['entries'] <= max_entries and stats['bytes'] <= max_bytes
+
+class StubSemanticIndex:
+    """把任意问题匹配到固定缓存键的近似问题索引"""
+    
+    def __init__(self, key):
+        self.key = key
+        self.added = []
+        self.removed = []
+    
+    def add(self, question, key, namespace=''):
+        self.added.append((question, key, namespace))
+    
+    def lookup(self, question, namespace=''):
+        return (self.key, 0.95) if self.key is not None else None
+    
+    def remove(self, key):
+        self.removed.append(key)
+    
+    def clear(self):
+        pass
+    
+    def get_stats(self):
+        return {}
+
+def test_answer_cache_semantic_hits():
+    """近似命中计为命中（semantic_hits），对应条目已淘汰时从索引中删除"""
+    events = [{'content': '种植牙', 'isComplete': False}, {'isComplete': True, 'sessionId': 's'}]
+    context = AnswerCache.build_context('system', {'model': 'm'})
+    key = AnswerCache.build_key('种植牙术后需要抗生素吗？', context)
+    assert key == AnswerCache.build_key('  种植牙术后需要抗生素吗?? ', context)
+    assert normalize_question('ＡＢＣ  问题？') == 'abc 问题'
+    
+    index = StubSemanticIndex(key)
+    cache = AnswerCache(semantic_index=index)
+    assert cache.put(key, events, '种植牙术后需要抗生素吗？', context)
+    assert index.added == [('种植牙术后需要抗生素吗？', key, context)]
+    
+    assert cache.get(key, '种植牙术后需要抗生素吗？', context) == events
+    assert cache.get('other-key', '种植牙术后是否需要抗生素', context) == events
+    index.key = 'evicted-key'
+    assert cache.get('other-key', '问题', context) is None
+    assert index.removed == ['evicted-key']
+    
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['exact_hits'], stats['semantic_hits'], stats['misses']) == (2, 1, 1, 1)
+    assert stats['semantic']['served'] == 1
+    assert stats['hit_rate'] == round(2 / 3, 4)
+
+def test_disabled_answer_cache():
+    """关闭时不读不写"""
+    cache = AnswerCache(enabled=False)
+    assert not cache.put('k', [{'isComplete': True}])
+    assert cache.get('k') is None
+    assert not AnswerCache().put('k', [])
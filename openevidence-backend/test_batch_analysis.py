@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+批量文本分析测试 - 多进程分块处理的结果与单进程一致且保持输入顺序
+"""
+
+import json
+
+from services.batch_analysis import analyze_jsonl, analyze_records
+from utils.citation_parser import CitationParser
+from utils.text_processor import TextProcessor
+
+ANSWERS = [
+    '种植牙术后通常不需要常规使用抗生素^[1]^。需要注意的是，高风险患者应个体化评估。',
+    '- 术前单次给药\n- 术后观察\n\n随机对照试验显示获益有限[2,3]。',
+    '',
+    '循证医学强调系统评价和荟萃分析^4^。'
+]
+
+def test_process_pool_preserves_order():
+    """多进程、小分块的结果与单进程逐条分析一致"""
+    records = [{'id': index, 'content': ANSWERS[index % len(ANSWERS)]} for index in range(50)]
+    
+    inline = list(analyze_records(records, workers=1))
+    pooled = list(analyze_records(iter(records), workers=2, chunk_size=3, max_pending=2))
+    
+    assert pooled == inline
+    assert [result['id'] for result in pooled] == list(range(50))
+    
+    processor = TextProcessor()
+    assert inline[1]['structure'] == processor.analyze_text_structure(ANSWERS[1])
+    assert inline[1]['key_points'] == processor.extract_key_points(ANSWERS[1])
+    assert inline[1]['citation_segments'] == CitationParser().segment_text_with_citations(ANSWERS[1], [])
+
+def test_jsonl_errors_keep_their_position():
+    """格式错误的行输出 error，空行跳过"""
+    lines = ['{"id": "a", "content": "好的。"}\n', 'not json\n', '\n', '[1]\n', '{"id": "b"}\n']
+    
+    results = [json.loads(line) for line in analyze_jsonl(lines, workers=2, chunk_size=1,
+                                                          operations=['key_points'])]
+    
+    assert results[0] == {'id': 'a', 'key_points': []}
+    assert results[1]['error'].startswith('Invalid JSON')
+    assert results[2] == {'error': 'Record is not a JSON object'}
+    assert results[3] == {'id': 'b', 'error': 'Missing text field: content'}
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+流式引用分词器测试 - 随机切分输入，结果必须与整段文本的正则匹配一致
+"""
+
+import random
+
+from utils.citation_parser import iter_citation_spans
+from utils.citation_tokenizer import StreamingCitationTokenizer, join_tokens
+
+# 偏向生成引用标记及其片段的字母表
+ALPHABET = ['^', '[', ']', ',', ' ', '1', '2', '10', '3', '。', '文', 'a', '\n']
+MARKERS = ['^[1]^', '[2]', '^[1,2]^', '[3, 10]', '^4^', '^[1]', '[2]^', '^[', '[1,', '^1']
+
+def reference_tokens(text):
+    """用 CitationParser 的正则对整段文本分词（参考实现）"""
+    return [(text[start:end], citations) for start, end, citations in iter_citation_spans(text)]
+
+def random_text(rng):
+    """生成包含完整、残缺引用标记的随机文本"""
+    parts = []
+    for _ in range(rng.randint(0, 30)):
+        parts.append(rng.choice(MARKERS) if rng.random() < 0.3 else rng.choice(ALPHABET))
+    return ''.join(parts)
+
+def random_split(rng, text):
+    """随机切分文本（包括空块）"""
+    cuts = sorted(rng.randint(0, len(text)) for _ in range(rng.randint(0, 8)))
+    bounds = [0] + cuts + [len(text)]
+    return [text[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+
+def tokenize_stream(chunks):
+    """按块喂入分词器，返回全部片段"""
+    tokenizer = StreamingCitationTokenizer()
+    tokens = []
+    for chunk in chunks:
+        tokens.extend(tokenizer.feed(chunk))
+    tokens.extend(tokenizer.flush())
+    return tokens
+
+def test_split_marker_across_chunks():
+    """跨块的引用标记作为一个整体输出"""
+    tokenizer = StreamingCitationTokenizer()
+    
+    assert join_tokens(tokenizer.feed('研究表明^[1')) == ('研究表明', [])
+    assert join_tokens(tokenizer.feed('2]^有效。')) == ('^[12]^有效。', [12])
+    assert tokenizer.flush() == []
+
+def test_trailing_caret_waits_for_next_chunk():
+    """] 之后需要看到下一个字符才能确定结尾的 ^ 是否属于标记"""
+    tokenizer = StreamingCitationTokenizer()
+    
+    assert join_tokens(tokenizer.feed('结论[1]')) == ('结论', [])
+    assert join_tokens(tokenizer.feed('^。')) == ('[1]^。', [1])
+    
+    tokenizer = StreamingCitationTokenizer()
+    assert join_tokens(tokenizer.feed('结论[1]')) == ('结论', [])
+    assert join_tokens(tokenizer.flush()) == ('[1]', [1])
+
+def test_overlong_partial_marker_is_released():
+    """过长的未完成标记不会无限暂存"""
+    tokenizer = StreamingCitationTokenizer(max_marker_length=8)
+    
+    text, citations = join_tokens(tokenizer.feed('[1,2,3,4,5,6'))
+    assert text == '[1,2,3,4,5,6'
+    assert citations == []
+    assert tokenizer.pending == ''
+
+def test_random_splits_match_reference():
+    """随机文本 + 随机切分：输出文本无损，引用与整段匹配一致"""
+    rng = random.Random(20240601)
+    
+    for _ in range(3000):
+        text = random_text(rng)
+        tokens = tokenize_stream(random_split(rng, text))
+        
+        assert ''.join(token['text'] for token in tokens) == text
+        
+        citations = [(token['text'], token['citations']) for token in tokens if token['type'] == 'citation']
+        assert citations == reference_tokens(text), text
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+后续问题调度测试 - 完成事件不等待后续问题、follow_up_ready 在其后发送，
+超时、出错或生成失败时使用默认后续问题并标记，默认问题不写入缓存
+"""
+
+import asyncio
+import threading
+import time
+
+from services.ask_stream import AskStreamProcessor
+from services.follow_up import FollowUpScheduler
+from services.follow_up_cache import FollowUpCache
+from services.llm_service import FOLLOW_UP_CONTEXT_LENGTH
+from utils.citation_parser import CitationParser
+
+DEFAULTS = ['默认问题一？', '默认问题二？']
+GENERATED = ['种植牙术后多久可以正常进食？', '哪些患者需要预防性使用抗生素？']
+
+class StubLLMService:
+    """按设定的延迟返回后续问题（或抛出异常）的 LLM 服务"""
+    
+    def __init__(self, delay: float = 0.0, questions=None, error: bool = False):
+        self.delay = delay
+        self.questions = questions if questions is not None else GENERATED
+        self.error = error
+        # 测试结束时放行仍在等待的生成
+        self.release = threading.Event()
+    
+    def _generate(self):
+        if self.error:
+            raise RuntimeError('upstream failed')
+        return list(self.questions)
+    
+    def generate_follow_up_questions(self, question, answer_content):
+        self.release.wait(self.delay)
+        return self._generate()
+    
+    async def generate_follow_up_questions_async(self, question, answer_content):
+        await asyncio.sleep(self.delay)
+        return self._generate()
+    
+    def get_default_follow_up_questions(self):
+        return list(DEFAULTS)
+    
+    def get_follow_up_identity(self, question, answer_content):
+        return {'question': question, 'answer': answer_content}
+
+def make_scheduler(llm_service, timeout=1.0, cache=None):
+    return FollowUpScheduler(llm_service, max_workers=2, timeout=timeout, cache=cache)
+
+def test_generated_questions():
+    """生成成功时返回生成的后续问题，不标记为默认问题"""
+    llm_service = StubLLMService()
+    scheduler = make_scheduler(llm_service)
+    
+    task = scheduler.track('问题')
+    assert task.result('回答') == GENERATED
+    assert not task.used_defaults
+    
+    task = scheduler.track('问题')
+    assert asyncio.run(task.result_async('回答')) == GENERATED
+    assert not task.used_defaults
+    scheduler.shutdown()
+
+def test_timeout_falls_back_to_defaults():
+    """超时返回默认后续问题并标记，完成较晚的生成结果仍写入后续问题缓存"""
+    llm_service = StubLLMService(delay=5.0)
+    cache = FollowUpCache()
+    scheduler = make_scheduler(llm_service, timeout=0.05, cache=cache)
+    
+    task = scheduler.track('问题')
+    start = time.monotonic()
+    assert task.result('回答') == DEFAULTS
+    assert time.monotonic() - start < 1.0
+    assert task.used_defaults
+    
+    llm_service.release.set()
+    key = scheduler._cache_key('问题', '回答')
+    deadline = time.monotonic() + 5
+    while cache.get(key) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get(key) == GENERATED
+    scheduler.shutdown()
+    
+    task = scheduler.track('异步问题')
+    assert asyncio.run(task.result_async('回答')) == DEFAULTS
+    assert task.used_defaults
+
+def test_errors_fall_back_to_defaults():
+    """生成出错（调度器捕获的异常或 llm_service 返回默认问题）时标记，默认问题不写入缓存"""
+    cache = FollowUpCache()
+    
+    llm_service = StubLLMService(error=True)
+    scheduler = make_scheduler(llm_service, cache=cache)
+    task = scheduler.track('问题')
+    assert task.result('回答') == DEFAULTS
+    assert task.used_defaults
+    task = scheduler.track('问题')
+    assert asyncio.run(task.result_async('回答')) == DEFAULTS
+    assert task.used_defaults
+    
+    llm_service = StubLLMService(questions=DEFAULTS)
+    scheduler = make_scheduler(llm_service, cache=cache)
+    task = scheduler.track('问题')
+    assert task.result('回答') == DEFAULTS
+    assert task.used_defaults
+    assert cache.get(scheduler._cache_key('问题', '回答')) is None
+    scheduler.shutdown()
+
+def finished_processor(answer: str = '种植牙术后一般不需要常规使用抗生素。') -> AskStreamProcessor:
+    """回答已结束的问答流处理器"""
+    processor = AskStreamProcessor(CitationParser(), 'session-1')
+    processor.current_content = answer
+    processor.finished = True
+    return processor
+
+def timed(events):
+    """记录每个事件产生的时刻"""
+    start = time.monotonic()
+    return [(time.monotonic() - start, event) for event in events]
+
+async def timed_async(events):
+    """记录每个事件产生的时刻（异步版本）"""
+    start = time.monotonic()
+    return [(time.monotonic() - start, event) async for event in events]
+
+def assert_pending_protocol(timed_events, questions, wait):
+    """完成事件立即发送且标记 followUpPending，follow_up_ready 在其后发送"""
+    assert [event.get('type', 'complete') for _, event in timed_events] == ['complete', 'follow_up_ready']
+    (completion_at, completion), (ready_at, ready) = timed_events
+    assert completion_at < wait / 2
+    assert ready_at >= wait * 0.8
+    assert completion['isComplete'] and completion['followUpPending']
+    assert completion['followUpQuestions'] == []
+    assert completion['sessionId'] == 'session-1'
+    assert ready['followUpQuestions'] == questions and not ready['isComplete']
+
+def test_completion_does_not_wait_for_follow_ups():
+    """后续问题尚未就绪时先发送完成事件，就绪后发送 follow_up_ready（同步与异步）"""
+    scheduler = make_scheduler(StubLLMService(delay=0.2))
+    
+    processor = finished_processor()
+    task = scheduler.track('问题')
+    assert_pending_protocol(timed(processor.finish(task)), GENERATED, 0.2)
+    assert not task.used_defaults
+    # 两个事件都进入问答缓存的事件序列
+    assert [event.get('type', 'complete') for event in processor.events] == ['complete', 'follow_up_ready']
+    
+    processor = finished_processor()
+    task = scheduler.track('问题')
+    assert_pending_protocol(asyncio.run(timed_async(processor.finish_async(task))), GENERATED, 0.2)
+    assert not task.used_defaults
+    scheduler.shutdown()
+
+def test_ready_follow_ups_ride_on_completion():
+    """回答较长、提前开始的后续问题已就绪时只发送带后续问题的完成事件"""
+    answer = '种' * FOLLOW_UP_CONTEXT_LENGTH
+    scheduler = make_scheduler(StubLLMService())
+    
+    task = scheduler.track('问题')
+    task.maybe_start(answer)
+    assert task.speculative
+    deadline = time.monotonic() + 5
+    while not task.done() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    events = list(finished_processor(answer).finish(task))
+    assert len(events) == 1
+    assert events[0]['followUpQuestions'] == GENERATED and not events[0]['followUpPending']
+    
+    async def speculate():
+        task = scheduler.track('问题')
+        task.maybe_start_async(answer)
+        await asyncio.sleep(0.01)
+        assert task.done()
+        return [event async for event in finished_processor(answer).finish_async(task)]
+    
+    events = asyncio.run(speculate())
+    assert len(events) == 1 and events[0]['followUpQuestions'] == GENERATED
+    scheduler.shutdown()
+
+def test_follow_up_timeout_after_completion():
+    """后续问题超时：完成事件不受影响，follow_up_ready 带默认后续问题，任务标记为使用默认问题"""
+    llm_service = StubLLMService(delay=5.0)
+    scheduler = make_scheduler(llm_service, timeout=0.1)
+    
+    task = scheduler.track('问题')
+    assert_pending_protocol(timed(finished_processor().finish(task)), DEFAULTS, 0.1)
+    assert task.used_defaults
+    
+    task = scheduler.track('问题')
+    assert_pending_protocol(asyncio.run(timed_async(finished_processor().finish_async(task))), DEFAULTS, 0.1)
+    assert task.used_defaults
+    
+    llm_service.release.set()
+    scheduler.shutdown()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+后续问题缓存测试 - 持久化文件的往返（绝对过期时间、跳过已过期条目、保持 LRU 顺序、拒绝未知版本）和退出时的保存
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+from services.follow_up_cache import PERSIST_FORMAT_VERSION, FollowUpCache
+
+def test_save_and_load_round_trip():
+    """保存后重新加载：内容和 LRU 顺序不变，剩余存活时间按绝对时间继续计算"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'cache', 'follow_up.json')
+        cache = FollowUpCache(max_entries=3, ttl=3600, persist_path=path)
+        for key in ['a', 'b', 'c']:
+            cache.put(key, [f"{key}-问题一？", f"{key}-问题二？"])
+        # 读取 a 后，最久未使用的是 b
+        assert cache.get('a') == ['a-问题一？', 'a-问题二？']
+        
+        before = time.time()
+        assert cache.save()
+        assert not cache.save()
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        assert data['version'] == PERSIST_FORMAT_VERSION
+        assert [key for key, _, _ in data['entries']] == ['b', 'c', 'a']
+        for _, _, expires_at in data['entries']:
+            assert before + 3590 < expires_at <= time.time() + 3600
+        
+        loaded = FollowUpCache(max_entries=3, ttl=3600, persist_path=path)
+        assert loaded.loaded == 3
+        assert loaded.get('c') == ['c-问题一？', 'c-问题二？']
+        # 加载保持 LRU 顺序：写入新条目时淘汰 b
+        loaded.put('d', ['d-问题？'])
+        assert loaded.get('b') is None
+        assert loaded.get('a') is not None
+        assert loaded.save()
+
+def test_load_skips_expired_entries_and_unknown_versions():
+    """加载时跳过已过期的条目，其余条目按文件中的绝对过期时间计算剩余时间；版本不符或文件损坏时不加载"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'follow_up.json')
+        now = time.time()
+        entries = [
+            ['expired', ['过期？'], now - 1],
+            ['forever', ['不过期？'], None],
+            ['fresh', ['未过期？'], now + 60]
+        ]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': PERSIST_FORMAT_VERSION, 'entries': entries}, f, ensure_ascii=False)
+        
+        cache = FollowUpCache(ttl=3600, persist_path=path)
+        assert cache.loaded == 2
+        assert cache.get('expired') is None
+        assert cache.get('forever') == ['不过期？']
+        remaining = {key: expires_in for key, _, expires_in in cache._cache.items()}
+        # 保存时没有过期时间的条目按当前 TTL 计算
+        assert 3590 < remaining['forever'] <= 3600
+        assert 55 < remaining['fresh'] <= 60
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': PERSIST_FORMAT_VERSION + 1, 'entries': entries}, f)
+        assert FollowUpCache(persist_path=path).loaded == 0
+        
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{not json')
+        assert FollowUpCache(persist_path=path).loaded == 0
+
+def test_blocking_save_waits_for_running_save():
+    """保存进行中时普通保存跳过，退出时的保存（blocking）等待其完成后写入最新内容"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'follow_up.json')
+        cache = FollowUpCache(persist_path=path)
+        cache.put('a', ['问题一？'])
+        
+        # 模拟后台线程中进行中的保存
+        cache._save_lock.acquire()
+        assert not cache.save()
+        
+        result = []
+        saver = threading.Thread(target=lambda: result.append(cache.save(blocking=True)))
+        saver.start()
+        time.sleep(0.05)
+        assert saver.is_alive()
+        
+        cache._save_lock.release()
+        saver.join(timeout=5)
+        assert result == [True]
+        assert FollowUpCache(persist_path=path).get('a') == ['问题一？']
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+术语词典测试 - 写入后内存映射读取与原词典一致，TextProcessor 使用词典文件和自动机缓存
+"""
+
+import os
+import random
+import tempfile
+
+from utils.glossary import Glossary, write_glossary
+from utils.text_processor import TextProcessor
+
+def test_round_trip_and_lookup():
+    """随机词典写入后逐条读取一致，缺失的术语返回 None，重复术语合并译名"""
+    rng = random.Random(20240703)
+    entries = {}
+    for _ in range(2000):
+        term = ''.join(rng.choice('种植牙体抗生素aé') for _ in range(rng.randint(1, 5)))
+        entries.setdefault(term, [])
+        name = rng.choice(['implant', 'dental implant', 'é', ''])
+        if name and name not in entries[term]:
+            entries[term].append(name)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'terms.oeg')
+        write_glossary(list(entries.items()) + [('种植牙', ['implant dentistry'])], path)
+        glossary = Glossary(path)
+        
+        expected = dict(entries)
+        expected['种植牙'] = entries.get('种植牙', []) + ['implant dentistry']
+        assert dict(glossary) == expected
+        assert list(glossary) == sorted(expected, key=lambda term: term.encode('utf-8'))
+        assert glossary.lookup('不存在') is None
+        assert '不存在' not in glossary
+
+def test_text_processor_uses_glossary_and_matcher_cache():
+    """使用词典文件时结果与内置词典一致，自动机构建后写入缓存并在下次直接加载"""
+    builtin = TextProcessor()
+    text = '抗生素与种植牙：种植牙术后抗生素，循证医学'
+    
+    with tempfile.TemporaryDirectory() as directory:
+        glossary_path = os.path.join(directory, 'terms.oeg')
+        matcher_path = os.path.join(directory, 'terms.acm')
+        write_glossary(builtin.medical_terms.items(), glossary_path)
+        
+        processor = TextProcessor(glossary_path=glossary_path, matcher_path=matcher_path)
+        # 启动时构建，之后的提取直接使用
+        matcher = processor.build_term_matcher()
+        assert os.path.exists(matcher_path)
+        assert processor.build_term_matcher() is matcher
+        terms = processor.extract_medical_terms(text)
+        assert TextProcessor(glossary_path=glossary_path, matcher_path=matcher_path).extract_medical_terms(text) == terms
+    
+    by_term = lambda item: item['term']
+    assert sorted(terms, key=by_term) == sorted(builtin.extract_medical_terms(text), key=by_term)
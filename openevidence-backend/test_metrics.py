@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+指标测试 - 多进程快照合并（已退出进程的计数器保留、仪表丢弃，仪表 sum/max/min 合并，直方图合并与导出）
+和 fork 后子进程清零
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from utils.metrics import MetricsRegistry
+
+def exited_pid() -> int:
+    """一个已经退出的进程的 PID"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+def declare(registry: MetricsRegistry):
+    """在注册表中声明测试用的指标"""
+    requests = registry.counter('requests_total', 'Requests', ('route',))
+    active = registry.gauge('active', 'Active streams')
+    peak = registry.gauge('peak', 'Peak streams', multiprocess_mode='max')
+    lowest = registry.gauge('lowest', 'Lowest free slots', multiprocess_mode='min')
+    latency = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+    return requests, active, peak, lowest, latency
+
+def write_worker_snapshot(directory: str, pid: int, requests: int, gauge: float, latencies) -> None:
+    """写入另一个工作进程的快照文件"""
+    registry = MetricsRegistry()
+    counter, active, peak, lowest, latency = declare(registry)
+    counter.labels('/api/ask').inc(requests)
+    active.set(gauge)
+    peak.set(gauge)
+    lowest.set(gauge)
+    for value in latencies:
+        latency.labels('/api/ask').observe(value)
+    with open(os.path.join(directory, f"metrics_{pid}.json"), 'w', encoding='utf-8') as f:
+        json.dump(registry.collect(), f)
+
+def samples(merged, name):
+    return {tuple(labels): value for labels, value in merged[name]['samples']}
+
+def test_merge_across_processes():
+    """计数器和直方图合并所有进程（包括已退出的），仪表只合并仍在运行的进程"""
+    with tempfile.TemporaryDirectory() as directory:
+        registry = MetricsRegistry()
+        # 不启动快照线程，只按目录合并
+        registry.multiprocess_dir = directory
+        requests, active, peak, lowest, latency = declare(registry)
+        requests.labels('/api/ask').inc(2)
+        active.set(3)
+        peak.set(3)
+        lowest.set(3)
+        latency.labels('/api/ask').observe(0.0625)
+        
+        write_worker_snapshot(directory, os.getppid(), requests=5, gauge=7, latencies=[0.5, 2.0])
+        write_worker_snapshot(directory, exited_pid(), requests=11, gauge=100, latencies=[0.0625])
+        
+        merged = registry.merged()
+        assert samples(merged, 'requests_total') == {('/api/ask',): 18.0}
+        assert samples(merged, 'active') == {(): 10.0}
+        assert samples(merged, 'peak') == {(): 7.0}
+        assert samples(merged, 'lowest') == {(): 3.0}
+        assert samples(merged, 'latency_seconds') == {('/api/ask',): {'counts': [2, 1, 1], 'sum': 2.625}}
+        assert merged['latency_seconds']['buckets'] == [0.1, 1.0]
+        
+        # 本进程的最新值在合并前写入快照
+        assert os.path.exists(os.path.join(directory, f"metrics_{os.getpid()}.json"))
+        # 损坏的快照文件跳过
+        with open(os.path.join(directory, 'metrics_1.json'), 'w', encoding='utf-8') as f:
+            f.write('{')
+        assert samples(registry.merged(), 'requests_total') == {('/api/ask',): 18.0}
+
+def test_render_histogram():
+    """直方图按累计分桶导出，_count 等于 +Inf 分桶"""
+    registry = MetricsRegistry()
+    latency = registry.histogram('latency_seconds', 'Latency\nin seconds', ('route',), buckets=(0.25, 1.0))
+    for value in [0.125, 0.25, 0.5, 3.0]:
+        latency.labels('/api/"ask"').observe(value)
+    registry.counter('empty_total', 'No samples yet')
+    
+    assert registry.render().split('\n') == [
+        '# HELP latency_seconds Latency\\nin seconds',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{route="/api/\\"ask\\"",le="0.25"} 2',
+        'latency_seconds_bucket{route="/api/\\"ask\\"",le="1.0"} 3',
+        'latency_seconds_bucket{route="/api/\\"ask\\"",le="+Inf"} 4',
+        'latency_seconds_sum{route="/api/\\"ask\\""} 3.875',
+        'latency_seconds_count{route="/api/\\"ask\\""} 4',
+        '# HELP empty_total No samples yet',
+        '# TYPE empty_total counter',
+        'empty_total 0.0',
+        ''
+    ]
+
+def test_reset_after_fork():
+    """fork 出的子进程清零继承的指标（已计入父进程快照），预先绑定的子指标仍然可用"""
+    with tempfile.TemporaryDirectory() as directory:
+        registry = MetricsRegistry()
+        registry.multiprocess_dir = directory
+        registry.snapshot_interval = 3600
+        requests, active, _, _, latency = declare(registry)
+        ask_requests = requests.labels('/api/ask')
+        ask_requests.inc(4)
+        active.set(2)
+        latency.labels('/api/ask').observe(0.5)
+        
+        # 父进程的快照（子进程启动后 PID 不同）
+        write_worker_snapshot(directory, os.getppid(), requests=4, gauge=2, latencies=[0.5])
+        registry._after_fork()
+        try:
+            assert registry._snapshot_thread.is_alive()
+            assert samples(registry.collect(), 'requests_total') == {('/api/ask',): 0.0}
+            assert samples(registry.collect(), 'latency_seconds') == {('/api/ask',): {'counts': [0, 0, 0], 'sum': 0.0}}
+            
+            ask_requests.inc()
+            merged = registry.merged()
+            assert samples(merged, 'requests_total') == {('/api/ask',): 5.0}
+            assert samples(merged, 'active') == {(): 2.0}
+            assert samples(merged, 'latency_seconds') == {('/api/ask',): {'counts': [0, 1, 0], 'sum': 0.5}}
+        finally:
+            registry._stop_event.set()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+输出节奏测试 - 自适应合并的首个事件直接发送、按时间预算发送暂存内容（包括 Flask 模式上游停顿时），
+合并后内容不变
+"""
+
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from services.ask_stream import AskStreamProcessor
+from services.pacing import AdaptiveCoalescingPacer, DeadlineReader, OutputPacer, paced
+from utils.citation_parser import CitationParser
+
+class FakeClock:
+    """手动推进的时钟"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def content(text, citations=None):
+    event = {'content': text, 'isComplete': False}
+    if citations:
+        event['citations'] = citations
+    return event
+
+def test_first_content_event_is_not_held():
+    """第一个内容事件直接发送，之后快速到达的内容才合并"""
+    clock = FakeClock()
+    pacer = AdaptiveCoalescingPacer(interval=0.05, max_chars=32, clock=clock)
+    
+    assert pacer.push({'references': []}) == [{'references': []}]
+    assert pacer.push(content('种植')) == [content('种植')]
+    assert pacer.remaining() is None
+    
+    clock.now += 0.01
+    assert pacer.push(content('牙')) == []
+    clock.now += 0.01
+    assert pacer.push(content('术后')) == []
+    assert pacer.flush() == [content('牙术后')]
+
+def test_flush_due_after_interval():
+    """上游停顿时暂存内容在时间预算用完后发送，而不是等到下一个上游块"""
+    clock = FakeClock()
+    pacer = AdaptiveCoalescingPacer(interval=0.5, max_chars=32, clock=clock)
+    pacer.push(content('一'))
+    
+    clock.now = 0.125
+    assert pacer.push(content('二')) == []
+    assert pacer.remaining() == 0.5
+    
+    clock.now = 0.5
+    assert pacer.flush_due() == []
+    assert pacer.remaining() == 0.125
+    
+    clock.now = 0.75
+    assert pacer.remaining() == 0.0
+    assert pacer.flush_due() == [content('二')]
+    assert pacer.remaining() is None
+    assert pacer.flush_due() == []
+
+def test_passthrough_pacer_has_no_deadline():
+    """透传模式没有暂存内容"""
+    pacer = OutputPacer()
+    assert pacer.push(content('一')) == [content('一')]
+    assert pacer.remaining() is None
+    assert pacer.flush_due() == []
+
+def test_fuzz_coalescing_preserves_content():
+    """随机到达间隔、引用和超时检查：发送的内容与引用与上游一致，暂存时间不超过预算"""
+    rng = random.Random(10)
+    for _ in range(200):
+        clock = FakeClock()
+        pacer = AdaptiveCoalescingPacer(interval=0.05, max_chars=rng.randint(4, 40), clock=clock)
+        upstream = [content('字' * rng.randint(1, 5), [rng.randint(1, 9)] if rng.random() < 0.1 else None)
+                    for _ in range(rng.randint(1, 60))]
+        
+        sent = []
+        for event in upstream:
+            clock.now += rng.choice([0.001, 0.005, 0.02, 0.08])
+            if rng.random() < 0.5:
+                remaining = pacer.remaining()
+                assert remaining is None or 0.0 <= remaining <= 0.05
+                sent.extend(pacer.flush_due())
+            sent.extend(paced(pacer, [event]))
+        sent.extend(pacer.flush())
+        
+        assert sent[0] == upstream[0]
+        assert ''.join(event['content'] for event in sent) == ''.join(event['content'] for event in upstream)
+        # 带引用的内容立即发送，每个发送的事件最多包含一个上游事件的引用
+        assert ([num for event in sent for num in event.get('citations', [])] ==
+                [num for event in upstream for num in event.get('citations', [])])
+
+def upstream_chunk(text, finish_reason=None):
+    """模拟 Baichuan 流式响应块"""
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=finish_reason)])
+
+def stalled_upstream(stall, closed):
+    """快速到达两个内容块后停顿 stall 秒再结束"""
+    try:
+        yield upstream_chunk('种植牙')
+        time.sleep(0.005)
+        yield upstream_chunk('术后')
+        time.sleep(stall)
+        yield upstream_chunk('通常不需要抗生素。', 'stop')
+    finally:
+        closed.set()
+
+def flask_events(pacer, chunks):
+    """与 app.py 的 Flask 生成器相同的读取循环，记录每个事件发送的时刻"""
+    processor = AskStreamProcessor(CitationParser(), 'session-1')
+    stream = DeadlineReader(chunks, pacer)
+    start = time.monotonic()
+    sent = []
+    try:
+        for chunk in stream:
+            if chunk is None:
+                sent.extend((time.monotonic() - start, event) for event in pacer.flush_due())
+                continue
+            sent.extend((time.monotonic() - start, event) for event in paced(pacer, processor.process_chunk(chunk)))
+            if processor.finished:
+                break
+        sent.extend((time.monotonic() - start, event) for event in pacer.flush())
+    finally:
+        stream.close()
+    return sent
+
+def test_flask_flushes_during_upstream_stall():
+    """Flask 模式上游停顿时，已到达的暂存内容在时间预算用完时发送，不等到下一个上游块"""
+    closed = threading.Event()
+    sent = flask_events(AdaptiveCoalescingPacer(interval=0.05), stalled_upstream(0.5, closed))
+    
+    assert [event['content'] for _, event in sent] == ['种植牙', '术后', '通常不需要抗生素。']
+    assert sent[0][0] < 0.05
+    assert 0.04 <= sent[1][0] < 0.3
+    assert sent[2][0] >= 0.5
+    assert closed.wait(1)
+
+def test_deadline_reader_passthrough_and_errors():
+    """不暂存事件的节奏模式在当前线程读取；上游异常在迭代时抛出，提前关闭时释放上游流"""
+    closed = threading.Event()
+    sent = flask_events(OutputPacer(), stalled_upstream(0.05, closed))
+    assert [event['content'] for _, event in sent] == ['种植牙', '术后', '通常不需要抗生素。']
+    assert closed.is_set()
+    
+    def failing():
+        yield upstream_chunk('种植牙')
+        raise RuntimeError('upstream disconnected')
+    
+    reader = DeadlineReader(failing(), AdaptiveCoalescingPacer())
+    received = []
+    try:
+        for chunk in reader:
+            received.append(chunk)
+    except RuntimeError as e:
+        assert str(e) == 'upstream disconnected'
+    else:
+        raise AssertionError('upstream error was not raised')
+    assert len(received) == 1
+    
+    closed = threading.Event()
+    reader = DeadlineReader(stalled_upstream(0.05, closed), AdaptiveCoalescingPacer())
+    next(iter(reader))
+    reader.close()
+    assert closed.wait(1)
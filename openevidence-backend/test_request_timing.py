@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+请求计时测试 - 阶段与派生区间耗时、记录到指标注册表的直方图以及 /api/timing/stats 的毫秒统计
+"""
+
+from services.request_timing import ASK_INTERVAL_SECONDS, TimingRecorder, RequestTimer, _histogram_stats
+
+class FakeClock:
+    """手动推进的时钟"""
+    
+    def __init__(self):
+        self.now = 10.0
+    
+    def __call__(self):
+        return self.now
+
+def test_stage_and_interval_ms():
+    """阶段只记录第一次出现的时刻，派生区间只在两个阶段都已记录时计算"""
+    clock = FakeClock()
+    timer = RequestTimer('session-1', clock=clock)
+    clock.now += 0.125
+    timer.mark('upstream_connect')
+    clock.now += 0.25
+    timer.mark('first_content')
+    clock.now += 1.0
+    timer.mark('first_content')
+    timer.tag(server='flask', cached=False)
+    
+    summary = timer.summary()
+    assert summary['request_id'] == 'session-1' and summary['server'] == 'flask'
+    assert summary['stages_ms'] == {'accept': 0.0, 'upstream_connect': 125.0, 'first_content': 375.0}
+    assert summary['intervals_ms'] == {'ttft': 375.0, 'connect': 125.0, 'upstream_ttft': 250.0}
+
+def test_histogram_stats_in_ms():
+    """秒为单位的直方图样本换算为毫秒统计，分位数按分桶线性插值，+Inf 分桶只给出下界"""
+    stats = _histogram_stats((0.01, 0.1), {'counts': [2, 2, 0], 'sum': 0.12})
+    assert stats == {
+        'count': 4,
+        'mean_ms': 30.0,
+        'p50_ms': 10.0,
+        'p95_ms': 91.0,
+        'p99_ms': 98.2,
+        'buckets': {'10': 2, '100': 4, '+Inf': 4}
+    }
+    assert _histogram_stats((0.01,), {'counts': [0, 1], 'sum': 5.0})['p99_ms'] == 10.0
+    
+    empty = _histogram_stats((0.01,), {'counts': [0, 0], 'sum': 0.0})
+    assert empty['count'] == 0 and empty['mean_ms'] is None and empty['p50_ms'] is None
+
+def test_recorder_reads_registry_histograms():
+    """记录的请求只写入指标注册表一次，统计从注册表的直方图读取"""
+    recorder = TimingRecorder()
+    before = recorder.get_stats()
+    assert set(before['stages']) == {'upstream_connect', 'first_thinking', 'references_loaded', 'first_content',
+                                     'stop', 'follow_up_done', 'last_byte'}
+    
+    clock = FakeClock()
+    timer = RequestTimer('session-1', clock=clock)
+    clock.now += 0.05
+    timer.mark('first_content')
+    clock.now += 0.5
+    timer.mark('last_byte')
+    recorder.record(timer)
+    
+    after = recorder.get_stats()
+    assert after['intervals']['ttft']['count'] == before['intervals']['ttft']['count'] + 1
+    assert after['intervals']['ttlt']['count'] == before['intervals']['ttlt']['count'] + 1
+    assert after['stages']['last_byte']['count'] == before['stages']['last_byte']['count'] + 1
+    assert after['intervals']['tail'] == before['intervals']['tail']
+    
+    sample = dict((tuple(labels), value) for labels, value in ASK_INTERVAL_SECONDS.samples())[('ttft',)]
+    assert sum(sample['counts']) == after['intervals']['ttft']['count']
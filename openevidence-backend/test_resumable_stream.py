@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+可续传事件流测试 - 按事件 ID 续读、超出字节上限的淘汰、无人读取时停止生成和相同问题共用一次生成（single-flight）
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+
+from services.resumable_stream import ResumableStream, ResumableStreamStore, run_producer
+
+def parse_frames(frames):
+    """把 SSE 数据帧解析为 (事件 ID, 事件) 列表"""
+    parsed = []
+    for frame in frames:
+        fields = dict(line.split(': ', 1) for line in frame.decode('utf-8').strip().split('\n'))
+        parsed.append((int(fields['id']) if 'id' in fields else None, json.loads(fields['data'])))
+    return parsed
+
+def publish_answer(stream, count, rng=None):
+    """写入 count 个内容事件和完成事件，并结束生产者"""
+    for index in range(count):
+        size = rng.randint(1, 40) if rng else 4
+        stream.publish({'content': f"{index}:" + '字' * size, 'isComplete': False})
+    stream.publish({'content': '', 'isComplete': True, 'sessionId': 'producer'})
+    stream.close()
+
+def test_read_and_resume_inside_buffer():
+    """从头读取得到全部事件（ID 连续），从中途的 ID 续读只得到之后的事件"""
+    stream = ResumableStream('s:q')
+    publish_answer(stream, 5)
+    
+    events = parse_frames(stream.read())
+    assert [event_id for event_id, _ in events] == [1, 2, 3, 4, 5, 6]
+    assert events[0][1]['content'] == '0:字字字字'
+    assert events[-1][1]['isComplete'] is True
+    
+    assert stream.can_resume(3)
+    assert parse_frames(stream.read(3)) == events[3:]
+    # 已读到最后一个事件时立即结束
+    assert list(stream.read(stream.last_id)) == []
+
+def test_resume_after_eviction():
+    """超出字节上限时淘汰最早的事件，从已淘汰的 ID 续读返回错误事件"""
+    stream = ResumableStream('s:q', max_bytes=400)
+    publish_answer(stream, 30)
+    
+    events = parse_frames(stream.read(0))
+    assert len(events) == 1
+    assert events[0][0] is None
+    assert 'overrun' in events[0][1]['error']
+    assert events[0][1]['isComplete'] is True
+    
+    first_kept = parse_frames(stream.read(stream.last_id - 1))[0][0]
+    assert first_kept == stream.last_id
+    assert not stream.can_resume(0)
+    assert stream.can_resume(stream.last_id - 1)
+
+def test_fuzz_resume_points():
+    """随机事件大小和字节上限：能续读时事件不缺不重，否则返回错误事件"""
+    rng = random.Random(18)
+    for _ in range(200):
+        stream = ResumableStream('s:q', max_bytes=rng.randint(50, 3000))
+        count = rng.randint(0, 40)
+        publish_answer(stream, count, rng)
+        assert stream.last_id == count + 1
+        
+        last_event_id = rng.randint(0, stream.last_id)
+        events = parse_frames(stream.read(last_event_id))
+        if stream.can_resume(last_event_id):
+            assert [event_id for event_id, _ in events] == list(range(last_event_id + 1, stream.last_id + 1))
+        else:
+            assert len(events) == 1 and 'error' in events[0][1]
+
+def test_reader_waits_for_producer():
+    """读取者在生产者写入前等待，生产者结束后读取结束"""
+    stream = ResumableStream('s:q')
+    received = []
+    reader = threading.Thread(target=lambda: received.extend(parse_frames(stream.read())))
+    reader.start()
+    
+    time.sleep(0.05)
+    assert not received
+    publish_answer(stream, 3)
+    reader.join(timeout=5)
+    
+    assert not reader.is_alive()
+    assert [event_id for event_id, _ in received] == [1, 2, 3, 4]
+
+def test_abandoned_stream_stops_producer():
+    """没有读取者超过 abandon_after 时生产者停止生成并关闭事件生成器"""
+    stream = ResumableStream('s:q', abandon_after=0.05)
+    closed = threading.Event()
+    
+    def events():
+        try:
+            index = 0
+            while True:
+                index += 1
+                yield {'content': str(index), 'isComplete': False}
+                time.sleep(0.01)
+        finally:
+            closed.set()
+    
+    # 有读取者时不视为放弃
+    reader = stream.read()
+    run_producer(stream, events())
+    next(reader)
+    time.sleep(0.1)
+    assert not stream.abandoned()
+    reader.close()
+    
+    stream.producer.join(timeout=5)
+    assert stream.done
+    assert closed.is_set()
+    assert stream.abandoned()
+
+def test_store_resume():
+    """按会话和问题查找缓冲：不是重连、ID 无效、缓冲不存在或已淘汰时返回 None"""
+    store = ResumableStreamStore(max_bytes=400)
+    stream = store.create('session-1', '问题')
+    publish_answer(stream, 30)
+    
+    assert store.resume('session-1', '问题', None) is None
+    assert store.resume('session-1', '问题', 'abc') is None
+    assert store.resume('session-2', '问题', '3') is None
+    assert store.resume('session-1', '其他问题', '3') is None
+    assert store.resume('session-1', '问题', '0') is None
+    assert store.resume('session-1', '问题', f" {stream.last_id - 1} ") == (stream, stream.last_id - 1)
+    
+    assert ResumableStreamStore(enabled=False).resume('session-1', '问题', '1') is None
+
+def test_single_flight_join():
+    """两个读取者加入同一次生成：后加入的从第一个事件开始追读，完成事件带各自的会话ID"""
+    store = ResumableStreamStore()
+    stream = store.create('producer', '问题', flight_key='flight')
+    stream.publish({'content': '种植牙', 'isComplete': False})
+    
+    first = store.join('flight', 'reader-1', '问题')
+    assert first is stream
+    results = {}
+    reader = threading.Thread(target=lambda: results.update(early=parse_frames(first.read(0, 'reader-1'))))
+    reader.start()
+    
+    stream.publish({'content': '术后', 'isComplete': False})
+    # 生产者写入了一部分之后才加入
+    second = store.join('flight', 'reader-2', '问题')
+    assert second is stream
+    publish_answer(stream, 0)
+    reader.join(timeout=5)
+    results['late'] = parse_frames(second.read(0, 'reader-2'))
+    
+    for name, session_id in [('early', 'reader-1'), ('late', 'reader-2')]:
+        events = results[name]
+        assert [event_id for event_id, _ in events] == [1, 2, 3]
+        assert [event['content'] for _, event in events[:2]] == ['种植牙', '术后']
+        assert events[-1][1]['sessionId'] == session_id
+    assert parse_frames(stream.read(0, 'producer'))[-1][1]['sessionId'] == 'producer'
+    
+    # 加入的会话也能断线续传；生成结束后不再接受加入
+    assert store.resume('reader-2', '问题', '1') == (stream, 1)
+    assert store.join('flight', 'reader-3', '问题') is None
+    assert store.get_stats()['in_flight'] == 0
+
+def test_single_flight_join_async():
+    """异步读取者加入进行中的生成，完成事件中的会话ID同样被替换"""
+    store = ResumableStreamStore()
+    
+    async def scenario():
+        stream = store.create('producer', '问题', flight_key='flight')
+        joined = store.join('flight', 'reader', '问题')
+        
+        async def produce():
+            for index in range(3):
+                await asyncio.sleep(0.01)
+                stream.publish({'content': str(index), 'isComplete': False})
+            stream.publish({'content': '', 'isComplete': True, 'sessionId': 'producer'})
+            stream.close()
+        
+        producer = asyncio.ensure_future(produce())
+        frames = [frame async for frame in joined.read_async(0, 'reader')]
+        await producer
+        return parse_frames(frames)
+    
+    events = asyncio.run(scenario())
+    assert [event_id for event_id, _ in events] == [1, 2, 3, 4]
+    assert events[-1][1]['sessionId'] == 'reader'
+
+def test_single_flight_disabled():
+    """关闭 single-flight（或续传）时不加入进行中的生成"""
+    for store in [ResumableStreamStore(single_flight=False), ResumableStreamStore(enabled=False)]:
+        store.create('producer', '问题', flight_key='flight')
+        assert store.join('flight', 'reader', '问题') is None
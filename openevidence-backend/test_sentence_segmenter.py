@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+句子切分测试 - 缩写和小数点不切分，流式切分与整段切分结果一致
+"""
+
+import random
+
+from utils.sentence_segmenter import StreamingSentenceSegmenter, split_sentences
+from utils.text_processor import TextProcessor
+
+ALPHABET = ['。', '！', '？', '.', '!', '?', ' ', '\n', 'a', '文', '1', '2.5', 'Dr.', 'Prof.',
+            'e.g.', 'i.e.', 'etc.', 'vs.', 'e', 'g', 'i']
+
+def random_split(rng, text):
+    """随机切分文本（包括空块）"""
+    cuts = sorted(rng.randint(0, len(text)) for _ in range(rng.randint(0, 8)))
+    bounds = [0] + cuts + [len(text)]
+    return [text[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+
+def test_abbreviations_and_decimals():
+    """缩写中的点、小数点不作为句末"""
+    text = '剂量为2.5 mg时有效。Dr. Smith 认为 e.g. 阿莫西林 etc. 可用！另见 i.e. 方案? 结束'
+    
+    assert split_sentences(text) == [
+        '剂量为2.5 mg时有效。',
+        'Dr. Smith 认为 e.g. 阿莫西林 etc. 可用！',
+        '另见 i.e. 方案?',
+        '结束'
+    ]
+
+def test_short_fragments_join_next_sentence():
+    """去除空白后不足 3 个字符的片段并入下一句"""
+    assert split_sentences('好。  是的。\n不。') == ['好。  是的。', '不。']
+    assert TextProcessor().segment_by_sentences('好。  是的。\n不。') == ['好。  是的。', '不。']
+
+def test_streaming_matches_split():
+    """随机文本 + 随机切分：流式输出与整段切分一致"""
+    rng = random.Random(20240701)
+    
+    for _ in range(3000):
+        text = ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+        segmenter = StreamingSentenceSegmenter()
+        sentences = []
+        for chunk in random_split(rng, text):
+            sentences.extend(segmenter.feed(chunk))
+        sentences.extend(segmenter.flush())
+        
+        assert sentences == split_sentences(text), text
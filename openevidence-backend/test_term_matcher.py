@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+术语匹配测试 - 自动机结果与逐词条查找一致，支持重叠匹配、英文忽略大小写和保存 / 加载
+"""
+
+import os
+import random
+import re
+import tempfile
+
+from utils.term_matcher import TermMatcher
+from utils.text_processor import TextProcessor
+
+def naive_find_all(terms, text):
+    """逐词条正则查找（前瞻允许重叠匹配）"""
+    positions = {}
+    for term_id, term in enumerate(terms):
+        pattern = r'(?<![A-Za-z0-9])' if term[0].isascii() and term[0].isalnum() else ''
+        pattern += '(?=' + re.escape(term)
+        pattern += r'(?![A-Za-z0-9]))' if term[-1].isascii() and term[-1].isalnum() else ')'
+        found = [match.start() for match in re.finditer(pattern, text, re.IGNORECASE)]
+        if found:
+            positions[term_id] = found
+    return positions
+
+def test_overlapping_and_case_insensitive():
+    """嵌套 / 重叠的词条都能匹配，英文忽略大小写且要求单词边界"""
+    matcher = TermMatcher(['种植', '种植牙', '植牙', 'implant', 'EBM'])
+    
+    assert sorted(matcher.iter_matches('种植牙 Implant implants ebm')) == [
+        (0, 2, 0), (0, 3, 1), (1, 3, 2), (4, 11, 3), (21, 24, 4)
+    ]
+
+def test_matches_naive_search_and_round_trips():
+    """随机词典和文本：与逐词条查找一致，保存后加载结果不变"""
+    rng = random.Random(20240702)
+    alphabet = ['a', 'b', 'A', '牙', '种', ' ', '1']
+    
+    for _ in range(300):
+        terms = list(dict.fromkeys(
+            ''.join(rng.choice(alphabet[:5]) for _ in range(rng.randint(1, 4))).lower()
+            for _ in range(rng.randint(1, 12))
+        ))
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        matcher = TermMatcher(terms)
+        
+        assert matcher.find_all(text) == naive_find_all(terms, text), (terms, text)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'terms.acm')
+        matcher.save(path)
+        loaded = TermMatcher.load(path)
+    assert loaded.terms == matcher.terms
+    assert loaded.find_all(text) == matcher.find_all(text)
+
+def test_extract_medical_terms_in_dictionary_order():
+    """TextProcessor 输出按词典顺序，位置包含所有出现"""
+    terms = TextProcessor().extract_medical_terms('抗生素与种植牙：种植牙术后抗生素')
+    
+    assert [(item['term'], item['positions']) for item in terms] == [
+        ('种植牙', [4, 8]), ('抗生素', [0, 13])
+    ]
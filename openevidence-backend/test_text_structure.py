@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+流式文本结构分析测试 - 随机切分的增量统计与整段 analyze_text_structure 一致
+"""
+
+import random
+
+from utils.term_matcher import StreamingTermMatcher, TermMatcher
+from utils.text_processor import TextProcessor
+
+ALPHABET = ['。', '.', '!', ' ', '\n', '\n\n', ' \n ', 'a', '文', '种植牙', '抗生素', '种植', '牙',
+            '^[1]^', '[2', '^', '3]', '1', '2.5', 'e.g.', '\t', 'EBM']
+
+def random_split(rng, text):
+    """随机切分文本（包括空块）"""
+    cuts = sorted(rng.randint(0, len(text)) for _ in range(rng.randint(0, 10)))
+    bounds = [0] + cuts + [len(text)]
+    return [text[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+
+def test_streaming_term_matcher_matches_whole_text():
+    """跨块的匹配（包括英文单词边界）与整段匹配一致"""
+    rng = random.Random(20240704)
+    matcher = TermMatcher(['ab', 'b', 'abab', '牙', '种植牙'])
+    
+    for _ in range(2000):
+        text = ''.join(rng.choice(['a', 'b', 'A', '牙', '种植', ' ', '1']) for _ in range(rng.randint(0, 30)))
+        streaming = StreamingTermMatcher(matcher)
+        matches = []
+        for chunk in random_split(rng, text):
+            matches.extend(streaming.feed(chunk))
+        matches.extend(streaming.flush())
+        
+        assert sorted(matches) == sorted(matcher.iter_matches(text)), text
+
+def test_streaming_structure_matches_analyze_text_structure():
+    """随机文本 + 随机切分：统计和术语命中与整段分析一致"""
+    rng = random.Random(20240705)
+    processor = TextProcessor()
+    
+    for _ in range(2000):
+        text = ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+        analyzer = processor.create_stream_analyzer()
+        for chunk in random_split(rng, text):
+            analyzer.feed(chunk)
+        structure = analyzer.finalize()
+        expected = processor.analyze_text_structure(text)
+        
+        assert structure['statistics'] == expected['statistics'], text
+        assert [(item['term'], item['count']) for item in structure['medical_terms']] == [
+            (item['term'], item['count']) for item in expected['medical_terms']
+        ]
@@ -5,21 +5,56 @@
 
 import re
 import logging
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, FrozenSet, Iterator, Optional
+
+from utils.metrics import REGISTRY, STAGE_ERRORS
 
 logger = logging.getLogger(__name__)
 
+# 引用解析指标
+REFERENCES_PARSED = REGISTRY.counter(
+    'openevidence_references_parsed_total', 'References parsed from Baichuan grounding evidence'
+)
+CITATIONS_CHECKED = REGISTRY.counter(
+    'openevidence_citations_checked_total', 'Distinct citation numbers validated against the reference list'
+)
+CITATIONS_DROPPED = REGISTRY.counter(
+    'openevidence_citations_dropped_total', 'Citation numbers dropped because no reference has that id'
+)
+_PARSE_ERRORS = STAGE_ERRORS.labels('citation_parse')
+_EXTRACT_ERRORS = STAGE_ERRORS.labels('citation_extract')
+_SEGMENT_ERRORS = STAGE_ERRORS.labels('citation_segment')
+
+# 引用标记：^[1]^、^[1]、[1,2,3]、[1]^ 或 ^1^
+# 单一预编译正则，一次扫描得到互不重叠的标记（^[1]^ 中的 [1] 不会重复计数）；
+# 每个分支都以字面字符开头，正则引擎可以直接跳到 '^' / '[' 处尝试匹配
+CITATION_PATTERN = re.compile(
+    r'\^\[(\d+(?:,\s*\d+)*)\]\^?'
+    r'|\[(\d+(?:,\s*\d+)*)\]\^?'
+    r'|\^(\d+)\^'
+)
+
+def iter_citation_spans(text: str) -> Iterator[Tuple[int, int, List[int]]]:
+    """
+    扫描文本中的引用标记
+    
+    Args:
+        text: 输入文本
+        
+    Yields:
+        Tuple[int, int, List[int]]: (起始位置, 结束位置, 引用编号列表)
+    """
+    for match in CITATION_PATTERN.finditer(text):
+        citation_str = match.group(match.lastindex)
+        yield match.start(), match.end(), [int(num) for num in citation_str.split(',')]
+
 class CitationParser:
     """引用解析器"""
     
     def __init__(self):
         """初始化引用解析器"""
-        # 引用标记的正则表达式模式
-        self.citation_patterns = [
-            r'\^?\[(\d+(?:,\s*\d+)*)\]\^?',  # ^[1]^ 或 [1,2,3] 格式
-            r'\^(\d+)\^',                    # ^1^ 格式
-            r'\[(\d+)\]',                    # [1] 格式
-        ]
+        # 引用标记的正则表达式
+        self.citation_pattern = CITATION_PATTERN
         
         logger.info("Citation parser initialized")
     
@@ -60,20 +95,36 @@ class CitationParser:
             # 按引用编号排序
             references.sort(key=lambda x: x['id'])
             
+            REFERENCES_PARSED.inc(len(references))
             logger.info(f"Parsed {len(references)} references from Baichuan response")
             return references
             
         except Exception as e:
+            _PARSE_ERRORS.inc()
             logger.error(f"Error parsing Baichuan references: {str(e)}")
             return []
     
-    def extract_citations_from_text(self, text: str, references: List[Dict]) -> Tuple[str, List[int]]:
+    def build_reference_index(self, references: List[Dict]) -> FrozenSet[int]:
+        """
+        构建引用编号索引（每个请求在引用加载时构建一次，供后续所有数据块复用）
+        
+        Args:
+            references: 引用列表
+            
+        Returns:
+            FrozenSet[int]: 引用编号集合
+        """
+        return frozenset(ref['id'] for ref in references)
+    
+    def extract_citations_from_text(self, text: str, references: List[Dict],
+                                    reference_index: Optional[FrozenSet[int]] = None) -> Tuple[str, List[int]]:
         """
         从文本中提取引用标记
         
         Args:
             text: 输入文本
             references: 引用列表
+            reference_index: 引用编号索引（None 时根据 references 构建）
             
         Returns:
             Tuple[str, List[int]]: (处理后的文本, 引用编号列表)
@@ -82,37 +133,45 @@ class CitationParser:
             citations = []
             processed_text = text
             
-            # 查找所有引用模式
-            for pattern in self.citation_patterns:
-                matches = re.finditer(pattern, text)
-                for match in matches:
-                    citation_str = match.group(1)
-                    
-                    # 解析引用编号
-                    if ',' in citation_str:
-                        # 多个引用：[1,2,3]
-                        citation_nums = [int(num.strip()) for num in citation_str.split(',')]
-                    else:
-                        # 单个引用：[1]
-                        citation_nums = [int(citation_str)]
-                    
-                    citations.extend(citation_nums)
-            
-            # 去重并排序
-            citations = sorted(list(set(citations)))
-            
-            # 验证引用编号是否存在于引用列表中
-            valid_citations = []
-            for cite_num in citations:
-                if any(ref['id'] == cite_num for ref in references):
-                    valid_citations.append(cite_num)
+            # 一次扫描查找所有引用标记
+            for _, _, citation_nums in iter_citation_spans(text):
+                citations.extend(citation_nums)
             
-            return processed_text, valid_citations
+            return processed_text, self.validate_citations(citations, references, reference_index)
             
         except Exception as e:
+            _EXTRACT_ERRORS.inc()
             logger.error(f"Error extracting citations from text: {str(e)}")
             return text, []
     
+    def validate_citations(self, citations: List[int], references: List[Dict],
+                           reference_index: Optional[FrozenSet[int]] = None) -> List[int]:
+        """
+        去重排序，并只保留存在于引用列表中的引用编号
+        
+        Args:
+            citations: 引用编号列表
+            references: 引用列表
+            reference_index: 引用编号索引（None 时根据 references 构建）
+            
+        Returns:
+            List[int]: 有效的引用编号
+        """
+        if not citations:
+            return []
+        
+        if reference_index is None:
+            reference_index = self.build_reference_index(references)
+        
+        # 去重、验证引用编号是否存在于引用列表中，并排序
+        unique_citations = set(citations)
+        valid_citations = sorted(reference_index.intersection(unique_citations))
+        
+        CITATIONS_CHECKED.inc(len(unique_citations))
+        if len(valid_citations) != len(unique_citations):
+            CITATIONS_DROPPED.inc(len(unique_citations) - len(valid_citations))
+        return valid_citations
+    
     def segment_text_with_citations(self, text: str, references: List[Dict]) -> List[Dict]:
         """
         将文本按引用分段
@@ -128,26 +187,16 @@ class CitationParser:
             segments = []
             current_pos = 0
             
-            # 查找所有引用位置
-            citation_positions = []
-            
-            for pattern in self.citation_patterns:
-                for match in re.finditer(pattern, text):
-                    citation_str = match.group(1)
-                    if ',' in citation_str:
-                        citation_nums = [int(num.strip()) for num in citation_str.split(',')]
-                    else:
-                        citation_nums = [int(citation_str)]
-                    
-                    citation_positions.append({
-                        'start': match.start(),
-                        'end': match.end(),
-                        'citations': citation_nums,
-                        'original': match.group(0)
-                    })
-            
-            # 按位置排序
-            citation_positions.sort(key=lambda x: x['start'])
+            # 查找所有引用位置（按出现顺序）
+            citation_positions = [
+                {
+                    'start': start,
+                    'end': end,
+                    'citations': citation_nums,
+                    'original': text[start:end]
+                }
+                for start, end, citation_nums in iter_citation_spans(text)
+            ]
             
             # 分段处理
             for i, citation_pos in enumerate(citation_positions):
@@ -167,7 +216,7 @@ class CitationParser:
                 # 添加带引用的文本段
                 segment_text = text[citation_pos['start']:sentence_end].strip()
                 # 移除引用标记
-                clean_text = re.sub(r'\^?\[\d+(?:,\s*\d+)*\]\^?', '', segment_text).strip()
+                clean_text = self.citation_pattern.sub('', segment_text).strip()
                 
                 if clean_text:
                     segments.append({
@@ -192,6 +241,7 @@ class CitationParser:
             return segments
             
         except Exception as e:
+            _SEGMENT_ERRORS.inc()
             logger.error(f"Error segmenting text with citations: {str(e)}")
             return [{'text': text, 'citations': [], 'type': 'content'}]
     
@@ -0,0 +1,202 @@
+"""
+流式引用标记分词器
+逐块消费模型输出的增量文本，跨块保留未完成的引用标记（如 "^[1" + "2]^"），
+一次线性扫描输出文本片段和引用片段
+"""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+# 识别的引用标记与 utils.citation_parser.CITATION_PATTERN 的最左优先匹配一致:
+#   ^[1]^、^[1]、[1,2,3]、[1]^、^1^
+_CANDIDATE_RE = re.compile(r'[\^\[]')
+
+# 未完成标记的最大保留长度，超过后按普通文本输出
+MAX_MARKER_LENGTH = 64
+
+# 匹配结果：需要更多输入
+_INCOMPLETE = object()
+
+def _scan_digits(text: str, pos: int) -> int:
+    """返回从 pos 开始的连续数字的结束位置"""
+    end = pos
+    length = len(text)
+    while end < length and text[end].isdecimal():
+        end += 1
+    return end
+
+def _match_bracket(text: str, pos: int, final: bool) -> Any:
+    """
+    匹配 [数字(,数字)*] 及可选的结尾 ^
+    
+    Args:
+        text: 缓冲文本
+        pos: '[' 的位置
+        final: 是否已到输入结尾
+        
+    Returns:
+        (结束位置, 引用编号列表)、None（不匹配）或 _INCOMPLETE
+    """
+    length = len(text)
+    numbers = []
+    cursor = pos + 1
+    
+    while True:
+        end = _scan_digits(text, cursor)
+        if end == length:
+            return None if final else _INCOMPLETE
+        if end == cursor:
+            return None
+        numbers.append(int(text[cursor:end]))
+        
+        if text[end] == ']':
+            cursor = end + 1
+            break
+        if text[end] != ',':
+            return None
+        
+        cursor = end + 1
+        while cursor < length and text[cursor].isspace():
+            cursor += 1
+    
+    if cursor == length:
+        return (cursor, numbers) if final else _INCOMPLETE
+    if text[cursor] == '^':
+        cursor += 1
+    return cursor, numbers
+
+def _match_caret(text: str, pos: int, final: bool) -> Any:
+    """匹配 ^数字^（pos 为第一个 '^' 的位置）"""
+    end = _scan_digits(text, pos + 1)
+    if end == len(text):
+        return None if final else _INCOMPLETE
+    if end == pos + 1 or text[end] != '^':
+        return None
+    return end + 1, [int(text[pos + 1:end])]
+
+def match_citation_at(text: str, pos: int, final: bool = True) -> Any:
+    """
+    在指定位置匹配引用标记（语义与 CITATION_PATTERN 的最左优先匹配一致）
+    
+    Args:
+        text: 文本
+        pos: 候选起始位置（'^' 或 '['）
+        final: 文本之后是否没有更多输入
+        
+    Returns:
+        (结束位置, 引用编号列表)、None（不匹配）或 _INCOMPLETE（需要更多输入）
+    """
+    if text[pos] == '[':
+        return _match_bracket(text, pos, final)
+    
+    # '^' 开头：先尝试 ^[...]，不匹配时再尝试 ^n^
+    if pos + 1 == len(text):
+        return None if final else _INCOMPLETE
+    if text[pos + 1] == '[':
+        result = _match_bracket(text, pos + 1, final)
+        if result is not None:
+            return result
+    return _match_caret(text, pos, final)
+
+class StreamingCitationTokenizer:
+    """
+    有状态的流式引用分词器（每个响应流一个实例，非线程安全）
+    
+    输出的片段按顺序拼接后与输入文本完全一致：
+        {'type': 'text', 'text': str}
+        {'type': 'citation', 'text': str, 'citations': List[int]}
+    """
+    
+    def __init__(self, max_marker_length: int = MAX_MARKER_LENGTH):
+        """
+        初始化分词器
+        
+        Args:
+            max_marker_length: 未完成标记的最大保留长度
+        """
+        self.max_marker_length = max_marker_length
+        self._pending = ''
+    
+    @property
+    def pending(self) -> str:
+        """尚未输出的文本（可能是未完成的引用标记）"""
+        return self._pending
+    
+    def feed(self, delta: str) -> List[Dict[str, Any]]:
+        """
+        消费一段增量文本
+        
+        Args:
+            delta: 增量文本
+            
+        Returns:
+            List[Dict]: 可以确定的文本片段和引用片段
+        """
+        return self._tokenize(self._pending + delta, final=False)
+    
+    def flush(self) -> List[Dict[str, Any]]:
+        """
+        输入结束，输出所有剩余文本
+        
+        Returns:
+            List[Dict]: 剩余的文本片段和引用片段
+        """
+        return self._tokenize(self._pending, final=True)
+    
+    def _tokenize(self, text: str, final: bool) -> List[Dict[str, Any]]:
+        """扫描缓冲文本，未完成的标记留到下一次输入"""
+        tokens = []
+        text_start = 0
+        cursor = 0
+        self._pending = ''
+        
+        while True:
+            candidate = _CANDIDATE_RE.search(text, cursor)
+            if candidate is None:
+                break
+            
+            start = candidate.start()
+            result = match_citation_at(text, start, final)
+            
+            if result is _INCOMPLETE:
+                if len(text) - start < self.max_marker_length:
+                    self._pending = text[start:]
+                    text = text[:start]
+                    break
+                # 过长的未完成标记按普通文本处理
+                result = None
+            
+            if result is None:
+                cursor = start + 1
+                continue
+            
+            end, numbers = result
+            if start > text_start:
+                tokens.append({'type': 'text', 'text': text[text_start:start]})
+            tokens.append({'type': 'citation', 'text': text[start:end], 'citations': numbers})
+            text_start = cursor = end
+        
+        if text_start < len(text):
+            tokens.append({'type': 'text', 'text': text[text_start:]})
+        return tokens
+
+def join_tokens(tokens: List[Dict[str, Any]]) -> Tuple[str, List[int]]:
+    """
+    合并片段
+    
+    Args:
+        tokens: 分词器输出的片段
+        
+    Returns:
+        Tuple[str, List[int]]: (拼接后的文本, 按出现顺序的引用编号)
+    """
+    if len(tokens) == 1 and tokens[0]['type'] == 'text':
+        return tokens[0]['text'], []
+    
+    parts = []
+    citations = []
+    for token in tokens:
+        parts.append(token['text'])
+        if token['type'] == 'citation':
+            citations.extend(token['citations'])
+    return ''.join(parts), citations
@@ -0,0 +1,210 @@
+"""
+医学术语词典（中文 -> 英文）
+词典文件为按中文术语（UTF-8 字节序）排序的字符串表：两组偏移数组 + 两段 UTF-8 数据，
+加载时只做内存映射，查询用二分查找，不在内存中为每个词条创建 Python 对象。
+多个工作进程映射同一个文件时共享物理内存页
+
+用法:
+    python -m utils.glossary terms.tsv medical_terms.oeg
+    （TSV 每行为 "中文术语<TAB>英文1|英文2"；也可以是 {"中文术语": ["英文1", ...]} 格式的 JSON）
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'OEGLS1\n'
+
+# 同一术语的多个英文译名之间的分隔符
+_SEPARATOR = '\x1f'
+
+# 数据区按 8 字节对齐
+_ALIGNMENT = 8
+
+def read_entries(path: str) -> Iterator[Tuple[str, List[str]]]:
+    """
+    读取词典源文件（.json 或 TSV）
+    
+    Args:
+        path: 文件路径
+        
+    Yields:
+        Tuple[str, List[str]]: (中文术语, 英文译名)
+    """
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f).items()
+        return
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line or line.startswith('#'):
+                continue
+            term, _, english = line.partition('\t')
+            yield term.strip(), [name.strip() for name in english.split('|') if name.strip()]
+
+def write_glossary(entries: Iterable[Tuple[str, Sequence[str]]], path: str) -> int:
+    """
+    写入词典文件（先写临时文件再原子替换）
+    
+    Args:
+        entries: (中文术语, 英文译名) 序列，重复的术语合并译名
+        path: 输出文件路径
+        
+    Returns:
+        int: 词条数
+    """
+    merged: Dict[str, List[str]] = {}
+    for term, english in entries:
+        if not term:
+            continue
+        names = merged.setdefault(term, [])
+        for name in english:
+            if _SEPARATOR in name:
+                raise ValueError(f"English name contains a separator character: {name!r}")
+            if name not in names:
+                names.append(name)
+    
+    encoded = sorted((term.encode('utf-8'), _SEPARATOR.join(names).encode('utf-8'))
+                     for term, names in merged.items())
+    term_offsets = array('I', [0])
+    english_offsets = array('I', [0])
+    for term, english in encoded:
+        term_offsets.append(term_offsets[-1] + len(term))
+        english_offsets.append(english_offsets[-1] + len(english))
+    
+    header = json.dumps({
+        'byteorder': sys.byteorder,
+        'count': len(encoded),
+        'term_bytes': term_offsets[-1],
+        'english_bytes': english_offsets[-1]
+    }).encode('utf-8')
+    # 头部用空格补齐，使偏移数组从对齐的位置开始
+    padding = -(len(_MAGIC) + len(header) + 1) % _ALIGNMENT
+    
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(header + b' ' * padding + b'\n')
+        term_offsets.tofile(f)
+        english_offsets.tofile(f)
+        for term, _ in encoded:
+            f.write(term)
+        for _, english in encoded:
+            f.write(english)
+    os.replace(tmp_path, path)
+    return len(encoded)
+
+class Glossary(Mapping):
+    """
+    内存映射的只读术语词典（线程安全）
+    
+    行为与 Dict[str, List[str]] 相同，按中文术语的 UTF-8 字节序迭代
+    """
+    
+    def __init__(self, path: str):
+        """
+        打开词典文件（只做内存映射，词条在查询时按需读取）
+        
+        Args:
+            path: write_glossary 写入的文件路径
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        data = self._mmap
+        if data[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"Not a glossary file: {path}")
+        header_end = data.find(b'\n', len(_MAGIC)) + 1
+        header = json.loads(data[len(_MAGIC):header_end])
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f"Glossary was written with {header['byteorder']}-endian offsets, rebuild it: {path}")
+        
+        count = self._count = header['count']
+        offsets_bytes = 4 * (count + 1)
+        view = memoryview(data)
+        self._term_offsets = view[header_end:header_end + offsets_bytes].cast('I')
+        self._english_offsets = view[header_end + offsets_bytes:header_end + 2 * offsets_bytes].cast('I')
+        self._term_base = header_end + 2 * offsets_bytes
+        self._english_base = self._term_base + header['term_bytes']
+        
+        logger.info(f"Glossary mapped ({count} terms, {len(data)} bytes): {path}")
+    
+    def _term_bytes(self, index: int) -> bytes:
+        base = self._term_base
+        return self._mmap[base + self._term_offsets[index]:base + self._term_offsets[index + 1]]
+    
+    def _english(self, index: int) -> List[str]:
+        base = self._english_base
+        raw = self._mmap[base + self._english_offsets[index]:base + self._english_offsets[index + 1]]
+        return raw.decode('utf-8').split(_SEPARATOR) if raw else []
+    
+    def _find(self, term: str) -> int:
+        """二分查找术语的下标（不存在时返回 -1）"""
+        key = term.encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._term_bytes(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._term_bytes(low) == key:
+            return low
+        return -1
+    
+    def __getitem__(self, term: str) -> List[str]:
+        index = self._find(term) if isinstance(term, str) else -1
+        if index < 0:
+            raise KeyError(term)
+        return self._english(index)
+    
+    def __contains__(self, term: object) -> bool:
+        return isinstance(term, str) and self._find(term) >= 0
+    
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._count):
+            yield self._term_bytes(index).decode('utf-8')
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def lookup(self, term: str) -> Optional[List[str]]:
+        """
+        查询中文术语的英文译名
+        
+        Args:
+            term: 中文术语
+            
+        Returns:
+            Optional[List[str]]: 英文译名（不存在时为 None）
+        """
+        index = self._find(term)
+        return self._english(index) if index >= 0 else None
+    
+    @property
+    def size_bytes(self) -> int:
+        """文件大小"""
+        return len(self._mmap)
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a memory-mapped medical glossary from TSV or JSON')
+    parser.add_argument('source', help='TSV (term<TAB>english1|english2) or .json ({term: [english, ...]})')
+    parser.add_argument('output', help='glossary file to write')
+    args = parser.parse_args()
+    
+    count = write_glossary(read_entries(args.source), args.output)
+    print(f"Wrote {count} terms to {args.output} ({os.path.getsize(args.output)} bytes)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,472 @@
+"""
+指标注册表
+内置 Counter / Gauge / Histogram（固定分桶），以 Prometheus 文本格式导出（/metrics）。
+
+多进程部署（gunicorn 多个工作进程）时设置快照目录：每个进程定期把自己的指标写入
+<目录>/metrics_<pid>.json，导出时合并所有进程的快照——计数器和直方图求和
+（已退出进程的计数保留），仪表只合并仍在运行的进程（按 multiprocess_mode 求和或取最大/最小值）
+"""
+
+import os
+import json
+import glob
+import atexit
+import logging
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认直方图分桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+GAUGE_MULTIPROCESS_MODES = ('sum', 'max', 'min')
+
+class _ValueChild:
+    """单个标签组合的计数器 / 仪表值"""
+    
+    __slots__ = ('_value', '_lock')
+    
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0) -> None:
+        """增加"""
+        with self._lock:
+            self._value += amount
+    
+    def dec(self, amount: float = 1.0) -> None:
+        """减少（仅仪表）"""
+        with self._lock:
+            self._value -= amount
+    
+    def set(self, value: float) -> None:
+        """设置（仅仪表）"""
+        with self._lock:
+            self._value = float(value)
+    
+    @property
+    def value(self) -> float:
+        return self._value
+    
+    def snapshot(self) -> float:
+        return self._value
+    
+    def reset(self) -> None:
+        """清零（fork 后的子进程使用，同时重建锁）"""
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+class _HistogramChild:
+    """单个标签组合的直方图"""
+    
+    __slots__ = ('_bounds', '_counts', '_sum', '_lock')
+    
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float) -> None:
+        """记录一次观测值"""
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'counts': list(self._counts), 'sum': self._sum}
+    
+    def reset(self) -> None:
+        """清零（fork 后的子进程使用，同时重建锁）"""
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+
+class Metric:
+    """指标基类：按标签值缓存子指标，调用方可预先绑定 labels() 的结果以降低开销"""
+    
+    type_name = ''
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        初始化指标
+        
+        Args:
+            name: 指标名称
+            documentation: 说明
+            labelnames: 标签名称
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        self._default = None if self.labelnames else self.labels()
+    
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+    
+    def labels(self, *values: Any, **labels: Any) -> Any:
+        """
+        获取标签组合对应的子指标
+        
+        Args:
+            *values: 按 labelnames 顺序的标签值
+            **labels: 标签名 -> 标签值
+            
+        Returns:
+            子指标
+        """
+        if labels:
+            key = tuple(str(labels[name]) for name in self.labelnames)
+        else:
+            key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}")
+        
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+    
+    def samples(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        """当前进程的所有 (标签值, 快照)"""
+        with self._lock:
+            children = list(self._children.items())
+        return [(key, child.snapshot()) for key, child in children]
+    
+    def describe(self) -> Dict[str, Any]:
+        """快照中的指标描述"""
+        return {'type': self.type_name, 'help': self.documentation, 'labelnames': list(self.labelnames)}
+    
+    def reset(self) -> None:
+        """清零所有子指标（保留已绑定的子指标对象）"""
+        self._lock = threading.Lock()
+        for child in self._children.values():
+            child.reset()
+
+class Counter(Metric):
+    """单调递增计数器"""
+    
+    type_name = 'counter'
+    
+    def _new_child(self) -> _ValueChild:
+        return _ValueChild()
+    
+    def inc(self, amount: float = 1.0) -> None:
+        """增加（无标签指标）"""
+        self._default.inc(amount)
+
+class Gauge(Metric):
+    """仪表（可增可减）"""
+    
+    type_name = 'gauge'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 multiprocess_mode: str = 'sum'):
+        """
+        初始化仪表
+        
+        Args:
+            name: 指标名称
+            documentation: 说明
+            labelnames: 标签名称
+            multiprocess_mode: 多进程合并方式（sum / max / min）
+        """
+        if multiprocess_mode not in GAUGE_MULTIPROCESS_MODES:
+            raise ValueError(f"Unknown gauge multiprocess mode: {multiprocess_mode}")
+        self.multiprocess_mode = multiprocess_mode
+        super().__init__(name, documentation, labelnames)
+    
+    def _new_child(self) -> _ValueChild:
+        return _ValueChild()
+    
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+    
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+    
+    def set(self, value: float) -> None:
+        self._default.set(value)
+    
+    def describe(self) -> Dict[str, Any]:
+        description = super().describe()
+        description['mode'] = self.multiprocess_mode
+        return description
+
+class Histogram(Metric):
+    """固定分桶直方图"""
+    
+    type_name = 'histogram'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        初始化直方图
+        
+        Args:
+            name: 指标名称
+            documentation: 说明
+            labelnames: 标签名称
+            buckets: 递增的分桶上界，最后隐含 +Inf 分桶
+        """
+        self.buckets = tuple(float(bound) for bound in buckets)
+        super().__init__(name, documentation, labelnames)
+    
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+    
+    def observe(self, value: float) -> None:
+        """记录一次观测值（无标签指标）"""
+        self._default.observe(value)
+    
+    def describe(self) -> Dict[str, Any]:
+        description = super().describe()
+        description['buckets'] = list(self.buckets)
+        return description
+
+class MetricsRegistry:
+    """指标注册表（同名指标重复注册时返回已有指标，便于各模块各自声明共用的指标）"""
+    
+    def __init__(self):
+        """初始化注册表"""
+        self._metrics: 'OrderedDict[str, Metric]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.multiprocess_dir: Optional[str] = None
+        self.snapshot_interval = 5.0
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+    
+    def _register(self, metric_class: type, name: str, documentation: str,
+                  labelnames: Sequence[str], **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif type(metric) is not metric_class or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered with a different type or labels")
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """注册（或获取）计数器"""
+        return self._register(Counter, name, documentation, labelnames)
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              multiprocess_mode: str = 'sum') -> Gauge:
+        """注册（或获取）仪表"""
+        return self._register(Gauge, name, documentation, labelnames, multiprocess_mode=multiprocess_mode)
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """注册（或获取）直方图"""
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+    
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """
+        当前进程的指标快照
+        
+        Returns:
+            Dict: 指标名称 -> 描述及 samples（[标签值列表, 值]）
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        
+        snapshot = OrderedDict()
+        for metric in metrics:
+            entry = metric.describe()
+            entry['samples'] = [[list(key), value] for key, value in metric.samples()]
+            snapshot[metric.name] = entry
+        return snapshot
+    
+    def reset(self) -> None:
+        """清零所有指标"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+    
+    def enable_multiprocess(self, directory: str, interval: float = 5.0) -> None:
+        """
+        启用多进程模式：后台线程定期写入本进程快照，导出时合并目录中所有进程的快照
+        
+        Args:
+            directory: 快照目录（所有工作进程共享，服务启动前应清空）
+            interval: 写入快照的间隔（秒）
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.multiprocess_dir = directory
+        self.snapshot_interval = interval
+        self._start_snapshot_thread()
+        atexit.register(self.write_snapshot)
+        
+        # 预加载应用后 fork 出的工作进程：清零继承的指标（已计入父进程快照）并重启快照线程
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+        
+        logger.info(f"Metrics multiprocess mode enabled (directory: {directory})")
+    
+    def _start_snapshot_thread(self) -> None:
+        self._stop_event = threading.Event()
+        self._snapshot_thread = threading.Thread(
+            target=self._run_snapshots, name='metrics-snapshot', daemon=True
+        )
+        self._snapshot_thread.start()
+    
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+        self._start_snapshot_thread()
+    
+    def _run_snapshots(self) -> None:
+        while not self._stop_event.wait(self.snapshot_interval):
+            self.write_snapshot()
+    
+    def write_snapshot(self) -> None:
+        """将本进程的指标写入快照文件（先写临时文件再原子替换）"""
+        if not self.multiprocess_dir:
+            return
+        
+        try:
+            path = os.path.join(self.multiprocess_dir, f"metrics_{os.getpid()}.json")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.collect(), f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error writing metrics snapshot: {str(e)}")
+    
+    def _load_snapshots(self) -> List[Tuple[bool, Dict[str, Any]]]:
+        """读取目录中所有进程的快照：[(进程是否仍在运行, 快照)]"""
+        # 先写入本进程的最新值
+        self.write_snapshot()
+        
+        snapshots = []
+        for path in glob.glob(os.path.join(self.multiprocess_dir, 'metrics_*.json')):
+            try:
+                pid = int(os.path.basename(path)[len('metrics_'):-len('.json')])
+                with open(path, 'r', encoding='utf-8') as f:
+                    snapshots.append((_pid_alive(pid), json.load(f)))
+            except Exception as e:
+                logger.error(f"Error reading metrics snapshot {path}: {str(e)}")
+        return snapshots
+    
+    def merged(self) -> Dict[str, Dict[str, Any]]:
+        """
+        合并后的指标（未启用多进程模式时即本进程快照）
+        
+        Returns:
+            Dict: 指标名称 -> 描述及 samples
+        """
+        if not self.multiprocess_dir:
+            return self.collect()
+        
+        merged: Dict[str, Dict[str, Any]] = OrderedDict()
+        values: Dict[str, Dict[Tuple[str, ...], Any]] = {}
+        for alive, snapshot in self._load_snapshots():
+            for name, entry in snapshot.items():
+                if name not in merged:
+                    merged[name] = {key: value for key, value in entry.items() if key != 'samples'}
+                    values[name] = OrderedDict()
+                if entry['type'] == 'gauge' and not alive:
+                    continue
+                
+                metric_values = values[name]
+                for labels, value in entry['samples']:
+                    key = tuple(labels)
+                    metric_values[key] = _merge_value(entry, metric_values.get(key), value)
+        
+        for name, entry in merged.items():
+            entry['samples'] = [[list(key), value] for key, value in values[name].items()]
+        return merged
+    
+    def render(self) -> str:
+        """
+        导出 Prometheus 文本格式
+        
+        Returns:
+            str: 指标文本
+        """
+        lines = []
+        for name, entry in self.merged().items():
+            lines.append(f"# HELP {name} {_escape_help(entry['help'])}")
+            lines.append(f"# TYPE {name} {entry['type']}")
+            labelnames = entry['labelnames']
+            
+            for labels, value in entry['samples']:
+                pairs = list(zip(labelnames, labels))
+                if entry['type'] != 'histogram':
+                    lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+                    continue
+                
+                cumulative = 0
+                bounds = entry['buckets'] + [float('inf')]
+                for bound, count in zip(bounds, value['counts']):
+                    cumulative += count
+                    bucket_labels = _format_labels(pairs + [('le', _format_value(bound))])
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(value['sum'])}")
+                lines.append(f"{name}_count{_format_labels(pairs)} {cumulative}")
+        
+        return '\n'.join(lines) + '\n'
+
+def _merge_value(entry: Dict[str, Any], current: Any, value: Any) -> Any:
+    """合并两个进程的同一标签组合的值"""
+    if current is None:
+        return value
+    if entry['type'] == 'histogram':
+        return {
+            'counts': [a + b for a, b in zip(current['counts'], value['counts'])],
+            'sum': current['sum'] + value['sum']
+        }
+    if entry['type'] == 'gauge' and entry.get('mode') == 'max':
+        return max(current, value)
+    if entry['type'] == 'gauge' and entry.get('mode') == 'min':
+        return min(current, value)
+    return current + value
+
+def _pid_alive(pid: int) -> bool:
+    """进程是否仍在运行"""
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _escape_help(text: str) -> str:
+    return text.replace('\\', r'\\').replace('\n', r'\n')
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+def _format_labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    return repr(float(value))
+
+# 进程内默认注册表
+REGISTRY = MetricsRegistry()
+
+# 各处理阶段共用的错误计数器（按 stage 标签区分）
+STAGE_ERRORS = REGISTRY.counter('openevidence_stage_errors_total', 'Errors by pipeline stage', ('stage',))
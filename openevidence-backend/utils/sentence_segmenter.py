@@ -0,0 +1,187 @@
+"""
+句子切分
+一次线性扫描：用预编译的正则定位句末标点，按下标切片输出句子，不逐字符拼接字符串。
+缩写（Dr. / etc. / e.g. 等）中的点和数字中的小数点不作为句末。
+流式切分器随增量文本输出已完成的句子，结果与整段切分一致
+"""
+
+import re
+from typing import List, Optional, Sequence, Set, Tuple
+
+# 句末标点
+SENTENCE_DELIMITERS = ('。', '！', '？', '.', '!', '?')
+
+# 不作为句末的缩写（区分大小写）
+ABBREVIATIONS = ('Dr.', 'Prof.', 'etc.', 'vs.', 'e.g.', 'i.e.')
+
+# 去除首尾空白后短于该长度的片段不单独成句
+MIN_SENTENCE_LENGTH = 3
+
+_NON_SPACE_RE = re.compile(r'\S')
+
+class SentenceSegmenter:
+    """无状态的句子切分器（线程安全）"""
+    
+    def __init__(self, delimiters: Sequence[str] = SENTENCE_DELIMITERS,
+                 abbreviations: Sequence[str] = ABBREVIATIONS,
+                 min_length: int = MIN_SENTENCE_LENGTH):
+        """
+        初始化切分器
+        
+        Args:
+            delimiters: 句末标点
+            abbreviations: 不作为句末的缩写
+            min_length: 句子的最小长度
+        """
+        self.min_length = min_length
+        self._delimiter_re = re.compile('[' + ''.join(re.escape(d) for d in delimiters) + ']')
+        
+        # 缩写中的每个句末标点生成一个分支：标点本身 + 前文后顾 + 后文前瞻（如 e.g. 的第一个点为
+        # \.(?<=e\.)(?=g\.)），与小数点一起编译为一个正则，一次扫描找出所有不作为句末的标点
+        anchors = [
+            (abbreviation, offset)
+            for abbreviation in abbreviations
+            for offset, char in enumerate(abbreviation) if char in delimiters
+        ]
+        alternatives = [
+            re.escape(abbreviation[offset])
+            + '(?<=' + re.escape(abbreviation[:offset + 1]) + ')'
+            + ('(?=' + re.escape(abbreviation[offset + 1:]) + ')' if offset + 1 < len(abbreviation) else '')
+            for abbreviation, offset in anchors
+        ]
+        alternatives.append(r'\.(?<=\d\.)(?=\d)')
+        self._protected_re = re.compile('|'.join(alternatives))
+        
+        # 判断一个标点是否为句末需要的前文和后文长度（小数点需要前后各一个字符）
+        self.lookbehind = max([offset for _, offset in anchors] + [1])
+        self.lookahead = max([len(abbreviation) - 1 - offset for abbreviation, offset in anchors] + [1])
+    
+    def protected_positions(self, text: str, pos: int = 0) -> Set[int]:
+        """
+        查找不作为句末的标点位置（缩写中的标点、小数点）
+        
+        Args:
+            text: 文本
+            pos: 开始查找的位置
+            
+        Returns:
+            Set[int]: 标点位置
+        """
+        return {match.start() for match in self._protected_re.finditer(text, pos)}
+    
+    def scan(self, text: str, start: int, pos: int, final: bool) -> Tuple[List[str], int, int]:
+        """
+        从 pos 开始查找句子边界
+        
+        Args:
+            text: 文本
+            start: 当前句子的起点
+            pos: 开始查找句末标点的位置
+            final: 是否已到输入结尾（否则只判断后文足够的标点）
+            
+        Returns:
+            Tuple: (完成的句子, 下一个句子的起点, 下次开始查找的位置)
+        """
+        sentences = []
+        limit = max(len(text) if final else len(text) - self.lookahead, pos)
+        # 大多数增量文本不含句末标点
+        if self._delimiter_re.search(text, pos, limit) is None:
+            return sentences, start, limit
+        protected = self.protected_positions(text, max(pos - self.lookbehind, 0))
+        
+        for match in self._delimiter_re.finditer(text, pos, limit):
+            end = match.end()
+            if match.start() in protected:
+                continue
+            # 跳过句首空白（句末是标点，不需要处理结尾空白）
+            start = _NON_SPACE_RE.search(text, start).start()
+            if end - start < self.min_length:
+                continue
+            sentences.append(text[start:end])
+            start = end
+        
+        return sentences, start, limit
+    
+    def split(self, text: str) -> List[str]:
+        """
+        切分整段文本
+        
+        Args:
+            text: 输入文本
+            
+        Returns:
+            List[str]: 句子列表（已去除首尾空白）
+        """
+        sentences, start, _ = self.scan(text, 0, 0, final=True)
+        rest = text[start:].strip()
+        if rest:
+            sentences.append(rest)
+        return sentences
+
+_default_segmenter = SentenceSegmenter()
+
+def split_sentences(text: str) -> List[str]:
+    """使用默认规则切分句子"""
+    return _default_segmenter.split(text)
+
+class StreamingSentenceSegmenter:
+    """
+    有状态的流式句子切分器（每个响应流一个实例，非线程安全）
+    
+    依次输出的句子与对完整文本调用 SentenceSegmenter.split 的结果一致
+    """
+    
+    def __init__(self, segmenter: Optional[SentenceSegmenter] = None):
+        """
+        初始化切分器
+        
+        Args:
+            segmenter: 切分规则（默认使用标准规则）
+        """
+        self.segmenter = segmenter or _default_segmenter
+        self._buffer = ''
+        self._start = 0
+        self._pos = 0
+    
+    @property
+    def pending(self) -> str:
+        """尚未成句的文本"""
+        return self._buffer[self._start:]
+    
+    def feed(self, delta: str) -> List[str]:
+        """
+        消费一段增量文本
+        
+        Args:
+            delta: 增量文本
+            
+        Returns:
+            List[str]: 已完成的句子
+        """
+        self._buffer += delta
+        sentences, self._start, self._pos = self.segmenter.scan(
+            self._buffer, self._start, self._pos, final=False
+        )
+        
+        # 丢弃已输出的句子，只保留判断缩写所需的前文
+        drop = self._start - self.segmenter.lookbehind
+        if drop > 0:
+            self._buffer = self._buffer[drop:]
+            self._start -= drop
+            self._pos -= drop
+        return sentences
+    
+    def flush(self) -> List[str]:
+        """
+        输入结束，输出剩余的句子
+        
+        Returns:
+            List[str]: 剩余的句子
+        """
+        sentences, start, _ = self.segmenter.scan(self._buffer, self._start, self._pos, final=True)
+        rest = self._buffer[start:].strip()
+        if rest:
+            sentences.append(rest)
+        self._buffer = ''
+        self._start = self._pos = 0
+        return sentences
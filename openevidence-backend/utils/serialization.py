@@ -0,0 +1,115 @@
+"""
+JSON 序列化
+SSE 数据帧的序列化层：安装了 orjson 时使用 orjson，否则使用标准库 json，
+均输出紧凑的 UTF-8 字节（中文不转义为 \\uXXXX）。
+事件时间戳按固定精度缓存，同一时间片内的事件共用一个格式化结果
+"""
+
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    """标准库 json 序列化"""
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _orjson_dumps(obj: Any) -> bytes:
+    """orjson 序列化（orjson 不支持的值，如超过 64 位的整数，交给标准库）"""
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return _stdlib_dumps(obj)
+
+# 可用的序列化器：名称 -> 函数（对象 -> UTF-8 字节）
+SERIALIZERS: Dict[str, Callable[[Any], bytes]] = {'json': _stdlib_dumps}
+if orjson is not None:
+    SERIALIZERS['orjson'] = _orjson_dumps
+
+_backend = 'orjson' if orjson is not None else 'json'
+_dumps = SERIALIZERS[_backend]
+
+def configure_serializer(name: str = 'auto') -> str:
+    """
+    选择序列化器
+    
+    Args:
+        name: auto（有 orjson 时使用 orjson）/ orjson / json
+        
+    Returns:
+        str: 实际使用的序列化器名称（指定的序列化器不可用时回退到 json）
+    """
+    global _backend, _dumps
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+    if name not in SERIALIZERS:
+        logger.warning(f"JSON serializer '{name}' is not available, falling back to json")
+        name = 'json'
+    _backend, _dumps = name, SERIALIZERS[name]
+    return name
+
+def serializer_name() -> str:
+    """当前使用的序列化器名称"""
+    return _backend
+
+def dumps(obj: Any) -> bytes:
+    """
+    序列化为 UTF-8 JSON 字节
+    
+    Args:
+        obj: 可序列化的对象
+        
+    Returns:
+        bytes: 紧凑的 JSON
+    """
+    return _dumps(obj)
+
+class CoarseClock:
+    """按固定精度缓存的本地时间 ISO 字符串（线程安全：缓存为不可变元组，整体替换）"""
+    
+    def __init__(self, resolution: float = 0.01):
+        """
+        初始化
+        
+        Args:
+            resolution: 时间精度（秒），同一时间片内返回相同的时间戳
+        """
+        self.resolution = resolution
+        self._cached: Tuple[int, str] = (-1, '')
+    
+    def isoformat(self) -> str:
+        """当前时间片起点的 ISO 格式时间（精确到毫秒）"""
+        now = time.time()
+        if self.resolution <= 0:
+            return datetime.fromtimestamp(now).isoformat(timespec='milliseconds')
+        
+        slot = int(now / self.resolution)
+        cached_slot, text = self._cached
+        if slot != cached_slot:
+            text = datetime.fromtimestamp(slot * self.resolution).isoformat(timespec='milliseconds')
+            self._cached = (slot, text)
+        return text
+
+_clock = CoarseClock()
+
+def configure_timestamps(resolution: float) -> None:
+    """
+    设置事件时间戳精度
+    
+    Args:
+        resolution: 时间精度（秒），0 表示每次读取当前时间
+    """
+    global _clock
+    _clock = CoarseClock(resolution)
+
+def timestamp() -> str:
+    """事件时间戳（ISO 格式，按配置的精度缓存）"""
+    return _clock.isoformat()
@@ -0,0 +1,347 @@
+"""
+多词条匹配（Aho–Corasick 自动机）
+启动时构建一次，一次扫描找出文本中所有词条的出现位置（包括重叠和嵌套的匹配），
+耗时与词条数量无关。英文按 ASCII 忽略大小写，并要求在单词边界处匹配。
+自动机可以保存为紧凑的二进制文件（数组直接写盘），加载时不需要重新构建。
+流式匹配器随增量文本输出匹配（包括跨块的匹配），结果与整段匹配一致
+"""
+
+import json
+import logging
+import sys
+from array import array
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b'OEACM1\n'
+
+# 状态转移表的键：状态 << 21 | 字符码位（码位小于 2**21）
+_CODEPOINT_BITS = 21
+
+# 只转换 ASCII 大写字母，保持文本长度和下标不变
+_ASCII_LOWER = {code: code + 32 for code in range(ord('A'), ord('Z') + 1)}
+
+def _is_ascii_word_char(char: str) -> bool:
+    """ASCII 字母或数字"""
+    return char.isascii() and char.isalnum()
+
+class TermMatcher:
+    """只读的多词条匹配器（构建后线程安全）"""
+    
+    def __init__(self, terms: Iterable[str] = (), ignore_case: bool = True, word_boundaries: bool = True):
+        """
+        构建自动机
+        
+        Args:
+            terms: 词条（词条编号为首次出现的顺序，忽略大小写后重复的词条只保留第一个）
+            ignore_case: 英文是否忽略大小写（只转换 ASCII 字母）
+            word_boundaries: 以 ASCII 字母或数字开头 / 结尾的词条是否要求前 / 后不是 ASCII 字母或数字
+        """
+        self.ignore_case = ignore_case
+        self.word_boundaries = word_boundaries
+        self.terms: List[str] = []
+        
+        # 状态 0 为根
+        self._goto: Dict[int, int] = {}
+        self._fail = array('I', [0])
+        # 在该状态结束的词条编号（-1 表示没有）
+        self._term_at = array('i', [-1])
+        # 第一个输出状态：自身有词条时为自身，否则为失败链上最近的有词条的状态（0 表示没有）
+        self._first_output = array('I', [0])
+        # 失败链上下一个有词条的状态
+        self._next_output = array('I', [0])
+        self._term_length = array('I')
+        
+        self._build(terms)
+    
+    def _normalize(self, text: str) -> str:
+        return text.translate(_ASCII_LOWER) if self.ignore_case else text
+    
+    def _build(self, terms: Iterable[str]) -> None:
+        """插入词条并用广度优先计算失败链接和输出链接"""
+        goto = self._goto
+        term_at = self._term_at
+        children: List[List[Tuple[int, int]]] = [[]]
+        
+        for term in terms:
+            if not term:
+                continue
+            state = 0
+            for char in self._normalize(term):
+                key = state << _CODEPOINT_BITS | ord(char)
+                next_state = goto.get(key)
+                if next_state is None:
+                    next_state = len(term_at)
+                    goto[key] = next_state
+                    term_at.append(-1)
+                    children.append([])
+                    children[state].append((ord(char), next_state))
+                state = next_state
+            if term_at[state] == -1:
+                term_at[state] = len(self.terms)
+                self.terms.append(term)
+                self._term_length.append(len(term))
+        
+        count = len(term_at)
+        fail = self._fail = array('I', bytes(4 * count))
+        first_output = self._first_output = array('I', bytes(4 * count))
+        next_output = self._next_output = array('I', bytes(4 * count))
+        
+        queue = deque()
+        for _, child in children[0]:
+            queue.append(child)
+            if term_at[child] >= 0:
+                first_output[child] = child
+        
+        while queue:
+            state = queue.popleft()
+            for code, child in children[state]:
+                queue.append(child)
+                # 沿父状态的失败链查找最长的可转移后缀
+                fallback = fail[state]
+                while True:
+                    target = goto.get(fallback << _CODEPOINT_BITS | code)
+                    if target is not None:
+                        fail[child] = target
+                        break
+                    if fallback == 0:
+                        break
+                    fallback = fail[fallback]
+                next_output[child] = first_output[fail[child]]
+                first_output[child] = child if term_at[child] >= 0 else next_output[child]
+        
+        logger.info(f"Term matcher built ({len(self.terms)} terms, {count} states)")
+    
+    def __len__(self) -> int:
+        return len(self.terms)
+    
+    @property
+    def state_count(self) -> int:
+        """自动机状态数"""
+        return len(self._term_at)
+    
+    @property
+    def max_term_length(self) -> int:
+        """最长词条的长度"""
+        return max(self._term_length, default=0)
+    
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        一次扫描查找所有匹配（包括重叠和嵌套的匹配）
+        
+        Args:
+            text: 输入文本
+            
+        Yields:
+            Tuple[int, int, int]: (开始位置, 结束位置, 词条编号)，按结束位置排序，
+            同一结束位置的长词条在前
+        """
+        term_length = self._term_length
+        check_boundaries = self.word_boundaries
+        matches, _ = self._advance(self._normalize(text), 0)
+        
+        for end, term_id in matches:
+            start = end - term_length[term_id]
+            if not check_boundaries or self._at_boundaries(text, start, end):
+                yield start, end, term_id
+    
+    def _advance(self, normalized: str, state: int) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        从 state 开始消费已归一化的文本（不检查单词边界）
+        
+        Args:
+            normalized: 已归一化的文本
+            state: 开始状态
+            
+        Returns:
+            Tuple: ([(结束位置, 词条编号)], 结束状态)
+        """
+        goto = self._goto
+        fail = self._fail
+        term_at = self._term_at
+        first_output = self._first_output
+        next_output = self._next_output
+        matches = []
+        
+        for index, char in enumerate(normalized):
+            code = ord(char)
+            while True:
+                next_state = goto.get(state << _CODEPOINT_BITS | code)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            
+            output = first_output[state]
+            while output:
+                matches.append((index + 1, term_at[output]))
+                output = next_output[output]
+        
+        return matches, state
+    
+    def _at_boundaries(self, text: str, start: int, end: int) -> bool:
+        """以 ASCII 字母数字开头 / 结尾的匹配不能紧邻 ASCII 字母数字"""
+        if start > 0 and _is_ascii_word_char(text[start]) and _is_ascii_word_char(text[start - 1]):
+            return False
+        if end < len(text) and _is_ascii_word_char(text[end - 1]) and _is_ascii_word_char(text[end]):
+            return False
+        return True
+    
+    def find_all(self, text: str) -> Dict[int, List[int]]:
+        """
+        按词条汇总匹配的开始位置
+        
+        Args:
+            text: 输入文本
+            
+        Returns:
+            Dict[int, List[int]]: 词条编号 -> 开始位置（升序）
+        """
+        positions: Dict[int, List[int]] = {}
+        for start, _, term_id in self.iter_matches(text):
+            positions.setdefault(term_id, []).append(start)
+        return positions
+    
+    def save(self, path: str) -> None:
+        """
+        保存为二进制文件（头部 JSON + 各数组的原始字节 + UTF-8 词条）
+        
+        Args:
+            path: 文件路径
+        """
+        keys = array('Q', self._goto.keys())
+        values = array('I', self._goto.values())
+        terms = '\0'.join(self.terms).encode('utf-8')
+        arrays = [keys, values, self._fail, self._term_at, self._first_output,
+                  self._next_output, self._term_length]
+        
+        header = {
+            'byteorder': sys.byteorder,
+            'ignore_case': self.ignore_case,
+            'word_boundaries': self.word_boundaries,
+            'term_count': len(self.terms),
+            'arrays': [[item.typecode, len(item)] for item in arrays],
+            'terms_bytes': len(terms)
+        }
+        with open(path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            for item in arrays:
+                item.tofile(f)
+            f.write(terms)
+    
+    @classmethod
+    def load(cls, path: str) -> 'TermMatcher':
+        """
+        从 save 保存的文件加载（不重新构建）
+        
+        Args:
+            path: 文件路径
+            
+        Returns:
+            TermMatcher: 匹配器
+        """
+        with open(path, 'rb') as f:
+            if f.readline() != _MAGIC:
+                raise ValueError(f"Not a term matcher file: {path}")
+            header = json.loads(f.readline())
+            
+            arrays = []
+            for typecode, length in header['arrays']:
+                item = array(typecode)
+                item.fromfile(f, length)
+                if header['byteorder'] != sys.byteorder:
+                    item.byteswap()
+                arrays.append(item)
+            terms = f.read(header['terms_bytes']).decode('utf-8')
+        
+        matcher = cls.__new__(cls)
+        matcher.ignore_case = header['ignore_case']
+        matcher.word_boundaries = header['word_boundaries']
+        matcher.terms = terms.split('\0') if header['term_count'] else []
+        keys, values = arrays[0], arrays[1]
+        matcher._goto = dict(zip(keys, values))
+        (matcher._fail, matcher._term_at, matcher._first_output,
+         matcher._next_output, matcher._term_length) = arrays[2:]
+        return matcher
+
+class StreamingTermMatcher:
+    """
+    有状态的流式术语匹配器（每个响应流一个实例，非线程安全）
+    
+    依次输出的匹配与对完整文本调用 TermMatcher.iter_matches 的结果一致，位置为在完整文本中的位置
+    """
+    
+    def __init__(self, matcher: TermMatcher):
+        """
+        初始化匹配器
+        
+        Args:
+            matcher: 已构建的自动机（多个流共享）
+        """
+        self.matcher = matcher
+        self._state = 0
+        # 已消费的字符数
+        self._offset = 0
+        # 保留最近的文本，用于判断跨块匹配的开头边界
+        self._keep = matcher.max_term_length
+        self._tail = ''
+        # 以 ASCII 字母数字结尾、恰好在块末尾结束的匹配（需要下一个字符判断结尾边界）
+        self._pending: List[Tuple[int, int, int]] = []
+    
+    def feed(self, delta: str) -> List[Tuple[int, int, int]]:
+        """
+        消费一段增量文本
+        
+        Args:
+            delta: 增量文本
+            
+        Returns:
+            List[Tuple[int, int, int]]: 已确定的匹配 (开始位置, 结束位置, 词条编号)
+        """
+        if not delta:
+            return []
+        matcher = self.matcher
+        term_length = matcher._term_length
+        check_boundaries = matcher.word_boundaries
+        
+        results = []
+        if self._pending:
+            if not _is_ascii_word_char(delta[0]):
+                results.extend(self._pending)
+            self._pending = []
+        
+        text = self._tail + delta
+        base = self._offset - len(self._tail)
+        matches, self._state = matcher._advance(matcher._normalize(delta), self._state)
+        for end, term_id in matches:
+            end += self._offset
+            start = end - term_length[term_id]
+            if not check_boundaries:
+                results.append((start, end, term_id))
+            elif matcher._at_boundaries(text, start - base, end - base):
+                if end - base == len(text) and _is_ascii_word_char(text[-1]):
+                    self._pending.append((start, end, term_id))
+                else:
+                    results.append((start, end, term_id))
+        
+        self._offset += len(delta)
+        self._tail = text[-self._keep:] if self._keep else ''
+        return results
+    
+    def flush(self) -> List[Tuple[int, int, int]]:
+        """
+        输入结束，输出剩余的匹配
+        
+        Returns:
+            List[Tuple[int, int, int]]: 剩余的匹配
+        """
+        results = self._pending
+        self._pending = []
+        self._state = self._offset = 0
+        self._tail = ''
+        return results
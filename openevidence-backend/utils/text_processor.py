@@ -3,19 +3,33 @@
 处理医学文本的分析和格式化
 """
 
+import os
 import re
 import logging
-from typing import List, Dict, Tuple, Any
+import threading
+from typing import List, Dict, Tuple, Any, Mapping
+
+from utils.citation_parser import CITATION_PATTERN
+from utils.glossary import Glossary
+from utils.sentence_segmenter import SentenceSegmenter, ABBREVIATIONS
+from utils.term_matcher import TermMatcher
+from utils.text_structure import StreamingTextAnalyzer
 
 logger = logging.getLogger(__name__)
 
 class TextProcessor:
     """文本处理器"""
     
-    def __init__(self):
-        """初始化文本处理器"""
-        # 医学术语词典
-        self.medical_terms = {
+    def __init__(self, glossary_path: str = '', matcher_path: str = ''):
+        """
+        初始化文本处理器
+        
+        Args:
+            glossary_path: 术语词典文件（utils.glossary 格式，为空时使用内置词典）
+            matcher_path: 术语匹配自动机的缓存文件（比词典文件新时直接加载，否则构建后写入）
+        """
+        # 医学术语词典（中文 -> 英文）
+        self.medical_terms: Mapping[str, List[str]] = {
             '种植牙': ['dental implant', 'implant dentistry'],
             '种植体': ['implant fixture', 'dental implant'],
             '抗生素': ['antibiotic', 'antimicrobial'],
@@ -25,12 +39,74 @@ class TextProcessor:
             '荟萃分析': ['meta-analysis'],
             '循证医学': ['evidence-based medicine', 'EBM']
         }
+        self.glossary_path = glossary_path or None
+        self.matcher_path = matcher_path or None
+        if self.glossary_path:
+            try:
+                # 只做内存映射，不把词条读入 Python 对象
+                self.medical_terms = Glossary(self.glossary_path)
+            except Exception as e:
+                self.glossary_path = None
+                logger.error(f"Error loading glossary, using built-in terms: {str(e)}")
+        
+        # 术语匹配自动机（首次提取术语时创建）
+        self._term_matcher = None
+        self._matcher_lock = threading.Lock()
         
         # 句子分割符
         self.sentence_delimiters = ['。', '！', '？', '.', '!', '?']
+        self.sentence_segmenter = SentenceSegmenter(self.sentence_delimiters, ABBREVIATIONS)
         
         logger.info("Text processor initialized")
     
+    @property
+    def term_matcher(self) -> TermMatcher:
+        """术语匹配自动机（一次扫描找出所有术语，耗时与词典大小无关）"""
+        if self._term_matcher is None:
+            with self._matcher_lock:
+                if self._term_matcher is None:
+                    self._term_matcher = self._load_term_matcher()
+        return self._term_matcher
+    
+    def build_term_matcher(self) -> TermMatcher:
+        """
+        构建（或从缓存文件加载）术语匹配自动机，已构建时直接返回
+        
+        服务启动时调用，避免第一个请求中构建（ASGI 下会阻塞事件循环）
+        
+        Returns:
+            TermMatcher: 术语匹配自动机
+        """
+        return self.term_matcher
+    
+    def _load_term_matcher(self) -> TermMatcher:
+        """从缓存文件加载自动机，缓存不存在或已过期时由词典构建"""
+        path = self.matcher_path if self.glossary_path else None
+        if path and os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(self.glossary_path):
+            try:
+                return TermMatcher.load(path)
+            except Exception as e:
+                logger.error(f"Error loading term matcher cache: {str(e)}")
+        
+        matcher = TermMatcher(self.medical_terms)
+        if path:
+            try:
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                matcher.save(tmp_path)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                logger.error(f"Error saving term matcher cache: {str(e)}")
+        return matcher
+    
+    def create_stream_analyzer(self) -> StreamingTextAnalyzer:
+        """
+        创建流式文本结构分析器（随增量文本统计，结果与 analyze_text_structure 的统计一致）
+        
+        Returns:
+            StreamingTextAnalyzer: 分析器（每个响应流一个）
+        """
+        return StreamingTextAnalyzer(self)
+    
     def segment_by_sentences(self, text: str) -> List[str]:
         """
         按句子分割文本
@@ -42,23 +118,8 @@ class TextProcessor:
             List[str]: 句子列表
         """
         try:
-            sentences = []
-            current_sentence = ""
-            
-            for char in text:
-                current_sentence += char
-                
-                if char in self.sentence_delimiters:
-                    # 检查是否是真正的句子结尾
-                    if self._is_sentence_end(current_sentence):
-                        sentences.append(current_sentence.strip())
-                        current_sentence = ""
-            
-            # 添加剩余文本
-            if current_sentence.strip():
-                sentences.append(current_sentence.strip())
-            
-            return [s for s in sentences if s]
+            # 一次扫描，缩写中的点和小数点不作为句末
+            return self.sentence_segmenter.split(text)
             
         except Exception as e:
             logger.error(f"Error segmenting sentences: {str(e)}")
@@ -100,24 +161,17 @@ class TextProcessor:
         try:
             found_terms = []
             
-            for chinese_term, english_terms in self.medical_terms.items():
-                if chinese_term in text:
-                    positions = []
-                    start = 0
-                    while True:
-                        pos = text.find(chinese_term, start)
-                        if pos == -1:
-                            break
-                        positions.append(pos)
-                        start = pos + 1
-                    
-                    if positions:
-                        found_terms.append({
-                            'term': chinese_term,
-                            'english': english_terms,
-                            'positions': positions,
-                            'count': len(positions)
-                        })
+            # 按词典顺序输出
+            matches = self.term_matcher.find_all(text)
+            for term_id in sorted(matches):
+                chinese_term = self.term_matcher.terms[term_id]
+                positions = matches[term_id]
+                found_terms.append({
+                    'term': chinese_term,
+                    'english': self.medical_terms[chinese_term],
+                    'positions': positions,
+                    'count': len(positions)
+                })
             
             return found_terms
             
@@ -260,39 +314,6 @@ class TextProcessor:
             logger.error(f"Error extracting key points: {str(e)}")
             return []
     
-    def _is_sentence_end(self, sentence: str) -> bool:
-        """
-        判断是否为真正的句子结尾
-        
-        Args:
-            sentence: 句子文本
-            
-        Returns:
-            bool: 是否为句子结尾
-        """
-        try:
-            # 排除缩写等情况
-            sentence = sentence.strip()
-            
-            # 太短的不算句子
-            if len(sentence) < 3:
-                return False
-            
-            # 检查是否以标点符号结尾
-            if not sentence[-1] in self.sentence_delimiters:
-                return False
-            
-            # 排除常见缩写
-            abbreviations = ['Dr.', 'Prof.', 'etc.', 'vs.', 'e.g.', 'i.e.']
-            for abbr in abbreviations:
-                if sentence.endswith(abbr):
-                    return False
-            
-            return True
-            
-        except Exception:
-            return True
-    
     def _has_citations(self, text: str) -> bool:
         """
         检查文本是否包含引用
@@ -304,16 +325,7 @@ class TextProcessor:
             bool: 是否包含引用
         """
         try:
-            citation_patterns = [
-                r'\^?\[\d+(?:,\s*\d+)*\]\^?',  # [1] 或 ^[1]^
-                r'\^\d+\^',                     # ^1^
-            ]
-            
-            for pattern in citation_patterns:
-                if re.search(pattern, text):
-                    return True
-            
-            return False
+            return CITATION_PATTERN.search(text) is not None
             
         except Exception:
             return False
\ No newline at end of file
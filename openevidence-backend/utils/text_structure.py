@@ -0,0 +1,149 @@
+"""
+流式文本结构分析
+随回答的增量文本维护句子数、段落数、平均句长、术语命中和是否含引用，
+结束时不需要再扫描完整回答即可得到与 TextProcessor.analyze_text_structure 一致的统计
+"""
+
+import logging
+import re
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+from utils.citation_parser import CITATION_PATTERN
+from utils.sentence_segmenter import StreamingSentenceSegmenter
+from utils.term_matcher import StreamingTermMatcher
+
+if TYPE_CHECKING:
+    from utils.text_processor import TextProcessor
+
+logger = logging.getLogger(__name__)
+
+# 与 TextProcessor.segment_by_paragraphs 的段落分隔一致
+_PARAGRAPH_BREAK_RE = re.compile(r'\n\s*\n')
+
+# 文本末尾可能是未完成的引用标记（^1、^[1, 2、[12 等），需要与下一块拼接后再判断
+_PARTIAL_CITATION_RE = re.compile(r'(?:\^\[?|\[)[\d,\s]*\Z')
+
+class StreamingTextAnalyzer:
+    """有状态的流式文本结构分析器（每个响应流一个实例，非线程安全）"""
+    
+    def __init__(self, text_processor: 'TextProcessor'):
+        """
+        初始化分析器
+        
+        Args:
+            text_processor: 文本处理器（共享其句子切分规则、术语词典和匹配自动机）
+        """
+        self.medical_terms = text_processor.medical_terms
+        self._sentences = StreamingSentenceSegmenter(text_processor.sentence_segmenter)
+        self._terms = StreamingTermMatcher(text_processor.term_matcher)
+        self._term_names = text_processor.term_matcher.terms
+        
+        self.total_chars = 0
+        self.sentence_count = 0
+        self.sentence_chars = 0
+        self.paragraph_count = 0
+        self.has_citations = False
+        # 词条编号 -> 出现次数
+        self.term_counts: Dict[int, int] = {}
+        
+        # 上一段内容之后的空白中的换行数（两个及以上为段落分隔）
+        self._gap_newlines = 0
+        self._citation_tail = ''
+        self._failed = False
+        self._result: Optional[Dict[str, Any]] = None
+    
+    def feed(self, delta: str) -> None:
+        """
+        消费一段增量文本
+        
+        Args:
+            delta: 增量文本
+        """
+        if not delta or self._failed or self._result is not None:
+            return
+        
+        try:
+            self.total_chars += len(delta)
+            self._count_sentences(self._sentences.feed(delta))
+            self._count_terms(self._terms.feed(delta))
+            self._count_paragraphs(delta)
+            if not self.has_citations:
+                self._check_citations(delta)
+                
+        except Exception as e:
+            self._failed = True
+            logger.error(f"Error analyzing streamed text: {str(e)}")
+    
+    def _count_sentences(self, sentences) -> None:
+        for sentence in sentences:
+            self.sentence_count += 1
+            self.sentence_chars += len(sentence)
+    
+    def _count_terms(self, matches) -> None:
+        term_counts = self.term_counts
+        for _, _, term_id in matches:
+            term_counts[term_id] = term_counts.get(term_id, 0) + 1
+    
+    def _count_paragraphs(self, delta: str) -> None:
+        """段落为被含两个及以上换行的空白隔开的非空白内容"""
+        content = delta.strip()
+        if not content:
+            self._gap_newlines += delta.count('\n')
+            return
+        
+        leading = delta[:len(delta) - len(delta.lstrip())]
+        if self.paragraph_count == 0 or self._gap_newlines + leading.count('\n') >= 2:
+            self.paragraph_count += 1
+        self.paragraph_count += len(_PARAGRAPH_BREAK_RE.findall(content))
+        self._gap_newlines = delta[len(delta.rstrip()):].count('\n')
+    
+    def _check_citations(self, delta: str) -> None:
+        """只保留末尾未完成的引用标记，与下一块拼接后继续判断"""
+        text = self._citation_tail + delta
+        if CITATION_PATTERN.search(text) is not None:
+            self.has_citations = True
+            self._citation_tail = ''
+            return
+        partial = _PARTIAL_CITATION_RE.search(text)
+        self._citation_tail = text[partial.start():] if partial else ''
+    
+    def finalize(self) -> Optional[Dict[str, Any]]:
+        """
+        输入结束，输出结构统计（只处理尚未成句的剩余文本，不重新扫描完整文本）
+        
+        Returns:
+            Optional[Dict]: statistics（与 analyze_text_structure 的统计一致）和命中的术语；分析出错时为 None
+        """
+        if self._failed:
+            return None
+        if self._result is not None:
+            return self._result
+        
+        try:
+            self._count_sentences(self._sentences.flush())
+            self._count_terms(self._terms.flush())
+            
+            statistics = {
+                'total_chars': self.total_chars,
+                'total_sentences': self.sentence_count,
+                'total_paragraphs': self.paragraph_count,
+                'avg_sentence_length': self.sentence_chars / self.sentence_count if self.sentence_count else 0,
+                'medical_terms_count': len(self.term_counts),
+                'has_citations': self.has_citations
+            }
+            medical_terms = []
+            for term_id in sorted(self.term_counts):
+                term = self._term_names[term_id]
+                medical_terms.append({
+                    'term': term,
+                    'english': self.medical_terms.get(term, []),
+                    'count': self.term_counts[term_id]
+                })
+            
+            self._result = {'statistics': statistics, 'medical_terms': medical_terms}
+            return self._result
+            
+        except Exception as e:
+            self._failed = True
+            logger.error(f"Error finalizing text structure: {str(e)}")
+            return None
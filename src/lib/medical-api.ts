@@ -26,6 +26,8 @@ export interface StreamingResponse {
   isComplete: boolean;
   references?: Reference[];
   followUpQuestions?: string[];
+  // 完成响应发送时后续问题尚未就绪，之后以 follow_up_ready 事件发送
+  followUpPending?: boolean;
   confidence?: number;
   segmentIndex?: number;
   wordIndex?: number;
@@ -91,6 +93,16 @@ function transformBaichuanResponse(data: any): StreamingResponse | null {
       };
     }
 
+    // 处理后续问题就绪（完成响应之后发送）
+    if (data.type === 'follow_up_ready') {
+      return {
+        content: '',
+        isComplete: false,
+        followUpQuestions: data.followUpQuestions || [],
+        timestamp: data.timestamp
+      };
+    }
+
     // 处理内容开始
     if (data.type === 'content_start') {
       return {
@@ -133,6 +145,7 @@ function transformBaichuanResponse(data: any): StreamingResponse | null {
         isComplete: true,
         references: data.references || [],
         followUpQuestions: data.followUpQuestions || [],
+        followUpPending: data.followUpPending || false,
         timestamp: data.timestamp
       };
     }
@@ -185,6 +198,8 @@ class MedicalAPI {
     return new ReadableStream({
       start: (controller) => {
         let buffer = '';
+        // 流式解码：多字节 UTF-8 字符可能被拆分到两个数据块中
+        const decoder = new TextDecoder();
         
         const pump = (): Promise<void> => {
           return reader.read().then(({ done, value }) => {
@@ -194,7 +209,7 @@ class MedicalAPI {
             }
 
             // 将新数据添加到缓冲区
-            buffer += new TextDecoder().decode(value);
+            buffer += decoder.decode(value, { stream: true });
             
             // 按行分割处理
             const lines = buffer.split('\n');
@@ -138,6 +138,13 @@ const AskResults = () => {
                 value.followUpQuestions.map((q, index) => ({ id: index + 1, text: q }))
               );
             }
+            // 后续问题尚未就绪时继续读取 follow_up_ready 事件
+            if (!value.followUpPending) break;
+          } else if (value.followUpQuestions) {
+            // 后续问题就绪
+            setFollowUpQuestions(
+              value.followUpQuestions.map((q, index) => ({ id: index + 1, text: q }))
+            );
             break;
           } else if (value.content) {
             // 处理内容